@@ -1,52 +1,89 @@
-import requests
 import json
-import pandas as pd
-import snowflake.connector
-from snowflake.connector.pandas_tools import write_pandas
-from datetime import datetime
 import os
 from dotenv import load_dotenv
+from warehouseLoader import load_dataframe
+from warehouse import get_pool, ensure_table
+from changeTracker import ChangeTracker
+from detailFetcher import fetch_details
+from httpClient import http_get
+import metrics
+import gazetteer
+import crawlJournal
+from pagination import paginate, page_count
+from cityScheduler import CITY_WORKERS, stream_units, parse_args
+from recordStream import BATCH_SIZE, FLUSH_INTERVAL, STREAM_SINK, stream_to_sink, parquet_sink
+from recordSchema import field, joined, concat, parsed, timestamp, frame_builder
+from openingHours import INTERVALS_COLUMN, text_intervals
 
 load_dotenv()
 
 RAPID_API_KEY = os.getenv('RAPID_API_KEY')
 RAPID_API_HOST = "tripadvisor16.p.rapidapi.com"
-BASE_URL = "https://tripadvisor16.p.rapidapi.com/api/v1/attractions/searchLocation"
 DETAILS_URL = "https://tripadvisor16.p.rapidapi.com/api/v1/attractions/getAttractionDetails"
 
-SNOWFLAKE_USER = os.getenv('SNOWFLAKE_USER')
-SNOWFLAKE_PASSWORD = os.getenv('SNOWFLAKE_PASSWORD')
-SNOWFLAKE_ACCOUNT = os.getenv('SNOWFLAKE_ACCOUNT')
-SNOWFLAKE_WAREHOUSE = os.getenv('SNOWFLAKE_WAREHOUSE')
-SNOWFLAKE_DATABASE = os.getenv('SNOWFLAKE_DATABASE')
-SNOWFLAKE_SCHEMA = os.getenv('SNOWFLAKE_SCHEMA')
+tracker = ChangeTracker()
 
-CITIES = ["New York", "San Francisco", "Chicago", "Seattle", "Las Vegas", "Los Angeles"]
+ATTRACTIONS_PAGE_SIZE = 30
+
+ATTRACTIONS_DDL = """
+CREATE TABLE IF NOT EXISTS attractions (
+    attraction_id VARCHAR PRIMARY KEY,
+    city VARCHAR,
+    name VARCHAR,
+    description VARCHAR,
+    address VARCHAR,
+    latitude FLOAT,
+    longitude FLOAT,
+    rating FLOAT,
+    review_count INTEGER,
+    category VARCHAR,
+    subcategory VARCHAR,
+    price_level VARCHAR,
+    price_range VARCHAR,
+    website VARCHAR,
+    image_url VARCHAR,
+    suggested_duration VARCHAR,
+    opening_hours VARCHAR,
+    opening_intervals VARCHAR,
+    updated_at TIMESTAMP_NTZ,
+    row_hash VARCHAR
+)
+"""
+
+# Raw {'city', 'item': search result, 'detail': details payload} record -> row
+ATTRACTIONS_SCHEMA = {
+    'attraction_id': field('item.locationId', None),
+    'city': field('city'),
+    'name': field('item.title'),
+    'description': field('item.description'),
+    'address': concat([f"detail.data.location.{part}" for part in ['street1', 'street2', 'city', 'state', 'postalCode']], ', '),
+    'latitude': field('item.latitude', 0, 'float64'),
+    'longitude': field('item.longitude', 0, 'float64'),
+    'rating': field('item.averageRating', 0, 'float64'),
+    'review_count': field('item.reviewCount', 0, 'int64'),
+    'category': field('item.primaryCategory.name'),
+    'subcategory': joined('item.secondaryCategories', ',', key='name'),
+    'price_level': field('item.priceLevel'),
+    'price_range': field('item.priceRange'),
+    'website': field('detail.data.website'),
+    'image_url': field('item.thumbnail.url'),
+    'suggested_duration': field('detail.data.suggestedDuration'),
+    'opening_hours': joined('detail.data.openingHours', ', '),
+    INTERVALS_COLUMN: parsed('opening_hours', text_intervals),
+    'updated_at': timestamp()
+}
+
+CITIES = gazetteer.CITIES
 
 def get_location_id(city_name):
-    headers = {
-        "X-RapidAPI-Key": RAPID_API_KEY,
-        "X-RapidAPI-Host": RAPID_API_HOST
-    }
-    
-    params = {
-        "query": city_name,
-        "language": "en"
-    }
-    
-    try:
-        response = requests.get(BASE_URL, headers=headers, params=params)
-        data = response.json()
-        
-        if 'data' in data and len(data['data']) > 0:
-            for result in data['data']:
-                if 'locationId' in result:
-                    return result['locationId']
-    
-    except Exception as e:
-        print(f"Error fetching location ID for {city_name}: {e}")
-    
-    return None
+    """
+    TripAdvisor locationId for a city, looked up once and kept in the gazetteer
+    """
+    return gazetteer.get(city_name, 'tripadvisor_location_id')
+
+def attraction_total_pages(payload, page_size):
+    data = payload.get('data', {})
+    return data.get('totalPages') or page_count(data.get('totalResults'), ATTRACTIONS_PAGE_SIZE)
 
 def get_attractions(location_id, city_name):
     headers = {
@@ -58,142 +95,125 @@ def get_attractions(location_id, city_name):
     params = {
         "locationId": location_id,
         "language": "en",
-        "currency": "USD",
-        "offset": "0"
+        "currency": "USD"
     }
     
+    crawl = crawlJournal.run('attractions')
+    
+    def fetch_page(page):
+        page_params = dict(params, offset=str(page * ATTRACTIONS_PAGE_SIZE))
+        return http_get('tripadvisor', attractions_url, headers=headers, params=page_params).json()
+    
     try:
-        response = requests.get(attractions_url, headers=headers, params=params)
-        data = response.json()
+        results = paginate(
+            crawl.pages('tripadvisor', city_name, fetch_page),
+            lambda payload: payload.get('data', {}).get('attractions', []),
+            lambda attraction: attraction.get('locationId'),
+            attraction_total_pages
+        )
         
-        if 'data' in data and 'attractions' in data['data']:
-            attractions = []
+        if results:
+            changed = tracker.changed('attractions', results, 'locationId')
             
-            for attraction in data['data']['attractions']:
-                attraction_id = attraction.get('locationId')
-                
-                detail_params = {
-                    "locationId": attraction_id,
-                    "language": "en",
-                    "currency": "USD"
+            detail_requests = [
+                {
+                    'url': DETAILS_URL,
+                    'headers': headers,
+                    'params': {
+                        "locationId": attraction.get('locationId'),
+                        "language": "en",
+                        "currency": "USD"
+                    }
                 }
-                
-                detail_response = requests.get(DETAILS_URL, headers=headers, params=detail_params)
-                detail_data = detail_response.json()
-                
-                address = ''
-                if 'data' in detail_data and 'location' in detail_data['data']:
-                    address_obj = detail_data['data']['location']
-                    address_parts = []
-                    
-                    if 'street1' in address_obj and address_obj['street1']:
-                        address_parts.append(address_obj['street1'])
-                    if 'street2' in address_obj and address_obj['street2']:
-                        address_parts.append(address_obj['street2'])
-                    if 'city' in address_obj and address_obj['city']:
-                        address_parts.append(address_obj['city'])
-                    if 'state' in address_obj and address_obj['state']:
-                        address_parts.append(address_obj['state'])
-                    if 'postalCode' in address_obj and address_obj['postalCode']:
-                        address_parts.append(address_obj['postalCode'])
-                    
-                    address = ', '.join(address_parts)
-                
-                attraction_info = {
-                    'attraction_id': attraction_id,
-                    'city': city_name,
-                    'name': attraction.get('title', ''),
-                    'description': attraction.get('description', ''),
-                    'address': address,
-                    'latitude': attraction.get('latitude', 0),
-                    'longitude': attraction.get('longitude', 0),
-                    'rating': attraction.get('averageRating', 0),
-                    'review_count': attraction.get('reviewCount', 0),
-                    'category': attraction.get('primaryCategory', {}).get('name', ''),
-                    'subcategory': ','.join([subcat.get('name', '') for subcat in attraction.get('secondaryCategories', [])]),
-                    'price_level': attraction.get('priceLevel', ''),
-                    'price_range': attraction.get('priceRange', ''),
-                    'website': detail_data.get('data', {}).get('website', ''),
-                    'image_url': attraction.get('thumbnail', {}).get('url', ''),
-                    'suggested_duration': detail_data.get('data', {}).get('suggestedDuration', ''),
-                    'opening_hours': ', '.join(detail_data.get('data', {}).get('openingHours', [])),
-                    'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                }
-                
-                attractions.append(attraction_info)
+                for attraction in changed
+            ]
+            details = fetch_details(detail_requests, 'tripadvisor', crawl=crawl, city=city_name)
+            failed = [attraction.get('locationId') for attraction, detail_data in zip(changed, details) if not detail_data]
+            tracker.discard('attractions', failed)
+            if failed:
+                crawl.incomplete()
             
-            return attractions
+            return [
+                {'city': city_name, 'item': attraction, 'detail': detail_data}
+                for attraction, detail_data in zip(changed, details)
+            ]
     
     except Exception as e:
         print(f"Error fetching attraction data for {city_name}: {e}")
     
     return []
 
-def main():
-    all_attractions = []
+def fetch_city(city):
+    print(f"Processing attractions in {city}...")
     
-    for city in CITIES:
-        print(f"Processing attractions in {city}...")
-        
-        location_id = get_location_id(city)
+    location_id = get_location_id(city)
+    
+    if location_id:
+        attractions = get_attractions(location_id, city)
         
-        if location_id:
-            attractions = get_attractions(location_id, city)
-            
-            if attractions:
-                all_attractions.extend(attractions)
-                print(f"Found {len(attractions)} attractions in {city}")
-            else:
-                print(f"Could not retrieve attraction data for {city}")
+        if attractions:
+            print(f"Found {len(attractions)} new or changed attractions in {city}")
         else:
-            print(f"Could not find location ID for {city}")
-    
-    df = pd.DataFrame(all_attractions)
+            print(f"Could not retrieve attraction data for {city}")
+        
+        return attractions
     
-    try:
-        conn = snowflake.connector.connect(
-            user=SNOWFLAKE_USER,
-            password=SNOWFLAKE_PASSWORD,
-            account=SNOWFLAKE_ACCOUNT,
-            warehouse=SNOWFLAKE_WAREHOUSE,
-            database=SNOWFLAKE_DATABASE,
-            schema=SNOWFLAKE_SCHEMA
-        )
+    print(f"Could not find location ID for {city}")
+    return []
 
-        cursor = conn.cursor()
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS attractions (
-            attraction_id VARCHAR PRIMARY KEY,
-            city VARCHAR,
-            name VARCHAR,
-            description VARCHAR,
-            address VARCHAR,
-            latitude FLOAT,
-            longitude FLOAT,
-            rating FLOAT,
-            review_count INTEGER,
-            category VARCHAR,
-            subcategory VARCHAR,
-            price_level VARCHAR,
-            price_range VARCHAR,
-            website VARCHAR,
-            image_url VARCHAR,
-            suggested_duration VARCHAR,
-            opening_hours VARCHAR,
-            updated_at TIMESTAMP_NTZ
-        )
-        """)
-        
-        success, num_chunks, num_rows, output = write_pandas(conn, df, 'ATTRACTIONS')
+def replayed(rows):
+    """
+    Restore the fingerprints of journaled rows, leaving out failed detail fetches
+    """
+    tracker.remember('attractions', [row['item'] for row in rows if row['detail']], 'locationId')
+
+def get_attraction_data(workers=CITY_WORKERS):
+    """
+    Stream attraction records for every city
+    """
+    return stream_units(crawlJournal.run('attractions').units(fetch_city, replayed), CITIES, workers)
+
+def main(workers=CITY_WORKERS, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, sink=STREAM_SINK):
+    from facetIndex import FacetIndex, indexed
+    
+    crawl = crawlJournal.run('attractions')
+    rows = get_attraction_data(workers)
+    build = frame_builder(ATTRACTIONS_SCHEMA)
+    facets = FacetIndex.open('attractions')
+    
+    if sink == 'parquet':
+        write = parquet_sink('ATTRACTIONS')
         
-        print(f"Data loaded successfully: {success}")
-        print(f"Number of chunks: {num_chunks}")
-        print(f"Number of rows: {num_rows}")
+        def flush(df):
+            write(df)
+            tracker.commit('attractions', df['attraction_id'])
         
-        conn.close()
+        total = stream_to_sink(rows, indexed(flush, facets), batch_size, flush_interval, build, table='ATTRACTIONS')
+        facets.save()
+        crawl.finish()
+        print(f"Wrote {total} attractions to Parquet")
+        return
+    
+    try:
+        with get_pool().connection() as conn:
+            ensure_table(conn, 'ATTRACTIONS', ATTRACTIONS_DDL, {INTERVALS_COLUMN: 'VARCHAR'})
+            
+            def flush(df):
+                load_dataframe(conn, df, 'ATTRACTIONS', ['attraction_id'])
+                tracker.commit('attractions', df['attraction_id'])
+            
+            total = stream_to_sink(rows, indexed(flush, facets), batch_size, flush_interval, build, table='ATTRACTIONS')
+            facets.save()
+            crawl.finish()
+            
+            if not total:
+                print("No new or changed attractions to load")
         
     except Exception as e:
         print(f"Error connecting to Snowflake: {e}")
+        raise
 
 if __name__ == "__main__":
-    main()
+    args = parse_args("Load TripAdvisor attractions into Snowflake")
+    with metrics.profiled('attractions'):
+        main(workers=args.workers, batch_size=args.batch_size, flush_interval=args.flush_interval, sink=args.sink)
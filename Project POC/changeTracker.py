@@ -0,0 +1,121 @@
+import sqlite3
+import threading
+import hashlib
+import json
+import time
+import os
+
+CHANGE_TRACKING = os.getenv('CHANGE_TRACKING', '1') != '0'
+STATE_PATH = os.getenv('CHANGE_STATE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'state.sqlite'))
+
+def fingerprint(payload):
+    """
+    Stable hash of a provider payload, independent of key order
+    """
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+class ChangeTracker:
+    """
+    Local index of the last fingerprint loaded for each (entity, record id).
+    changed() filters a batch down to new or modified records and remembers
+    their fingerprints; commit() persists them once the load has succeeded
+    """
+    def __init__(self, path=STATE_PATH, enabled=CHANGE_TRACKING):
+        self.enabled = enabled
+        self.pending = {}
+        self.lock = threading.Lock()
+
+        if not enabled:
+            return
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS fingerprints (
+            entity TEXT,
+            record_id TEXT,
+            fingerprint TEXT,
+            seen_at REAL,
+            PRIMARY KEY (entity, record_id)
+        )
+        """)
+        self.conn.commit()
+
+    def changed(self, entity, records, id_field):
+        if not self.enabled:
+            return list(records)
+
+        fingerprints = {str(record.get(id_field)): fingerprint(record) for record in records}
+
+        with self.lock:
+            stored = {}
+            ids = list(fingerprints)
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                placeholders = ', '.join('?' for _ in chunk)
+                stored.update(self.conn.execute(
+                    f"SELECT record_id, fingerprint FROM fingerprints WHERE entity = ? AND record_id IN ({placeholders})",
+                    [entity] + chunk
+                ).fetchall())
+
+            changed = []
+            for record in records:
+                record_id = str(record.get(id_field))
+                if stored.get(record_id) != fingerprints[record_id]:
+                    changed.append(record)
+                    self.pending[(entity, record_id)] = fingerprints[record_id]
+
+        return changed
+
+    def commit(self, entity=None, record_ids=None):
+        """
+        Persist pending fingerprints: all of them, or only the given records of
+        `entity` when a stream flushes one batch at a time
+        """
+        if not self.enabled or not self.pending:
+            return
+
+        now = time.time()
+        with self.lock:
+            if record_ids is None:
+                keys = list(self.pending)
+            else:
+                keys = [(entity, str(record_id)) for record_id in record_ids if (entity, str(record_id)) in self.pending]
+
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?, ?)",
+                [(key[0], key[1], self.pending.pop(key), now) for key in keys]
+            )
+            self.conn.commit()
+
+    def remember(self, entity, records, id_field):
+        """
+        Mark records pending without filtering them, e.g. rows replayed from
+        the crawl journal whose changed() call ran in an earlier process
+        """
+        if not self.enabled:
+            return
+
+        with self.lock:
+            for record in records:
+                self.pending[(entity, str(record.get(id_field)))] = fingerprint(record)
+
+    def discard(self, entity, record_ids):
+        """
+        Forget pending fingerprints, e.g. for records whose detail fetch failed,
+        so they count as changed (and are enriched again) on the next run
+        """
+        with self.lock:
+            for record_id in record_ids:
+                self.pending.pop((entity, str(record_id)), None)
+
+    def reset(self, entity=None):
+        if not self.enabled:
+            return
+
+        with self.lock:
+            if entity:
+                self.conn.execute("DELETE FROM fingerprints WHERE entity = ?", (entity,))
+            else:
+                self.conn.execute("DELETE FROM fingerprints")
+            self.conn.commit()
@@ -0,0 +1,40 @@
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+import argparse
+import os
+from recordStream import BATCH_SIZE, FLUSH_INTERVAL, STREAM_SINK
+
+CITY_WORKERS = int(os.getenv('CITY_WORKERS', '4'))
+
+def stream_units(fetch_unit, units, workers=CITY_WORKERS):
+    """
+    Run fetch_unit over every city (or city pair) on a pool of `workers`
+    threads, yielding rows as soon as each unit finishes (still in unit
+    order) with at most 2 * workers units in flight, so memory stays bounded
+    however many cities there are. Workers share each provider's session and
+    token bucket in httpClient, so together they stay within the provider
+    quota
+    """
+    units = iter(units)
+    workers = max(1, workers)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque(executor.submit(fetch_unit, unit) for _, unit in zip(range(workers * 2), units))
+
+        while pending:
+            rows = pending.popleft().result()
+
+            for unit in units:
+                pending.append(executor.submit(fetch_unit, unit))
+                break
+
+            if rows:
+                yield from rows
+
+def parse_args(description):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--workers', type=int, default=CITY_WORKERS, help='number of cities fetched in parallel')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='rows per flush')
+    parser.add_argument('--flush-interval', type=float, default=FLUSH_INTERVAL, help='seconds before a partial batch is flushed')
+    parser.add_argument('--sink', choices=['warehouse', 'parquet'], default=STREAM_SINK, help='where batches are written')
+    return parser.parse_args()
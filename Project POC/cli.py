@@ -0,0 +1,101 @@
+import importlib
+import argparse
+import time
+import metrics
+import crawlJournal
+from taskGraph import TASKS, TASK_CONCURRENCY, Task, run_graph
+from cityScheduler import CITY_WORKERS
+from recordStream import BATCH_SIZE, FLUSH_INTERVAL, STREAM_SINK, stream_to_sink
+
+# Table -> (module, attribute holding its city list, row stream function, warehouse table, record schema)
+TABLES = {
+    'destinations': ('destinationTable', 'CITIES', 'get_destination_data', 'DESTINATIONS', None),
+    'hotels': ('hotelsTable', 'CITIES', 'get_hotel_data', 'HOTELS', 'HOTELS_SCHEMA'),
+    'attractions': ('attractionsTable', 'CITIES', 'get_attraction_data', 'ATTRACTIONS', 'ATTRACTIONS_SCHEMA'),
+    'restaurants': ('restaurantsTable', 'CITIES', 'get_restaurant_data', 'RESTAURANTS', 'RESTAURANTS_SCHEMA'),
+    'transportation': ('transportationTable', 'cities', 'get_transportation_data', 'TRANSPORTATION_DATA', None),
+    'weather': ('weatherTable', 'cities', 'get_weather_data', 'WEATHER_DATA', None)
+}
+
+# full:      fetch, transform and load every table in dependency order
+# fetch:     fetch into the crawl journal only; no pandas, no warehouse
+# transform: build and load from the crawl journal, without any API calls
+# dry-run:   fetch and build every batch, but load and journal nothing
+MODES = ['full', 'fetch', 'transform', 'dry-run']
+
+def fetch_only(name):
+    def run(options, upstream):
+        module_name, _, rows_function, _, _ = TABLES[name]
+        rows = getattr(importlib.import_module(module_name), rows_function)(options['workers'])
+        total = sum(1 for _ in rows)
+        print(f"Journaled {total} {name} rows")
+    return run
+
+def dry_run(name):
+    def run(options, upstream):
+        module_name, _, rows_function, table, schema = TABLES[name]
+        module = importlib.import_module(module_name)
+        rows = getattr(module, rows_function)(options['workers'])
+
+        kwargs = {'table': table}
+        if schema:
+            from recordSchema import frame_builder
+
+            kwargs['build'] = frame_builder(getattr(module, schema))
+
+        total = stream_to_sink(rows, lambda df: None, options['batch_size'], options['flush_interval'], **kwargs)
+        print(f"Dry run: built {total} {name} rows, loaded none")
+    return run
+
+def mode_tasks(mode):
+    """
+    The task graph for a mode. Only full and transform loads pass destination
+    outputs downstream; fetch and dry-run tables are independent
+    """
+    if mode in ('full', 'transform'):
+        return TASKS
+    runner = fetch_only if mode == 'fetch' else dry_run
+    return {name: Task(name, runner(name)) for name in TABLES}
+
+def limit_cities(cities, names):
+    for name in names:
+        module_name, cities_attribute, _, _, _ = TABLES[name]
+        setattr(importlib.import_module(module_name), cities_attribute, list(cities))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fetch, transform and load the travel tables")
+    parser.add_argument('--mode', choices=MODES, default='full', help='which stages to run')
+    parser.add_argument('--tables', default=','.join(TABLES), help='comma-separated tables (full and transform also run their upstream tables)')
+    parser.add_argument('--cities', help='comma-separated cities instead of the gazetteer list')
+    parser.add_argument('--concurrency', type=int, default=TASK_CONCURRENCY, help='tables run at the same time')
+    parser.add_argument('--workers', type=int, default=CITY_WORKERS, help='number of cities each table fetches in parallel')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='rows per flush')
+    parser.add_argument('--flush-interval', type=float, default=FLUSH_INTERVAL, help='seconds before a partial batch is flushed')
+    parser.add_argument('--sink', choices=['warehouse', 'parquet'], default=STREAM_SINK, help='where batches are written')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    names = args.tables.split(',')
+    tasks = mode_tasks(args.mode)
+
+    if args.mode in ('fetch', 'transform') and not crawlJournal.CRAWL_JOURNAL:
+        raise SystemExit(f"--mode {args.mode} needs the crawl journal (unset CRAWL_JOURNAL=0)")
+    if args.mode == 'transform':
+        crawlJournal.REPLAY_ONLY = True
+    if args.mode == 'dry-run':
+        crawlJournal.disable()
+    if args.cities:
+        limit_cities(args.cities.split(','), TABLES)
+
+    options = {'workers': args.workers, 'batch_size': args.batch_size, 'flush_interval': args.flush_interval, 'sink': args.sink}
+    start = time.perf_counter()
+    with metrics.profiled(f"cli-{args.mode}"):
+        status = run_graph(names, options, args.concurrency, tasks)
+    print(f"{args.mode} finished in {time.perf_counter() - start:.1f}s: " + ', '.join(f"{name} {state}" for name, state in status.items()))
+
+    if any(state != 'ok' for state in status.values()):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+from datetime import datetime, date
+from urllib.parse import urlencode
+import threading
+import sqlite3
+import json
+import time
+import zlib
+import os
+import metrics
+
+CRAWL_JOURNAL = os.getenv('CRAWL_JOURNAL', '1') != '0'
+JOURNAL_PATH = os.getenv('CRAWL_JOURNAL_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'journal.sqlite'))
+# Units come from the journal or not at all (the CLI's transform mode)
+REPLAY_ONLY = os.getenv('CRAWL_REPLAY_ONLY', '0') == '1'
+
+def encode_value(value):
+    if isinstance(value, datetime):
+        return {'$datetime': value.isoformat()}
+    if isinstance(value, date):
+        return {'$date': value.isoformat()}
+    raise TypeError(f"Cannot journal {type(value).__name__}")
+
+def decode_value(obj):
+    if '$datetime' in obj:
+        return datetime.fromisoformat(obj['$datetime'])
+    if '$date' in obj:
+        return date.fromisoformat(obj['$date'])
+    return obj
+
+def pack(payload):
+    return zlib.compress(json.dumps(payload, default=encode_value).encode())
+
+def unpack(blob):
+    return json.loads(zlib.decompress(blob), object_hook=decode_value)
+
+def not_fetched(unit):
+    return []
+
+def unit_key(unit):
+    return unit if isinstance(unit, str) else json.dumps(list(unit))
+
+def request_key(detail_request):
+    params = detail_request.get('params')
+    return detail_request['url'] + (f"?{urlencode(sorted(params.items()))}" if params else '')
+
+class CrawlJournal:
+    """
+    Durable record of a crawl in progress, so a crash or quota cutoff
+    resumes where it stopped. A run belongs to one script and stays open
+    until finish(); starting the script again picks the open run back up.
+    Each (provider, city, kind, key) entry holds a raw payload: kind is
+    'page' for search pages, 'item' for detail responses and 'unit' for
+    the rows of a city (or city pair) finished without failed requests. Entries are written as they
+    arrive and replayed instead of refetched
+    """
+    def __init__(self, path=JOURNAL_PATH, enabled=CRAWL_JOURNAL):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+
+        if not enabled:
+            return
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+        CREATE TABLE IF NOT EXISTS runs (
+            run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            script TEXT,
+            started_at REAL,
+            finished_at REAL
+        );
+        CREATE TABLE IF NOT EXISTS entries (
+            run_id INTEGER,
+            provider TEXT,
+            city TEXT,
+            kind TEXT,
+            key TEXT,
+            payload BLOB,
+            fetched_at REAL,
+            PRIMARY KEY (run_id, provider, city, kind, key)
+        );
+        """)
+        self.conn.commit()
+
+    def start(self, script):
+        """
+        The open run of `script`, or a new one
+        """
+        if not self.enabled:
+            return CrawlRun(self, None, script)
+
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT run_id FROM runs WHERE script = ? AND finished_at IS NULL ORDER BY run_id DESC LIMIT 1", [script]
+            ).fetchone()
+            if row:
+                run_id = row[0]
+                counts = dict(self.conn.execute("SELECT kind, COUNT(*) FROM entries WHERE run_id = ? GROUP BY kind", [run_id]).fetchall())
+                print(f"Resuming {script} run {run_id}: {counts.get('unit', 0)} units, {counts.get('page', 0)} pages, "
+                      f"{counts.get('item', 0)} items already fetched")
+            else:
+                run_id = self.conn.execute("INSERT INTO runs (script, started_at) VALUES (?, ?)", [script, time.time()]).lastrowid
+                self.conn.commit()
+        return CrawlRun(self, run_id, script)
+
+    def get(self, run_id, provider, city, kind, key):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT payload FROM entries WHERE run_id = ? AND provider = ? AND city = ? AND kind = ? AND key = ?",
+                [run_id, provider, city, kind, key]
+            ).fetchone()
+        return unpack(row[0]) if row else None
+
+    def put(self, run_id, provider, city, kind, key, payload):
+        blob = pack(payload)
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)", [run_id, provider, city, kind, key, blob, time.time()])
+            self.conn.commit()
+
+    def finish(self, run_id):
+        """
+        Close a run once its rows are loaded; its payloads are dropped
+        """
+        with self.lock:
+            self.conn.execute("UPDATE runs SET finished_at = ? WHERE run_id = ?", [time.time(), run_id])
+            self.conn.execute("DELETE FROM entries WHERE run_id = ?", [run_id])
+            self.conn.commit()
+
+class CrawlRun:
+    def __init__(self, journal, run_id, script):
+        self.journal = journal
+        self.run_id = run_id
+        self.script = script
+        self.empty_units = 0
+        self.partial_units = 0
+        self.fetching = threading.local()
+
+    @property
+    def enabled(self):
+        return self.run_id is not None
+
+    def journaled(self, provider, city, kind, fetch, key=str, on_replay=None, keep=bool):
+        """
+        Wrap fetch(arg) so its payload is journaled under key(arg) and
+        replayed on resume, calling on_replay(payload) when it is. Payloads
+        keep(payload) rejects, by default empty ones (failed or blank
+        responses), are not kept, so they are fetched again
+        """
+        if not self.enabled:
+            return fetch
+
+        def fetch_or_replay(arg):
+            entry_key = key(arg)
+            payload = self.journal.get(self.run_id, provider, city, kind, entry_key)
+            if payload is not None:
+                metrics.increment('journal_replays_total', kind=kind, provider=provider)
+                if on_replay:
+                    on_replay(payload)
+                return payload
+
+            payload = fetch(arg)
+            if keep(payload):
+                self.journal.put(self.run_id, provider, city, kind, entry_key, payload)
+            return payload
+
+        return fetch_or_replay
+
+    def pages(self, provider, city, fetch_page):
+        return self.journaled(provider, city, 'page', fetch_page)
+
+    def items(self, provider, city, fetch_item):
+        return self.journaled(provider, city, 'item', fetch_item, request_key)
+
+    def units(self, fetch_unit, on_replay=None):
+        """
+        Wrap a per-city (or per-pair) fetch so finished units replay their
+        rows. Units that return no rows are retried on resume, since the
+        scripts report failures as empty results. Under REPLAY_ONLY, units
+        missing from the journal return no rows instead of being fetched.
+        Units that fetch_unit marks incomplete() are not journaled either.
+        on_replay(rows) lets a script restore per-row state that fetch_unit
+        would have set, such as change-tracker fingerprints
+        """
+        if not self.enabled:
+            return fetch_unit
+
+        def complete(rows):
+            return bool(rows) and not self.fetching.partial
+
+        replay = self.journaled(self.script, '', 'unit', not_fetched if REPLAY_ONLY else fetch_unit, unit_key, on_replay, complete)
+
+        def fetch_or_replay(unit):
+            self.fetching.partial = False
+            rows = replay(unit)
+            if not rows:
+                self.empty_units += 1
+            elif self.fetching.partial:
+                self.partial_units += 1
+            return rows
+
+        return fetch_or_replay
+
+    def incomplete(self):
+        """
+        Mark the unit fetch_unit is fetching on this thread as missing some
+        of its data, e.g. a failed detail request. Its rows are still
+        returned, but the unit is not journaled, so a resumed run fetches it
+        again (its journaled pages and items still replay)
+        """
+        self.fetching.partial = True
+
+    def finish(self):
+        if not self.enabled:
+            return
+        self.journal.finish(self.run_id)
+        if self.empty_units:
+            print(f"{self.script}: {self.empty_units} units returned no rows (failed, empty or unchanged)")
+        if self.partial_units:
+            print(f"{self.script}: {self.partial_units} units were incomplete (some requests failed)")
+
+_journal = None
+_runs = {}
+_lock = threading.Lock()
+
+def get_journal():
+    global _journal
+    with _lock:
+        if _journal is None:
+            _journal = CrawlJournal()
+        return _journal
+
+def disable():
+    """
+    Hand out pass-through runs from now on, so nothing is journaled or
+    replayed and no run is left open (the CLI's dry-run mode)
+    """
+    global _journal
+    with _lock:
+        _journal = CrawlJournal(enabled=False)
+        _runs.clear()
+
+def run(script):
+    """
+    The process-wide run of a script, started (or resumed) on first use
+    """
+    journal = get_journal()
+    with _lock:
+        if script not in _runs:
+            _runs[script] = journal.start(script)
+        return _runs[script]
+
+def finish(script):
+    with _lock:
+        crawl = _runs.pop(script, None)
+    if crawl:
+        crawl.finish()
@@ -1,45 +1,53 @@
-import requests
 import json
-import pandas as pd
-import snowflake.connector
-from snowflake.connector.pandas_tools import write_pandas
 from datetime import datetime
 import os
 from dotenv import load_dotenv
+from warehouseLoader import load_dataframe
+from warehouse import get_pool, ensure_table
+from httpClient import http_get
+import metrics
+import gazetteer
+import crawlJournal
+from cityScheduler import CITY_WORKERS, stream_units, parse_args
+from recordStream import BATCH_SIZE, FLUSH_INTERVAL, STREAM_SINK, stream_to_sink, parquet_sink
 
 load_dotenv()
 
 API_KEY = os.getenv('GOOGLE_PLACES_API_KEY')
-BASE_URL = "https://maps.googleapis.com/maps/api/place/textsearch/json"
 
-SNOWFLAKE_USER = os.getenv('SNOWFLAKE_USER')
-SNOWFLAKE_PASSWORD = os.getenv('SNOWFLAKE_PASSWORD')
-SNOWFLAKE_ACCOUNT = os.getenv('SNOWFLAKE_ACCOUNT')
-SNOWFLAKE_WAREHOUSE = os.getenv('SNOWFLAKE_WAREHOUSE')
-SNOWFLAKE_DATABASE = os.getenv('SNOWFLAKE_DATABASE')
-SNOWFLAKE_SCHEMA = os.getenv('SNOWFLAKE_SCHEMA')
+DESTINATIONS_DDL = """
+CREATE TABLE IF NOT EXISTS destinations (
+    city_id VARCHAR PRIMARY KEY,
+    city_name VARCHAR,
+    formatted_address VARCHAR,
+    latitude FLOAT,
+    longitude FLOAT,
+    google_map_url VARCHAR,
+    website VARCHAR,
+    rating FLOAT,
+    user_ratings_total INTEGER,
+    types VARCHAR,
+    photo_reference VARCHAR,
+    vicinity VARCHAR,
+    timezone VARCHAR,
+    country VARCHAR,
+    state VARCHAR,
+    updated_at TIMESTAMP_NTZ,
+    row_hash VARCHAR
+)
+"""
 
-CITIES = ["New York", "San Francisco", "Chicago", "Seattle", "Las Vegas", "Los Angeles"]
+CITIES = gazetteer.CITIES
 
 def get_city_details(city_name):
     """
     Get detailed information about a city using Google Places API
     """
-    params = {
-        'query': f"{city_name} city",
-        'type': 'locality',
-        'key': API_KEY
-    }
+    place_id = gazetteer.get(city_name, 'google_place_id')
     
-    response = requests.get(BASE_URL, params=params)
-    data = response.json()
-    
-    if 'results' in data and len(data['results']) > 0:
-        city_data = data['results'][0]
-        
-        place_id = city_data.get('place_id')
+    if place_id:
         details_url = f"https://maps.googleapis.com/maps/api/place/details/json?place_id={place_id}&fields=name,formatted_address,geometry,place_id,vicinity,url,website,rating,user_ratings_total,formatted_phone_number,international_phone_number,opening_hours,price_level,types&key={API_KEY}"
-        details_response = requests.get(details_url)
+        details_response = http_get('google_places', details_url)
         details_data = details_response.json()
         
         if 'result' in details_data:
@@ -56,7 +64,7 @@ def get_city_details(city_name):
                 'rating': details.get('rating', 0),
                 'user_ratings_total': details.get('user_ratings_total', 0),
                 'types': ','.join(details.get('types', [])),
-                'photo_reference': city_data.get('photos', [{}])[0].get('photo_reference', '') if 'photos' in city_data else '',
+                'photo_reference': gazetteer.get(city_name, 'photo_reference') or '',
                 'vicinity': details.get('vicinity', ''),
                 'timezone': '',  # We would need another API call to get timezone
                 'country': 'USA',
@@ -66,62 +74,67 @@ def get_city_details(city_name):
     
     return None
 
-def main():
-    cities_data = []
+def fetch_city(city):
+    print(f"Processing {city}...")
     
-    for city in CITIES:
-        print(f"Processing {city}...")
+    try:
         city_details = get_city_details(city)
-        
-        if city_details:
-            cities_data.append(city_details)
-        else:
-            print(f"Could not retrieve data for {city}")
+    except Exception as e:
+        print(f"Error fetching city data for {city}: {e}")
+        city_details = None
     
-    df = pd.DataFrame(cities_data)
+    if city_details:
+        return [city_details]
     
-    try:
-        conn = snowflake.connector.connect(
-            user=SNOWFLAKE_USER,
-            password=SNOWFLAKE_PASSWORD,
-            account=SNOWFLAKE_ACCOUNT,
-            warehouse=SNOWFLAKE_WAREHOUSE,
-            database=SNOWFLAKE_DATABASE,
-            schema=SNOWFLAKE_SCHEMA
-        )
+    print(f"Could not retrieve data for {city}")
+    return []
 
-        cursor = conn.cursor()
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS destinations (
-            city_id VARCHAR PRIMARY KEY,
-            city_name VARCHAR,
-            formatted_address VARCHAR,
-            latitude FLOAT,
-            longitude FLOAT,
-            google_map_url VARCHAR,
-            website VARCHAR,
-            rating FLOAT,
-            user_ratings_total INTEGER,
-            types VARCHAR,
-            photo_reference VARCHAR,
-            vicinity VARCHAR,
-            timezone VARCHAR,
-            country VARCHAR,
-            state VARCHAR,
-            updated_at TIMESTAMP_NTZ
-        )
-        """)
-        
-        success, num_chunks, num_rows, output = write_pandas(conn, df, 'DESTINATIONS')
-        
-        print(f"Data loaded successfully: {success}")
-        print(f"Number of chunks: {num_chunks}")
-        print(f"Number of rows: {num_rows}")
-        
-        conn.close()
+def located(rows, locations):
+    """
+    Pass rows through, noting each city's place id and coordinates
+    """
+    for row in rows:
+        locations[row['city_name']] = {'google_place_id': row['city_id'], 'lat': row['latitude'], 'lng': row['longitude']}
+        yield row
+
+def get_destination_data(workers=CITY_WORKERS):
+    """
+    Stream one details row per city
+    """
+    return stream_units(crawlJournal.run('destinations').units(fetch_city), CITIES, workers)
+
+def main(workers=CITY_WORKERS, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, sink=STREAM_SINK):
+    """
+    Load city details and return {city: {'google_place_id', 'lat', 'lng'}} for
+    the cities that resolved, which downstream tables take as their input
+    """
+    locations = {}
+    crawl = crawlJournal.run('destinations')
+    rows = located(get_destination_data(workers), locations)
+    
+    if sink == 'parquet':
+        total = stream_to_sink(rows, parquet_sink('DESTINATIONS'), batch_size, flush_interval, table='DESTINATIONS')
+        crawl.finish()
+        print(f"Wrote {total} destinations to Parquet")
+        return locations
+    
+    try:
+        with get_pool().connection() as conn:
+            ensure_table(conn, 'DESTINATIONS', DESTINATIONS_DDL)
+            
+            total = stream_to_sink(rows, lambda df: load_dataframe(conn, df, 'DESTINATIONS', ['city_id']), batch_size, flush_interval, table='DESTINATIONS')
+            crawl.finish()
+            
+            if not total:
+                print("No destinations to load")
         
     except Exception as e:
         print(f"Error connecting to Snowflake: {e}")
+        raise
+    
+    return locations
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args("Load Google Places city details into Snowflake")
+    with metrics.profiled('destinations'):
+        main(workers=args.workers, batch_size=args.batch_size, flush_interval=args.flush_interval, sink=args.sink)
\ No newline at end of file
@@ -0,0 +1,71 @@
+from concurrent.futures import ThreadPoolExecutor
+import time
+import os
+from httpClient import http_get
+import metrics
+
+DETAIL_CONCURRENCY = int(os.getenv('DETAIL_CONCURRENCY', '8'))
+
+def fetch_json(provider, url, headers=None, params=None):
+    response = http_get(provider, url, headers=headers, params=params)
+    response.raise_for_status()
+    return response.json()
+
+def fetch_details(detail_requests, provider, max_workers=DETAIL_CONCURRENCY, crawl=None, city=''):
+    """
+    Fetch detail payloads concurrently with a bounded thread pool.
+    Each request is a dict with 'url' and optional 'headers' / 'params', and all of
+    them go through the given provider's pooled session and rate limiter.
+    Results come back in the same order as the requests; a failed request yields {}.
+    With a crawlJournal run, payloads are journaled per item and replayed on resume
+    """
+    def fetch_one(detail_request):
+        try:
+            return fetch_json(
+                provider,
+                detail_request['url'],
+                headers=detail_request.get('headers'),
+                params=detail_request.get('params')
+            )
+        except Exception as e:
+            print(f"Error fetching details from {detail_request['url']}: {e}")
+            metrics.increment('detail_errors_total', provider=provider, error=type(e).__name__)
+            return {}
+
+    if crawl is not None:
+        fetch_one = crawl.items(provider, city, fetch_one)
+
+    if not detail_requests:
+        return []
+
+    metrics.count_rows('details', len(detail_requests), provider=provider)
+    workers = max(1, min(max_workers, len(detail_requests)))
+    with metrics.stage_timer('details', provider=provider):
+        if workers == 1:
+            return [fetch_one(detail_request) for detail_request in detail_requests]
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(fetch_one, detail_requests))
+
+def main():
+    import httpClient
+    from mockApi import start_mock_api
+
+    server = start_mock_api(latency=0.05, jitter=0)
+    httpClient.API_BASE_URL = server.url
+    # Route searches are never cached, so every run goes out to the mock
+    search_url = "https://api.rome2rio.com/api/1.5/json/Search"
+    detail_requests = [{'url': search_url, 'params': {'oName': f"City {i}", 'dName': 'Chicago'}} for i in range(50)]
+    expected = None
+
+    for workers in [1, 2, 4, 8, 16]:
+        start = time.perf_counter()
+        results = fetch_details(detail_requests, 'mock', max_workers=workers)
+        elapsed = time.perf_counter() - start
+        expected = expected or results
+        print(f"workers={workers:>2} requests={len(results)} time={elapsed:.2f}s ordered={results == expected}")
+
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
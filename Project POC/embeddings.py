@@ -0,0 +1,273 @@
+import threading
+import tempfile
+import sqlite3
+import hashlib
+import zlib
+import time
+import os
+import re
+import numpy as np
+from dotenv import load_dotenv
+from httpClient import http_post
+from cityScheduler import stream_units
+
+load_dotenv()
+
+OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+EMBEDDER = os.getenv('EMBEDDER', 'openai')
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'text-embedding-3-small')
+EMBED_BATCH_TOKENS = int(os.getenv('EMBED_BATCH_TOKENS', '8000'))
+EMBED_BATCH_SIZE = int(os.getenv('EMBED_BATCH_SIZE', '256'))
+EMBED_CONCURRENCY = int(os.getenv('EMBED_CONCURRENCY', '4'))
+EMBEDDING_CACHE_PATH = os.getenv('EMBEDDING_CACHE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'embeddings.sqlite'))
+
+# Longest input the embedding models accept
+MAX_INPUT_TOKENS = 8191
+
+# Columns whose non-empty values make up each entity's text, in order
+EMBED_TEXT_COLUMNS = {
+    'attractions': ['name', 'category', 'subcategory', 'city', 'description'],
+    'restaurants': ['name', 'cuisine_types', 'price_level', 'city', 'address'],
+    'hotels': ['name', 'amenities', 'price_level', 'city', 'address']
+}
+
+EMBED_KEYS = {'attractions': 'attraction_id', 'restaurants': 'restaurant_id', 'hotels': 'hotel_id'}
+
+def tokenizer():
+    """
+    The models' cl100k_base encoding when tiktoken is installed, otherwise None
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    return tiktoken.get_encoding('cl100k_base')
+
+def estimate_tokens(text):
+    """
+    Token count for batching: tiktoken when installed, otherwise about four
+    characters per token, which errs high for English
+    """
+    encoding = tokenizer()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text))
+
+def truncate(text, max_tokens=MAX_INPUT_TOKENS):
+    """
+    Cut text to max_tokens: by tokens when tiktoken is installed, otherwise at
+    four characters per token
+    """
+    encoding = tokenizer()
+    if encoding is None:
+        return text if len(text) // 4 + 1 <= max_tokens else text[:max_tokens * 4]
+    tokens = encoding.encode(text)
+    return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+
+def content_hash(model, text):
+    return hashlib.sha256(f"{model}\0{text}".encode()).hexdigest()
+
+def token_batches(items, max_tokens=EMBED_BATCH_TOKENS, max_items=EMBED_BATCH_SIZE):
+    """
+    Group (key, text) pairs into batches of at most max_tokens estimated
+    tokens and max_items inputs
+    """
+    batch, tokens = [], 0
+    for key, text in items:
+        cost = estimate_tokens(text)
+        if batch and (tokens + cost > max_tokens or len(batch) >= max_items):
+            yield batch
+            batch, tokens = [], 0
+        batch.append((key, text))
+        tokens += cost
+    if batch:
+        yield batch
+
+class EmbeddingCache:
+    """
+    SQLite store of vectors keyed by content hash (model + text), so a text
+    is embedded once however many runs or entities it appears in
+    """
+    def __init__(self, path=EMBEDDING_CACHE_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS embeddings (
+            content_hash TEXT PRIMARY KEY,
+            dimensions INTEGER,
+            vector BLOB,
+            created_at REAL
+        )
+        """)
+        self.conn.commit()
+
+    def get_many(self, hashes):
+        found = {}
+        hashes = list(hashes)
+        with self.lock:
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                placeholders = ', '.join('?' for _ in chunk)
+                for content_hash, vector in self.conn.execute(
+                    f"SELECT content_hash, vector FROM embeddings WHERE content_hash IN ({placeholders})", chunk
+                ):
+                    found[content_hash] = np.frombuffer(vector, dtype=np.float32)
+        return found
+
+    def put_many(self, pairs):
+        now = time.time()
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)",
+                [(content_hash, len(vector), np.asarray(vector, dtype=np.float32).tobytes(), now) for content_hash, vector in pairs]
+            )
+            self.conn.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+class OpenAIEmbedder:
+    url = "https://api.openai.com/v1/embeddings"
+
+    def __init__(self, model=EMBEDDING_MODEL, dimensions=None):
+        self.model = model
+        self.dimensions = dimensions
+        self.name = f"openai:{model}:{dimensions or 'default'}"
+
+    def embed(self, texts):
+        body = {'model': self.model, 'input': texts}
+        if self.dimensions:
+            body['dimensions'] = self.dimensions
+
+        response = http_post('openai', self.url, headers={"Authorization": f"Bearer {OPENAI_API_KEY}"}, json=body)
+        response.raise_for_status()
+        data = sorted(response.json()['data'], key=lambda item: item['index'])
+        return np.array([item['embedding'] for item in data], dtype=np.float32)
+
+class HashingEmbedder:
+    """
+    Offline embedder: signed feature hashing of words and word pairs into a
+    fixed number of dimensions, L2-normalized. Similar texts share features,
+    which is enough to exercise the pipeline and index. `latency` seconds are
+    slept per batch to stand in for a remote API
+    """
+    def __init__(self, dimensions=256, latency=0.0):
+        self.dimensions = dimensions
+        self.latency = latency
+        self.name = f"hashing:{dimensions}"
+
+    def embed(self, texts):
+        if self.latency:
+            time.sleep(self.latency)
+
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = re.findall(r"\w+", text.lower())
+            for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                h = zlib.crc32(feature.encode())
+                vectors[row, h % self.dimensions] += 1.0 if h & 0x80000000 else -1.0
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+def get_embedder(name=EMBEDDER):
+    if name == 'hashing':
+        return HashingEmbedder()
+    return OpenAIEmbedder()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache()
+        return _cache
+
+def embed_texts(texts, embedder=None, cache=None, max_tokens=EMBED_BATCH_TOKENS, workers=EMBED_CONCURRENCY):
+    """
+    Vectors for `texts` (one row each, in order). Cached and repeated texts
+    are looked up by content hash; the rest are sent in token-budgeted batches
+    with at most `workers` requests in flight, and cached as each batch returns.
+    Blank texts are never sent (the API rejects empty input) and get a zero vector
+    """
+    embedder = embedder if embedder is not None else get_embedder()
+    cache = cache if cache is not None else get_cache()
+
+    texts = [truncate(text or '') for text in texts]
+    hashes = [content_hash(embedder.name, text) if text.strip() else None for text in texts]
+    vectors = cache.get_many(set(hashes) - {None})
+
+    missing = {}
+    for content_hash_value, text in zip(hashes, texts):
+        if content_hash_value is not None and content_hash_value not in vectors:
+            missing.setdefault(content_hash_value, text)
+
+    def embed_batch(batch):
+        embedded = embedder.embed([text for _, text in batch])
+        pairs = [(content_hash_value, vector) for (content_hash_value, _), vector in zip(batch, embedded)]
+        cache.put_many(pairs)
+        return pairs
+
+    if missing:
+        for content_hash_value, vector in stream_units(embed_batch, token_batches(missing.items(), max_tokens), workers):
+            vectors[content_hash_value] = vector
+
+    dimensions = next((len(vector) for vector in vectors.values()), None) or getattr(embedder, 'dimensions', None) or 0
+    if not texts:
+        return np.empty((0, dimensions), dtype=np.float32)
+
+    blank = np.zeros(dimensions, dtype=np.float32)
+    return np.vstack([blank if content_hash_value is None else vectors[content_hash_value] for content_hash_value in hashes])
+
+def entity_texts(df, table):
+    """
+    The text embedded for each row of a hotels / restaurants / attractions frame
+    """
+    columns = [column for column in EMBED_TEXT_COLUMNS[table.lower()] if column in df.columns]
+    values = df[columns].fillna('').astype(str).to_numpy().tolist()
+    return [' | '.join(value for value in row if value) for row in values]
+
+def embed_frame(df, table, embedder=None, cache=None, workers=EMBED_CONCURRENCY):
+    """
+    (ids, vectors) for a table's rows
+    """
+    ids = df[EMBED_KEYS[table.lower()]].astype(str).tolist()
+    return ids, embed_texts(entity_texts(df, table), embedder, cache, workers=workers)
+
+def synthetic_descriptions(n, seed=0):
+    rng = np.random.default_rng(seed)
+    words = ("museum gallery waterfront quiet park garden historic tour bridge harbor view family kids art modern "
+             "science history music theater night market food street walk river island tower observation deck").split()
+    return [' '.join(rng.choice(words, size=int(rng.integers(8, 40)))) for _ in range(n)]
+
+def main():
+    n = 5000
+    texts = synthetic_descriptions(n)
+    texts += texts[:500]
+    embedder = HashingEmbedder(latency=0.05)
+    batches = list(token_batches(((i, text) for i, text in enumerate(set(texts))), EMBED_BATCH_TOKENS))
+    print(f"{len(texts)} texts ({len(set(texts))} distinct) -> {len(batches)} batches of up to {EMBED_BATCH_TOKENS} tokens, "
+          f"50 ms simulated latency per request")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for workers in [1, EMBED_CONCURRENCY, EMBED_CONCURRENCY * 2]:
+            cache = EmbeddingCache(os.path.join(directory, f"cold-{workers}.sqlite"))
+            start = time.perf_counter()
+            vectors = embed_texts(texts, embedder, cache, workers=workers)
+            print(f"Cold cache, {workers} in flight: {time.perf_counter() - start:.2f} s ({len(cache)} vectors cached)")
+
+        start = time.perf_counter()
+        again = embed_texts(texts, embedder, cache, workers=workers)
+        print(f"Warm cache: {(time.perf_counter() - start) * 1000:.0f} ms, identical: {np.array_equal(vectors, again)}")
+
+        start = time.perf_counter()
+        embed_texts(texts[:100] + synthetic_descriptions(50, seed=1), embedder, cache, workers=workers)
+        print(f"100 unchanged + 50 new texts: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+from itertools import accumulate, chain
+import threading
+import numpy as np
+import pandas as pd
+import sys
+import time
+
+# Low-cardinality text columns stored as integer codes into a shared vocabulary
+CATEGORICAL_COLUMNS = ['city', 'category', 'price_level', 'currency']
+
+# Comma-joined columns stored as lists of interned term ids
+MULTI_VALUED_COLUMNS = {
+    'amenities': ',',
+    'cuisine_types': ',',
+    'subcategory': ',',
+    'transactions': ','
+}
+
+# Float columns that keep double precision; the rest are stored as float32
+EXACT_FLOAT_COLUMNS = {'latitude', 'longitude', 'min_price'}
+
+def code_dtype(size):
+    """
+    Smallest signed integer type holding ids below `size` (and -1 for missing)
+    """
+    for dtype in (np.int8, np.int16, np.int32):
+        if size <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+def is_missing(value):
+    return value is None or value == '' or (value.__class__ is float and value != value)
+
+class Vocabulary:
+    """
+    Interned strings: each distinct term gets the next integer id. Shared by
+    every table that has the same column, so ids compare across entities
+    """
+    def __init__(self, terms=()):
+        self.terms = []
+        self.ids = {}
+        self.lock = threading.Lock()
+        for term in terms:
+            self.intern(term)
+
+    def intern(self, term):
+        with self.lock:
+            term_id = self.ids.get(term)
+            if term_id is None:
+                term_id = self.ids[term] = len(self.terms)
+                self.terms.append(term)
+            return term_id
+
+    def encode(self, values):
+        """
+        Ids for a sequence of terms, -1 where a value is missing or empty
+        """
+        values = pd.Series(values, dtype=object)
+        values[values.map(is_missing)] = None
+        codes, uniques = pd.factorize(values, use_na_sentinel=True)
+        mapping = np.array([self.intern(str(term)) for term in uniques] + [-1], dtype=np.int64)
+        return mapping[codes]
+
+    def id(self, term):
+        return self.ids.get(term, -1)
+
+    def __len__(self):
+        return len(self.terms)
+
+    @property
+    def nbytes(self):
+        return sys.getsizeof(self.terms) + sys.getsizeof(self.ids) + sum(sys.getsizeof(term) for term in self.terms)
+
+_vocabularies = {}
+_vocabularies_lock = threading.Lock()
+
+def vocabulary(name):
+    """
+    The process-wide vocabulary for a column name
+    """
+    with _vocabularies_lock:
+        if name not in _vocabularies:
+            _vocabularies[name] = Vocabulary()
+        return _vocabularies[name]
+
+class CategoricalColumn:
+    def __init__(self, values, vocab):
+        self.vocab = vocab
+        self.codes = vocab.encode(values).astype(code_dtype(len(vocab)))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, position):
+        code = self.codes[position]
+        return None if code < 0 else self.vocab.terms[code]
+
+    def values(self):
+        terms = np.asarray(self.vocab.terms + [None], dtype=object)
+        return terms[self.codes]
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes
+
+class MultiValueColumn:
+    """
+    Per-row lists of term ids in CSR form: row i holds ids[offsets[i]:offsets[i + 1]]
+    """
+    def __init__(self, values, vocab, sep=','):
+        self.vocab = vocab
+        self.sep = sep
+
+        lists = [
+            value if value.__class__ is list else [] if is_missing(value) else str(value).split(sep)
+            for value in values
+        ]
+        self.offsets = np.fromiter(accumulate(chain([0], map(len, lists))), dtype=np.int64, count=len(lists) + 1)
+        ids = vocab.encode(list(chain.from_iterable(lists))) if self.offsets[-1] else np.empty(0, dtype=np.int64)
+        self.ids = ids.astype(code_dtype(len(vocab)))
+
+        if self.offsets[-1] <= np.iinfo(np.int32).max:
+            self.offsets = self.offsets.astype(np.int32)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def row_ids(self, position):
+        return self.ids[self.offsets[position]:self.offsets[position + 1]]
+
+    def __getitem__(self, position):
+        return [self.vocab.terms[term_id] for term_id in self.row_ids(position)]
+
+    def values(self):
+        terms = self.vocab.terms
+        ids = self.ids.tolist()
+        offsets = self.offsets.tolist()
+        return np.asarray([self.sep.join([terms[term_id] for term_id in ids[start:end]]) for start, end in zip(offsets, offsets[1:])], dtype=object)
+
+    @property
+    def nbytes(self):
+        return self.offsets.nbytes + self.ids.nbytes
+
+class StringColumn:
+    """
+    Mostly-unique text (names, urls, addresses) as one UTF-8 buffer plus
+    offsets, instead of a Python str object per value
+    """
+    def __init__(self, values):
+        encoded = [b'' if is_missing(value) else str(value).encode() for value in values]
+        self.offsets = np.fromiter(accumulate(chain([0], map(len, encoded))), dtype=np.int64, count=len(encoded) + 1)
+        self.buffer = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, position):
+        return self.buffer[self.offsets[position]:self.offsets[position + 1]].tobytes().decode()
+
+    def values(self):
+        data = self.buffer.tobytes()
+        offsets = self.offsets.tolist()
+        return np.asarray([data[start:end].decode() for start, end in zip(offsets, offsets[1:])], dtype=object)
+
+    @property
+    def nbytes(self):
+        return self.offsets.nbytes + self.buffer.nbytes
+
+def numeric_column(name, values):
+    values = pd.to_numeric(pd.Series(values), errors='coerce')
+    if values.dtype.kind == 'f' and name not in EXACT_FLOAT_COLUMNS:
+        return values.to_numpy(np.float32)
+    if values.dtype.kind in 'iub':
+        return pd.to_numeric(values, downcast='integer').to_numpy()
+    return values.to_numpy(np.float64)
+
+class EntityRecord:
+    """
+    Read-only view of one row; attribute access decodes that column only
+    """
+    __slots__ = ('table', 'position')
+
+    def __init__(self, table, position):
+        self.table = table
+        self.position = position
+
+    def __getattr__(self, name):
+        try:
+            column = self.table.columns[name]
+        except KeyError:
+            raise AttributeError(name) from None
+        return column[self.position]
+
+    def to_dict(self):
+        return {name: column[self.position] for name, column in self.table.columns.items()}
+
+    def __repr__(self):
+        return f"EntityRecord({self.to_dict()!r})"
+
+class EntityTable:
+    """
+    Column store for ingested hotels / restaurants / attractions: numbers in
+    NumPy arrays (float32 where precision allows, downcast integers),
+    CATEGORICAL_COLUMNS as codes, MULTI_VALUED_COLUMNS as interned id lists
+    and other text as UTF-8 buffers. Vocabularies are shared across tables
+    """
+    def __init__(self, columns, key=None):
+        self.columns = columns
+        self.key = key.lower() if key else None
+        self.index = None
+
+    @classmethod
+    def from_frame(cls, df, key=None):
+        df = df.infer_objects()
+        columns = {}
+        for name in df.columns:
+            values = df[name]
+            lowered = name.lower()
+            if lowered in CATEGORICAL_COLUMNS:
+                columns[lowered] = CategoricalColumn(values.tolist(), vocabulary(lowered))
+            elif lowered in MULTI_VALUED_COLUMNS:
+                columns[lowered] = MultiValueColumn(values.tolist(), vocabulary(lowered), MULTI_VALUED_COLUMNS[lowered])
+            elif values.dtype.kind in 'iufb':
+                columns[lowered] = numeric_column(lowered, values)
+            elif values.dtype.kind == 'M':
+                columns[lowered] = values.to_numpy()
+            else:
+                columns[lowered] = StringColumn(values.tolist())
+        return cls(columns, key)
+
+    @classmethod
+    def from_warehouse(cls, conn, table, key=None):
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"SELECT * FROM {table}")
+            names = [column[0] for column in cursor.description]
+            df = pd.DataFrame(cursor.fetchall(), columns=names)
+        finally:
+            cursor.close()
+        return cls.from_frame(df, key)
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def __getitem__(self, position):
+        return EntityRecord(self, position)
+
+    def __iter__(self):
+        return (EntityRecord(self, position) for position in range(len(self)))
+
+    def position(self, key_value):
+        """
+        Row position of a key value, or -1
+        """
+        if self.index is None:
+            self.index = {value: position for position, value in enumerate(self.columns[self.key].values())}
+        return self.index.get(key_value, -1)
+
+    def get(self, key_value):
+        position = self.position(key_value)
+        return None if position < 0 else EntityRecord(self, position)
+
+    def column(self, name):
+        """
+        A column decoded to a NumPy array
+        """
+        column = self.columns[name]
+        return column if isinstance(column, np.ndarray) else column.values()
+
+    def to_frame(self):
+        return pd.DataFrame({name: self.column(name) for name in self.columns})
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self.columns.values())
+
+def synthetic_hotels(n, seed=0):
+    """
+    Hotel rows as the fetchers produce them: an object-dtype frame of
+    separately allocated strings, like parsed JSON
+    """
+    rng = np.random.default_rng(seed)
+    cities = ["New York", "San Francisco", "Chicago", "Seattle", "Las Vegas", "Los Angeles"]
+    facilities = ["Free WiFi", "Parking", "Pool", "Fitness center", "Restaurant", "Bar", "Spa", "Airport shuttle",
+                  "Non-smoking rooms", "Room service", "24-hour front desk", "Pet friendly"]
+
+    def strings(values):
+        return [str(value) for value in values]
+
+    # Each facility present with probability 1/2; copied per row so every
+    # value is its own object
+    combinations = [','.join(facility for bit, facility in enumerate(facilities) if mask >> bit & 1) for mask in range(2 ** len(facilities))]
+    amenities = [(combinations[mask] + ' ')[:-1] for mask in rng.integers(0, 2 ** len(facilities), n)]
+
+    return pd.DataFrame({
+        'hotel_id': strings(rng.permutation(n) + 100000),
+        'city': strings(rng.choice(cities, n)),
+        'name': [f"Hotel {i}" for i in range(n)],
+        'address': [f"{i} Main Street" for i in range(n)],
+        'latitude': (40.7 + rng.random(n)).astype(object),
+        'longitude': (-74.0 + rng.random(n)).astype(object),
+        'star_rating': rng.integers(1, 6, n).astype(float).astype(object),
+        'review_score': (rng.integers(50, 100, n) / 10).astype(object),
+        'review_count': rng.integers(0, 5000, n).astype(object),
+        'price_level': strings(rng.choice(['$', '$$', '$$$', '$$$$'], n)),
+        'min_price': (rng.random(n) * 500).round(2).astype(object),
+        'currency': strings(np.full(n, 'USD')),
+        'url': [f"https://www.booking.com/hotel/us/hotel-{i}.html" for i in range(n)],
+        'checkin_time': strings(rng.choice(['14:00', '15:00', '16:00'], n)),
+        'amenities': amenities
+    }, dtype=object)
+
+def main():
+    n = 1000000
+
+    start = time.perf_counter()
+    df = synthetic_hotels(n)
+    print(f"Generated {n} hotel rows in {time.perf_counter() - start:.1f} s")
+    baseline = df.memory_usage(deep=True).sum()
+
+    start = time.perf_counter()
+    table = EntityTable.from_frame(df, key='hotel_id')
+    print(f"Encoded in {time.perf_counter() - start:.1f} s")
+
+    vocabularies = sum(vocab.nbytes for vocab in _vocabularies.values())
+    compact = table.nbytes + vocabularies
+    print(f"object DataFrame: {baseline / 2 ** 20:,.0f} MiB")
+    print(f"EntityTable: {compact / 2 ** 20:,.0f} MiB ({baseline / compact:.1f}x smaller)")
+    for name, column in table.columns.items():
+        print(f"  {name}: {column.nbytes / 2 ** 20:,.1f} MiB")
+
+    record = table.get('100000')
+    print(f"Lookup by key: {record.name}, {record.city}, {record.amenities}")
+
+if __name__ == "__main__":
+    main()
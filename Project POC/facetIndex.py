@@ -0,0 +1,311 @@
+import threading
+import numpy as np
+import pandas as pd
+import json
+import time
+import os
+
+FACET_INDEX_DIR = os.getenv('FACET_INDEX_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'facets'))
+
+# Table -> {facet column: separator for comma-joined columns, None for single values}
+TABLE_FACETS = {
+    'hotels': {'amenities': ',', 'city': None, 'price_level': None, 'currency': None, 'is_free_cancellable': None},
+    'restaurants': {'cuisine_types': ',', 'transactions': ',', 'city': None, 'price_level': None, 'is_closed': None},
+    'attractions': {'subcategory': ',', 'category': None, 'city': None, 'price_level': None}
+}
+
+TABLE_KEYS = {'hotels': 'hotel_id', 'restaurants': 'restaurant_id', 'attractions': 'attraction_id'}
+
+def popcount(words):
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(words).sum())
+    return int(np.unpackbits(words.view(np.uint8)).sum())
+
+def term_value(value):
+    """
+    Facet values are compared as text, so 1, '1' and True all match a flag
+    """
+    if isinstance(value, (bool, np.bool_)):
+        return str(int(value))
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return str(int(value))
+    return str(value)
+
+class FacetIndex:
+    """
+    Inverted index from (facet, value) to a bitset over entity positions.
+
+    Every entity id gets a fixed position; each facet value owns one row of
+    a 2-D uint64 array with bit p set when entity p has that value, so AND /
+    OR / NOT are word-wise NumPy operations over all entities at once. Rows
+    and words grow by doubling as values and entities arrive. Queries are
+    nested tuples:
+
+        ('and', ('amenities', 'Pool'), ('amenities', 'Parking'),
+                ('is_free_cancellable', 1), ('not', ('city', 'Las Vegas')))
+    """
+    def __init__(self, facets, key, path=None):
+        self.facets = facets
+        self.key = key
+        self.path = path
+        self.ids = []
+        self.positions = {}
+        self.keys = []
+        self.rows = {}
+        self.bits = np.zeros((8, 1), dtype=np.uint64)
+        self.alive = np.zeros(1, dtype=np.uint64)
+        self.lock = threading.RLock()
+
+    @classmethod
+    def open(cls, table, path=None):
+        """
+        The saved index for one of TABLE_FACETS' tables, or an empty one
+        """
+        path = path or os.path.join(FACET_INDEX_DIR, f"{table.lower()}.npz")
+        if os.path.exists(path):
+            return cls.load(path)
+        return cls(TABLE_FACETS[table.lower()], TABLE_KEYS[table.lower()], path)
+
+    @classmethod
+    def from_warehouse(cls, conn, table):
+        index = cls(TABLE_FACETS[table.lower()], TABLE_KEYS[table.lower()])
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"SELECT {', '.join([index.key] + list(index.facets))} FROM {table}")
+            df = pd.DataFrame(cursor.fetchall(), columns=[index.key] + list(index.facets))
+        finally:
+            cursor.close()
+        index.add_frame(df)
+        return index
+
+    def reserve(self, rows, entities):
+        words = (entities + 63) // 64
+        if rows > self.bits.shape[0] or words > self.bits.shape[1]:
+            # Only the dimension that ran out grows, each by doubling on its own
+            new_rows = self.bits.shape[0] if rows <= self.bits.shape[0] else max(rows, self.bits.shape[0] * 2)
+            new_words = self.bits.shape[1] if words <= self.bits.shape[1] else max(words, self.bits.shape[1] * 2)
+            grown = np.zeros((new_rows, new_words), dtype=np.uint64)
+            grown[:self.bits.shape[0], :self.bits.shape[1]] = self.bits
+            self.bits = grown
+        if words > len(self.alive):
+            self.alive = np.concatenate([self.alive, np.zeros(self.bits.shape[1] - len(self.alive), dtype=np.uint64)])
+
+    def row(self, facet, value):
+        key = (facet, term_value(value))
+        row = self.rows.get(key)
+        if row is None:
+            row = self.rows[key] = len(self.keys)
+            self.keys.append(key)
+            self.reserve(len(self.keys), len(self.ids))
+        return row
+
+    def assign(self, entity_ids):
+        """
+        Positions for entity ids, allocating new ones at the end. Existing
+        entities have their old facet bits cleared so the new row replaces them
+        """
+        positions = np.empty(len(entity_ids), dtype=np.int64)
+        existing = []
+
+        for i, entity_id in enumerate(entity_ids):
+            position = self.positions.get(entity_id)
+            if position is None:
+                position = self.positions[entity_id] = len(self.ids)
+                self.ids.append(entity_id)
+            else:
+                existing.append(position)
+            positions[i] = position
+
+        self.reserve(len(self.keys), len(self.ids))
+        if existing:
+            self.clear(np.asarray(existing, dtype=np.int64))
+
+        words, masks = positions >> 6, np.left_shift(np.uint64(1), (positions & 63).astype(np.uint64))
+        np.bitwise_or.at(self.alive, words, masks)
+        return positions
+
+    def clear(self, positions):
+        words, masks = positions >> 6, ~np.left_shift(np.uint64(1), (positions & 63).astype(np.uint64))
+        for word, mask in zip(words, masks):
+            self.bits[:, word] &= mask
+
+    def add_frame(self, df):
+        """
+        Index (or re-index) the rows of a frame holding the key column and any
+        of the facet columns
+        """
+        if df.empty:
+            return
+
+        with self.lock:
+            positions = self.assign([str(entity_id) for entity_id in df[self.key]])
+
+            for facet, sep in self.facets.items():
+                if facet not in df.columns:
+                    continue
+
+                values = df[facet].tolist()
+                if sep:
+                    lists = [value.split(sep) if isinstance(value, str) and value else [] for value in values]
+                    owners = np.repeat(positions, [len(terms) for terms in lists])
+                    terms = [term for terms in lists for term in terms]
+                else:
+                    present = [i for i, value in enumerate(values) if pd.notna(value) and value != '']
+                    owners = positions[present]
+                    terms = [values[i] for i in present]
+
+                if not terms:
+                    continue
+
+                codes, uniques = pd.factorize(pd.Series(terms, dtype=object))
+                rows = np.array([self.row(facet, term) for term in uniques], dtype=np.int64)[codes]
+                np.bitwise_or.at(self.bits, (rows, owners >> 6), np.left_shift(np.uint64(1), (owners & 63).astype(np.uint64)))
+
+    def add(self, entity_id, facets):
+        """
+        Index one entity from {facet: value or list of values}
+        """
+        row = {self.key: entity_id}
+        for facet, values in facets.items():
+            sep = self.facets.get(facet)
+            row[facet] = sep.join(map(str, values)) if sep and isinstance(values, (list, tuple, set)) else values
+        self.add_frame(pd.DataFrame([row]))
+
+    def remove(self, entity_ids):
+        with self.lock:
+            positions = np.asarray([self.positions[str(entity_id)] for entity_id in entity_ids if str(entity_id) in self.positions], dtype=np.int64)
+            if len(positions):
+                self.clear(positions)
+                words, masks = positions >> 6, ~np.left_shift(np.uint64(1), (positions & 63).astype(np.uint64))
+                for word, mask in zip(words, masks):
+                    self.alive[word] &= mask
+
+    def evaluate(self, query):
+        """
+        Bitset (one uint64 word per 64 positions) of the entities matching query
+        """
+        words = self.alive.shape[0]
+        op = query[0]
+
+        if op == 'and':
+            result = self.alive.copy()
+            for part in query[1:]:
+                result &= self.evaluate(part)
+            return result
+        if op == 'or':
+            result = np.zeros(words, dtype=np.uint64)
+            for part in query[1:]:
+                result |= self.evaluate(part)
+            return result
+        if op == 'not':
+            return self.alive & ~self.evaluate(query[1])
+
+        facet, value = query
+        row = self.rows.get((facet, term_value(value)))
+        if row is None:
+            return np.zeros(words, dtype=np.uint64)
+        return self.bits[row, :words] & self.alive
+
+    def match_positions(self, query):
+        bitset = self.evaluate(query)
+        return np.flatnonzero(np.unpackbits(bitset.view(np.uint8), bitorder='little'))
+
+    def query(self, query):
+        """
+        Ids of the matching entities, in the order they were first indexed
+        """
+        ids = self.ids
+        return [ids[position] for position in self.match_positions(query)]
+
+    def count(self, query):
+        return popcount(self.evaluate(query))
+
+    def values(self, facet):
+        """
+        Each indexed value of a facet with its entity count, most common first
+        """
+        counts = {value: popcount(self.bits[row] & self.alive) for (name, value), row in self.rows.items() if name == facet}
+        return dict(sorted(counts.items(), key=lambda item: -item[1]))
+
+    def __len__(self):
+        return popcount(self.alive)
+
+    def save(self, path=None):
+        path = path or self.path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self.lock:
+            words = (len(self.ids) + 63) // 64
+            temp_path = f"{path}.tmp.npz"
+            np.savez_compressed(
+                temp_path,
+                bits=self.bits[:len(self.keys), :words],
+                alive=self.alive[:words],
+                meta=np.asarray(json.dumps({'facets': self.facets, 'key': self.key, 'ids': self.ids, 'keys': self.keys}))
+            )
+            os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path, allow_pickle=False)
+        meta = json.loads(str(data['meta']))
+        index = cls(meta['facets'], meta['key'], path)
+        index.ids = meta['ids']
+        index.positions = {entity_id: position for position, entity_id in enumerate(index.ids)}
+        index.keys = [tuple(key) for key in meta['keys']]
+        index.rows = {key: row for row, key in enumerate(index.keys)}
+        index.reserve(max(len(index.keys), 1), max(len(index.ids), 1))
+        index.bits[:data['bits'].shape[0], :data['bits'].shape[1]] = data['bits']
+        index.alive[:len(data['alive'])] = data['alive']
+        return index
+
+def indexed(flush, facets):
+    """
+    Wrap a stream flush so every flushed batch is also added to `facets`
+    """
+    def flush_and_index(df):
+        flush(df)
+        facets.add_frame(df)
+
+    return flush_and_index
+
+def main():
+    from entityStore import synthetic_hotels
+
+    n = 1000000
+    df = synthetic_hotels(n)
+    df['is_free_cancellable'] = np.random.default_rng(1).integers(0, 2, n)
+
+    index = FacetIndex(TABLE_FACETS['hotels'], 'hotel_id')
+    start = time.perf_counter()
+    for batch_start in range(0, n, 100000):
+        index.add_frame(df.iloc[batch_start:batch_start + 100000])
+    print(f"Indexed {n} hotels in {time.perf_counter() - start:.1f} s ({index.bits.nbytes / 2 ** 20:.0f} MiB of bitsets)")
+
+    queries = [
+        ("pool AND parking AND free cancellation",
+         ('and', ('amenities', 'Pool'), ('amenities', 'Parking'), ('is_free_cancellable', 1)),
+         lambda: df['amenities'].str.contains('Pool', regex=False) & df['amenities'].str.contains('Parking', regex=False) & (df['is_free_cancellable'] == 1)),
+        ("(spa OR bar) AND NOT Las Vegas",
+         ('and', ('or', ('amenities', 'Spa'), ('amenities', 'Bar')), ('not', ('city', 'Las Vegas'))),
+         lambda: (df['amenities'].str.contains('Spa', regex=False) | df['amenities'].str.contains('Bar', regex=False)) & (df['city'] != 'Las Vegas'))
+    ]
+
+    for label, query, scan in queries:
+        start = time.perf_counter()
+        for _ in range(20):
+            count = index.count(query)
+        index_elapsed = (time.perf_counter() - start) / 20
+
+        start = time.perf_counter()
+        expected = int(scan().sum())
+        scan_elapsed = time.perf_counter() - start
+
+        print(f"{label}: {count} matches, bitset {index_elapsed * 1000:.2f} ms, substring scan {scan_elapsed * 1000:.0f} ms"
+              + ("" if count == expected else f" (scan found {expected})"))
+
+    start = time.perf_counter()
+    index.add_frame(df.iloc[:1000].assign(amenities='Pool'))
+    print(f"Re-indexed 1000 updated hotels in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
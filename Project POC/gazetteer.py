@@ -0,0 +1,149 @@
+import threading
+import json
+import os
+from dotenv import load_dotenv
+from httpClient import http_get
+
+load_dotenv()
+
+RAPID_API_KEY = os.getenv('RAPID_API_KEY')
+GOOGLE_PLACES_API_KEY = os.getenv('GOOGLE_PLACES_API_KEY')
+
+GAZETTEER_PATH = os.getenv('GAZETTEER_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'gazetteer.json'))
+
+CITIES = ["New York", "San Francisco", "Chicago", "Seattle", "Las Vegas", "Los Angeles"]
+
+# Known coordinates, so the common cities never need a geocoding call
+SEED_COORDS = {
+    "New York": {"lat": 40.7128, "lng": -74.0060},
+    "San Francisco": {"lat": 37.7749, "lng": -122.4194},
+    "Chicago": {"lat": 41.8781, "lng": -87.6298},
+    "Seattle": {"lat": 47.6062, "lng": -122.3321},
+    "Las Vegas": {"lat": 36.1699, "lng": -115.1398},
+    "Los Angeles": {"lat": 34.0522, "lng": -118.2437}
+}
+
+_entries = None
+_lock = threading.RLock()
+
+def load():
+    global _entries
+    with _lock:
+        if _entries is None:
+            _entries = {}
+            if os.path.exists(GAZETTEER_PATH):
+                with open(GAZETTEER_PATH) as f:
+                    _entries = json.load(f)
+            for city, coords in SEED_COORDS.items():
+                _entries.setdefault(city, {}).setdefault('lat', coords['lat'])
+                _entries[city].setdefault('lng', coords['lng'])
+        return _entries
+
+def save():
+    with _lock:
+        os.makedirs(os.path.dirname(GAZETTEER_PATH) or '.', exist_ok=True)
+        temp_path = f"{GAZETTEER_PATH}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(_entries, f, indent=2, sort_keys=True)
+        os.replace(temp_path, GAZETTEER_PATH)
+
+def resolve_google(city_name):
+    params = {
+        'query': f"{city_name} city",
+        'type': 'locality',
+        'key': GOOGLE_PLACES_API_KEY
+    }
+    data = http_get('google_places', "https://maps.googleapis.com/maps/api/place/textsearch/json", params=params).json()
+
+    if data.get('results'):
+        result = data['results'][0]
+        location = result.get('geometry', {}).get('location', {})
+        return {
+            'google_place_id': result.get('place_id'),
+            'lat': location.get('lat'),
+            'lng': location.get('lng'),
+            'photo_reference': result.get('photos', [{}])[0].get('photo_reference', '') if 'photos' in result else ''
+        }
+    return {}
+
+def resolve_tripadvisor(city_name):
+    headers = {
+        "X-RapidAPI-Key": RAPID_API_KEY,
+        "X-RapidAPI-Host": "tripadvisor16.p.rapidapi.com"
+    }
+    params = {
+        "query": city_name,
+        "language": "en"
+    }
+    data = http_get('tripadvisor', "https://tripadvisor16.p.rapidapi.com/api/v1/attractions/searchLocation", headers=headers, params=params).json()
+
+    for result in data.get('data', []):
+        if 'locationId' in result:
+            return {'tripadvisor_location_id': result['locationId']}
+    return {}
+
+def resolve_booking(city_name):
+    headers = {
+        "X-RapidAPI-Key": RAPID_API_KEY,
+        "X-RapidAPI-Host": "booking-com.p.rapidapi.com"
+    }
+    params = {
+        "name": city_name,
+        "locale": "en-us"
+    }
+    data = http_get('booking', "https://booking-com.p.rapidapi.com/v1/hotels/locations", headers=headers, params=params).json()
+
+    for result in data if isinstance(data, list) else []:
+        if result.get('dest_type') == 'city':
+            return {'booking_dest_id': result.get('dest_id')}
+    return {}
+
+# Field -> resolver that fills it (a resolver may fill several fields at once)
+RESOLVERS = {
+    'lat': resolve_google,
+    'lng': resolve_google,
+    'google_place_id': resolve_google,
+    'photo_reference': resolve_google,
+    'tripadvisor_location_id': resolve_tripadvisor,
+    'booking_dest_id': resolve_booking
+}
+
+def get(city_name, field):
+    """
+    A city's value for `field`, resolved through the provider on first use and
+    persisted so later runs (and other scripts) reuse it. Returns None when the
+    provider has no answer
+    """
+    entries = load()
+    with _lock:
+        entry = entries.setdefault(city_name, {})
+        if entry.get(field) is not None:
+            return entry[field]
+
+    try:
+        resolved = RESOLVERS[field](city_name)
+    except Exception as e:
+        print(f"Error resolving {field} for {city_name}: {e}")
+        return None
+
+    with _lock:
+        for key, value in resolved.items():
+            if value is not None and entry.get(key) is None:
+                entry[key] = value
+        save()
+        return entry.get(field)
+
+def seed(locations):
+    """
+    Merge fields another task already fetched (city -> {field: value}), such as
+    destination coordinates and place ids, so get() returns them without a call.
+    These take precedence over what was resolved before
+    """
+    entries = load()
+    with _lock:
+        for city_name, fields in locations.items():
+            entries.setdefault(city_name, {}).update({key: value for key, value in fields.items() if value is not None})
+        save()
+
+def get_coords(city_name):
+    return get(city_name, 'lat'), get(city_name, 'lng')
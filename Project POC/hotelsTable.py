@@ -1,11 +1,19 @@
-import requests
 import json
-import pandas as pd
-import snowflake.connector
-from snowflake.connector.pandas_tools import write_pandas
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
+from warehouseLoader import load_dataframe
+from warehouse import get_pool, ensure_table
+from changeTracker import ChangeTracker
+from detailFetcher import fetch_details
+from httpClient import http_get
+import metrics
+import gazetteer
+import crawlJournal
+from pagination import paginate, page_count
+from cityScheduler import CITY_WORKERS, stream_units, parse_args
+from recordStream import BATCH_SIZE, FLUSH_INTERVAL, STREAM_SINK, stream_to_sink, parquet_sink
+from recordSchema import field, flag, joined, timestamp, frame_builder
 
 load_dotenv()
 
@@ -13,24 +21,58 @@ RAPID_API_KEY = os.getenv('RAPID_API_KEY')
 RAPID_API_HOST = "booking-com.p.rapidapi.com"
 BASE_URL = "https://booking-com.p.rapidapi.com/v1/hotels/search"
 
-SNOWFLAKE_USER = os.getenv('SNOWFLAKE_USER')
-SNOWFLAKE_PASSWORD = os.getenv('SNOWFLAKE_PASSWORD')
-SNOWFLAKE_ACCOUNT = os.getenv('SNOWFLAKE_ACCOUNT')
-SNOWFLAKE_WAREHOUSE = os.getenv('SNOWFLAKE_WAREHOUSE')
-SNOWFLAKE_DATABASE = os.getenv('SNOWFLAKE_DATABASE')
-SNOWFLAKE_SCHEMA = os.getenv('SNOWFLAKE_SCHEMA')
+tracker = ChangeTracker()
 
-CITIES = ["New York", "San Francisco", "Chicago", "Seattle", "Las Vegas", "Los Angeles"]
+HOTELS_DDL = """
+CREATE TABLE IF NOT EXISTS hotels (
+    hotel_id VARCHAR PRIMARY KEY,
+    city VARCHAR,
+    name VARCHAR,
+    address VARCHAR,
+    latitude FLOAT,
+    longitude FLOAT,
+    star_rating FLOAT,
+    review_score FLOAT,
+    review_count INTEGER,
+    price_level VARCHAR,
+    min_price FLOAT,
+    currency VARCHAR,
+    url VARCHAR,
+    image_url VARCHAR,
+    checkout_time VARCHAR,
+    checkin_time VARCHAR,
+    is_free_cancellable BOOLEAN,
+    amenities VARCHAR,
+    updated_at TIMESTAMP_NTZ,
+    row_hash VARCHAR
+)
+"""
 
-CITY_COORDS = {
-    "New York": {"lat": 40.7128, "lng": -74.0060},
-    "San Francisco": {"lat": 37.7749, "lng": -122.4194},
-    "Chicago": {"lat": 41.8781, "lng": -87.6298},
-    "Seattle": {"lat": 47.6062, "lng": -122.3321},
-    "Las Vegas": {"lat": 36.1699, "lng": -115.1398},
-    "Los Angeles": {"lat": 34.0522, "lng": -118.2437}
+# Raw {'city', 'item': search result, 'detail': hotel details} record -> row
+HOTELS_SCHEMA = {
+    'hotel_id': field('item.hotel_id', None),
+    'city': field('city'),
+    'name': field('item.hotel_name'),
+    'address': field('item.address'),
+    'latitude': field('item.latitude', 0, 'float64'),
+    'longitude': field('item.longitude', 0, 'float64'),
+    'star_rating': field('item.class', 0, 'float64'),
+    'review_score': field('item.review_score', 0, 'float64'),
+    'review_count': field('item.review_nr', 0, 'int64'),
+    'price_level': field('item.price_level'),
+    'min_price': field('item.min_total_price', 0, 'float64'),
+    'currency': field('item.currency_code', 'USD'),
+    'url': field('item.url'),
+    'image_url': field('item.main_photo_url'),
+    'checkout_time': field('detail.checkout.to'),
+    'checkin_time': field('detail.checkin.from'),
+    'is_free_cancellable': flag('item.is_free_cancellable'),
+    'amenities': joined('detail.facilities', ','),
+    'updated_at': timestamp()
 }
 
+CITIES = gazetteer.CITIES
+
 def get_hotel_details(city_name, checkin_date, checkout_date, adults=2):
     """
     Get hotel information for a specific city using Booking.com API
@@ -50,128 +92,129 @@ def get_hotel_details(city_name, checkin_date, checkout_date, adults=2):
         "order_by": "popularity",
         "checkin_date": checkin_date,
         "dest_type": "city",
-        "dest_id": city_name,
-        "page_number": "0",
+        "dest_id": gazetteer.get(city_name, 'booking_dest_id') or city_name,
         "include_adjacency": "true"
     }
     
-    if city_name in CITY_COORDS:
-        params["latitude"] = CITY_COORDS[city_name]["lat"]
-        params["longitude"] = CITY_COORDS[city_name]["lng"]
+    lat, lng = gazetteer.get_coords(city_name)
+    if lat is not None and lng is not None:
+        params["latitude"] = lat
+        params["longitude"] = lng
+    
+    crawl = crawlJournal.run('hotels')
+    
+    def fetch_page(page):
+        page_params = dict(params, page_number=str(page))
+        return http_get('booking', BASE_URL, headers=headers, params=page_params).json()
     
     try:
-        response = requests.get(BASE_URL, headers=headers, params=params)
-        data = response.json()
+        results = paginate(
+            crawl.pages('booking', city_name, fetch_page),
+            lambda payload: payload.get('result', []),
+            lambda hotel: hotel.get('hotel_id'),
+            lambda payload, page_size: page_count(payload.get('count'), page_size)
+        )
         
-        if 'result' in data:
-            hotels = []
+        if results:
+            changed = tracker.changed('hotels', results, 'hotel_id')
             
-            for hotel in data['result']:
-                hotel_id = hotel.get('hotel_id')
-                hotel_detail_url = f"https://booking-com.p.rapidapi.com/v1/hotels/details"
-                detail_params = {
-                    "hotel_id": hotel_id,
-                    "locale": "en-us"
-                }
-                
-                detail_response = requests.get(hotel_detail_url, headers=headers, params=detail_params)
-                detail_data = detail_response.json()
-                
-                hotel_info = {
-                    'hotel_id': hotel_id,
-                    'city': city_name,
-                    'name': hotel.get('hotel_name', ''),
-                    'address': hotel.get('address', ''),
-                    'latitude': hotel.get('latitude', 0),
-                    'longitude': hotel.get('longitude', 0),
-                    'star_rating': hotel.get('class', 0),
-                    'review_score': hotel.get('review_score', 0),
-                    'review_count': hotel.get('review_nr', 0),
-                    'price_level': hotel.get('price_level', ''),
-                    'min_price': hotel.get('min_total_price', 0),
-                    'currency': hotel.get('currency_code', 'USD'),
-                    'url': hotel.get('url', ''),
-                    'image_url': hotel.get('main_photo_url', ''),
-                    'checkout_time': detail_data.get('checkout', {}).get('to', ''),
-                    'checkin_time': detail_data.get('checkin', {}).get('from', ''),
-                    'is_free_cancellable': 1 if hotel.get('is_free_cancellable', False) else 0,
-                    'amenities': ','.join(detail_data.get('facilities', [])),
-                    'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            hotel_detail_url = f"https://booking-com.p.rapidapi.com/v1/hotels/details"
+            detail_requests = [
+                {
+                    'url': hotel_detail_url,
+                    'headers': headers,
+                    'params': {
+                        "hotel_id": hotel.get('hotel_id'),
+                        "locale": "en-us"
+                    }
                 }
-                
-                hotels.append(hotel_info)
+                for hotel in changed
+            ]
+            details = fetch_details(detail_requests, 'booking', crawl=crawl, city=city_name)
+            failed = [hotel.get('hotel_id') for hotel, detail_data in zip(changed, details) if not detail_data]
+            tracker.discard('hotels', failed)
+            if failed:
+                crawl.incomplete()
             
-            return hotels
+            return [
+                {'city': city_name, 'item': hotel, 'detail': detail_data}
+                for hotel, detail_data in zip(changed, details)
+            ]
     
     except Exception as e:
         print(f"Error fetching hotel data for {city_name}: {e}")
     
     return []
 
-def main():
-    all_hotels = []
-    
-    today = datetime.now()
-    checkin_date = (today.replace(day=1) + pd.DateOffset(months=1)).strftime('%Y-%m-%d')
-    checkout_date = (today.replace(day=1) + pd.DateOffset(months=1, days=2)).strftime('%Y-%m-%d')
+def fetch_city(city, checkin_date, checkout_date):
+    print(f"Processing hotels in {city}...")
+    hotels = get_hotel_details(city, checkin_date, checkout_date)
     
-    for city in CITIES:
-        print(f"Processing hotels in {city}...")
-        hotels = get_hotel_details(city, checkin_date, checkout_date)
-        
-        if hotels:
-            all_hotels.extend(hotels)
-            print(f"Found {len(hotels)} hotels in {city}")
-        else:
-            print(f"Could not retrieve hotel data for {city}")
+    if hotels:
+        print(f"Found {len(hotels)} new or changed hotels in {city}")
+    else:
+        print(f"Could not retrieve hotel data for {city}")
     
-    df = pd.DataFrame(all_hotels)
+    return hotels
+
+def replayed(rows):
+    """
+    Restore the fingerprints of journaled rows, leaving out failed detail fetches
+    """
+    tracker.remember('hotels', [row['item'] for row in rows if row['detail']], 'hotel_id')
+
+def get_hotel_data(workers=CITY_WORKERS):
+    """
+    Stream hotel records for every city, for a two-night stay from the first of next month
+    """
+    checkin = (datetime.now().replace(day=1) + timedelta(days=32)).replace(day=1)
+    checkin_date = checkin.strftime('%Y-%m-%d')
+    checkout_date = (checkin + timedelta(days=2)).strftime('%Y-%m-%d')
     
-    try:
-        conn = snowflake.connector.connect(
-            user=SNOWFLAKE_USER,
-            password=SNOWFLAKE_PASSWORD,
-            account=SNOWFLAKE_ACCOUNT,
-            warehouse=SNOWFLAKE_WAREHOUSE,
-            database=SNOWFLAKE_DATABASE,
-            schema=SNOWFLAKE_SCHEMA
-        )
+    crawl = crawlJournal.run('hotels')
+    return stream_units(crawl.units(lambda city: fetch_city(city, checkin_date, checkout_date), replayed), CITIES, workers)
 
-        cursor = conn.cursor()
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS hotels (
-            hotel_id VARCHAR PRIMARY KEY,
-            city VARCHAR,
-            name VARCHAR,
-            address VARCHAR,
-            latitude FLOAT,
-            longitude FLOAT,
-            star_rating FLOAT,
-            review_score FLOAT,
-            review_count INTEGER,
-            price_level VARCHAR,
-            min_price FLOAT,
-            currency VARCHAR,
-            url VARCHAR,
-            image_url VARCHAR,
-            checkout_time VARCHAR,
-            checkin_time VARCHAR,
-            is_free_cancellable BOOLEAN,
-            amenities VARCHAR,
-            updated_at TIMESTAMP_NTZ
-        )
-        """)
-        
-        success, num_chunks, num_rows, output = write_pandas(conn, df, 'HOTELS')
+def main(workers=CITY_WORKERS, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, sink=STREAM_SINK):
+    from facetIndex import FacetIndex, indexed
+    
+    crawl = crawlJournal.run('hotels')
+    rows = get_hotel_data(workers)
+    build = frame_builder(HOTELS_SCHEMA)
+    facets = FacetIndex.open('hotels')
+    
+    if sink == 'parquet':
+        write = parquet_sink('HOTELS')
         
-        print(f"Data loaded successfully: {success}")
-        print(f"Number of chunks: {num_chunks}")
-        print(f"Number of rows: {num_rows}")
+        def flush(df):
+            write(df)
+            tracker.commit('hotels', df['hotel_id'])
         
-        conn.close()
+        total = stream_to_sink(rows, indexed(flush, facets), batch_size, flush_interval, build, table='HOTELS')
+        facets.save()
+        crawl.finish()
+        print(f"Wrote {total} hotels to Parquet")
+        return
+    
+    try:
+        with get_pool().connection() as conn:
+            ensure_table(conn, 'HOTELS', HOTELS_DDL)
+            
+            def flush(df):
+                load_dataframe(conn, df, 'HOTELS', ['hotel_id'])
+                tracker.commit('hotels', df['hotel_id'])
+            
+            total = stream_to_sink(rows, indexed(flush, facets), batch_size, flush_interval, build, table='HOTELS')
+            facets.save()
+            crawl.finish()
+            
+            if not total:
+                print("No new or changed hotels to load")
         
     except Exception as e:
         print(f"Error connecting to Snowflake: {e}")
+        raise
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args("Load Booking.com hotels into Snowflake")
+    with metrics.profiled('hotels'):
+        main(workers=args.workers, batch_size=args.batch_size, flush_interval=args.flush_interval, sink=args.sink)
\ No newline at end of file
@@ -0,0 +1,195 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit
+import threading
+import random
+import time
+import os
+import metrics
+from responseCache import CACHE_ENABLED, get_ttl, cache_key, get_cache, to_response, conditional_headers
+
+# Requests per second and burst size for each provider. Override with
+# <PROVIDER>_RATE_LIMIT / <PROVIDER>_BURST environment variables.
+PROVIDER_LIMITS = {
+    'booking': {'rate': 5, 'burst': 5},
+    'tripadvisor': {'rate': 5, 'burst': 5},
+    'yelp': {'rate': 10, 'burst': 10},
+    'google_places': {'rate': 10, 'burst': 10},
+    'rome2rio': {'rate': 1, 'burst': 1},
+    'openweathermap': {'rate': 1, 'burst': 1},
+    'openai': {'rate': 50, 'burst': 50}
+}
+
+POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '16'))
+REQUEST_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', '30'))
+MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', '5'))
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# When set (e.g. http://127.0.0.1:8765), every provider request goes to
+# {API_BASE_URL}/{original host}{original path} instead, for mock servers
+API_BASE_URL = os.getenv('API_BASE_URL')
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens are added per second up to `capacity`.
+    acquire() blocks until a token is available. Capacity is at least one
+    token, or a fractional rate or burst could never fill the bucket
+    """
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+_sessions = {}
+_buckets = {}
+_lock = threading.Lock()
+
+def get_limit(provider):
+    limit = PROVIDER_LIMITS.get(provider, {})
+    rate = os.getenv(f"{provider.upper()}_RATE_LIMIT", limit.get('rate'))
+    burst = os.getenv(f"{provider.upper()}_BURST", limit.get('burst', rate))
+    if rate is None:
+        return None, None
+    return float(rate), float(burst)
+
+def get_session(provider):
+    """
+    Return the pooled keep-alive session for a provider, creating it on first use
+    """
+    with _lock:
+        if provider not in _sessions:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _sessions[provider] = session
+
+            rate, burst = get_limit(provider)
+            if rate:
+                _buckets[provider] = TokenBucket(rate, burst)
+
+        return _sessions[provider]
+
+def backoff_delay(attempt, response=None):
+    if response is not None:
+        retry_after = response.headers.get('Retry-After')
+        if retry_after and retry_after.isdigit():
+            return min(BACKOFF_MAX, int(retry_after))
+
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt))
+    return delay * random.uniform(0.5, 1)
+
+def http_get(provider, url, headers=None, params=None, max_retries=MAX_RETRIES):
+    """
+    GET through the provider's pooled session, waiting on its rate limiter and
+    retrying 429/5xx responses and connection errors with exponential backoff.
+    Endpoints with a TTL in responseCache.CACHE_TTLS are served from the local
+    cache while fresh and revalidated with ETag / Last-Modified once stale
+    """
+    ttl = get_ttl(url) if CACHE_ENABLED else 0
+    if not ttl:
+        return send_get(provider, url, headers, params, max_retries)
+
+    cache = get_cache()
+    key = cache_key(provider, url, params)
+    entry = cache.get(key)
+
+    if entry and entry['fresh']:
+        metrics.increment('http_cache_total', provider=provider, result='hit')
+        return to_response(entry, url)
+
+    request_headers = dict(headers or {})
+    if entry:
+        request_headers.update(conditional_headers(entry))
+
+    response = send_get(provider, url, request_headers, params, max_retries)
+
+    if entry and response.status_code == 304:
+        metrics.increment('http_cache_total', provider=provider, result='revalidated')
+        cache.touch(key, ttl)
+        return to_response(entry, url)
+
+    metrics.increment('http_cache_total', provider=provider, result='miss')
+
+    if response.status_code == 200:
+        cache.put(key, url.split('?')[0], response, ttl)
+
+    return response
+
+def send_get(provider, url, headers=None, params=None, max_retries=MAX_RETRIES):
+    return send('GET', provider, url, max_retries, headers=headers, params=params)
+
+def http_post(provider, url, headers=None, json=None, max_retries=MAX_RETRIES):
+    """
+    POST a JSON body with the same pooling, rate limiting and retries as
+    http_get; responses are never cached
+    """
+    return send('POST', provider, url, max_retries, headers=headers, json=json)
+
+def redirected(url):
+    if not API_BASE_URL:
+        return url
+    parts = urlsplit(url)
+    return f"{API_BASE_URL.rstrip('/')}/{parts.netloc}{parts.path}" + (f"?{parts.query}" if parts.query else '')
+
+def send(method, provider, url, max_retries=MAX_RETRIES, **kwargs):
+    session = get_session(provider)
+    labels = {'provider': provider, 'endpoint': metrics.endpoint(url)}
+    url = redirected(url)
+    bucket = _buckets.get(provider)
+
+    for attempt in range(max_retries + 1):
+        if bucket:
+            with metrics.timer('http_throttle_seconds', provider=provider):
+                bucket.acquire()
+
+        start = time.perf_counter()
+        try:
+            response = session.request(method, url, timeout=REQUEST_TIMEOUT, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            metrics.increment('http_errors_total', error=type(e).__name__, **labels)
+            if attempt == max_retries:
+                raise
+            delay = backoff_delay(attempt)
+            print(f"{provider} request failed ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+
+        metrics.observe('http_request_seconds', time.perf_counter() - start, **labels)
+        metrics.increment('http_responses_total', status=response.status_code, **labels)
+        metrics.increment('http_response_bytes_total', len(response.content), **labels)
+
+        if response.status_code not in RETRY_STATUSES or attempt == max_retries:
+            return response
+
+        metrics.increment('http_retries_total', **labels)
+
+        delay = backoff_delay(attempt, response)
+        print(f"{provider} returned {response.status_code}, retrying in {delay:.1f}s")
+        time.sleep(delay)
+
+def close_sessions():
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+        _buckets.clear()
@@ -0,0 +1,333 @@
+from datetime import datetime, timedelta
+import heapq
+import numpy as np
+import pandas as pd
+import time
+from spatialIndex import haversine
+from openingHours import OpeningHoursIndex
+
+DEFAULT_PREFERENCES = {
+    'rating': 1.0,          # weight of rating / 5
+    'popularity': 0.5,      # weight of log review count, scaled to the city's busiest place
+    'price': 0.5,           # penalty per price level above budget
+    'distance': 1.0,        # penalty for distance from the day's first stop, ~0.5 at 2 km
+    'weather': 1.0,         # penalty for outdoor places, times the chance of rain
+    'budget': 2,            # price level ($ count) that costs nothing
+    'interests': {},        # {term: weight}, matched against category text
+    'stops_per_day': 4,
+    'per_category': 2,      # most attractions of one category in a day
+    'meals': True           # lunch and dinner stops
+}
+
+# Category text marking a place as outdoors
+OUTDOOR_TERMS = ['park', 'garden', 'nature', 'outdoor', 'beach', 'hiking', 'trail', 'zoo', 'boat', 'tour', 'waterfront', 'market']
+
+# (start, end) hours of the windows a place must be open in
+VISIT_HOURS = (10, 18)
+LUNCH_HOURS = (12, 14)
+DINNER_HOURS = (19, 21)
+
+DISTANCE_SCALE_M = 2000
+
+def price_levels(values):
+    """
+    '$$' -> 2; missing or unknown -> 0
+    """
+    return np.fromiter((value.count('$') if isinstance(value, str) else 0 for value in values), dtype=np.float64, count=len(values))
+
+def distance_matrix(lats, lngs):
+    lats, lngs = np.asarray(lats, dtype=np.float64), np.asarray(lngs, dtype=np.float64)
+    return haversine(lats[:, None], lngs[:, None], lats[None, :], lngs[None, :])
+
+def shortest_path(matrix, start=0):
+    """
+    Visiting order for an open path from `start` through every point of a
+    distance matrix: nearest-neighbour construction, then 2-opt moves until
+    none shortens the path
+    """
+    n = len(matrix)
+    order = [start]
+    remaining = set(range(n)) - {start}
+    while remaining:
+        last = order[-1]
+        following = min(remaining, key=lambda point: matrix[last, point])
+        order.append(following)
+        remaining.remove(following)
+
+    order = np.asarray(order)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, n - 1):
+            # Reversing order[i:j + 1] swaps edges (i-1, i) and (j, j+1); the
+            # path end has no outgoing edge
+            a, b = order[i - 1], order[i]
+            c = order[i:]
+            d = np.append(order[i + 1:], -1)
+            gain = matrix[a, b] + np.where(d >= 0, matrix[c, d], 0) - matrix[a, c] - np.where(d >= 0, matrix[b, d], 0)
+            j = int(np.argmax(gain))
+            if gain[j] > 1e-6:
+                order[i:i + j + 1] = order[i:i + j + 1][::-1]
+                improved = True
+    return order
+
+class PlaceSet:
+    """
+    One kind of place in one city as flat arrays, with the parts of the
+    score that do not depend on preferences computed once
+    """
+    def __init__(self, df, key, table):
+        df = df.reset_index(drop=True)
+        self.ids = df[key].astype(str).to_numpy()
+        self.names = df['name'].fillna('').astype(str).to_numpy()
+        self.lats = pd.to_numeric(df['latitude'], errors='coerce').fillna(0).to_numpy(np.float64)
+        self.lngs = pd.to_numeric(df['longitude'], errors='coerce').fillna(0).to_numpy(np.float64)
+        self.rating = pd.to_numeric(df['rating'], errors='coerce').fillna(0).to_numpy(np.float64) / 5
+        reviews = np.log1p(pd.to_numeric(df['review_count'], errors='coerce').fillna(0).to_numpy(np.float64))
+        self.popularity = reviews / max(reviews.max(initial=0), 1)
+        self.price = price_levels(df['price_level'].tolist()) if 'price_level' in df.columns else np.zeros(len(df))
+
+        text_columns = [column for column in ['category', 'subcategory', 'cuisine_types'] if column in df.columns]
+        self.categories = df[text_columns[0]].fillna('').astype(str).to_numpy() if text_columns else np.full(len(df), '', dtype=object)
+        text = df[text_columns].fillna('').astype(str).agg(' '.join, axis=1) if text_columns else pd.Series([''] * len(df))
+        self.text = text.str.lower().tolist()
+        self.outdoor = self.matches(OUTDOOR_TERMS)
+
+        self.hours = OpeningHoursIndex.from_frame(df, table) if len(df) else None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def matches(self, terms):
+        return np.fromiter((any(term in text for term in terms) for text in self.text), dtype=bool, count=len(self.text))
+
+    def open_mask(self, day, hours):
+        """
+        Open at some point of the window on that day; places without
+        parsed hours are assumed open
+        """
+        if self.hours is None:
+            return np.ones(len(self), dtype=bool)
+        start = datetime.combine(day, datetime.min.time()) + timedelta(hours=hours[0])
+        return self.hours.open_during(start, start + timedelta(hours=hours[1] - hours[0])) | ~self.hours.known
+
+    def base_scores(self, preferences):
+        """
+        Preference score of every place before day-specific terms
+        """
+        scores = preferences['rating'] * self.rating + preferences['popularity'] * self.popularity
+        scores -= preferences['price'] * np.maximum(self.price - preferences['budget'], 0)
+        for term, weight in preferences['interests'].items():
+            scores += weight * self.matches([term.lower()])
+        return scores
+
+def distance_penalty(places, lat, lng, weight):
+    distances = haversine(lat, lng, places.lats, places.lngs)
+    return weight * distances / (distances + DISTANCE_SCALE_M)
+
+def pick(scores, allowed, k, categories=None, per_category=None, taken=()):
+    """
+    Best k allowed positions by score, popped from a heap so only the
+    winners are ordered, with at most per_category from any one category
+    (counting the categories already `taken` that day)
+    """
+    positions = np.flatnonzero(allowed)
+    heap = list(zip((-scores[positions]).tolist(), positions.tolist()))
+    heapq.heapify(heap)
+
+    chosen, per = [], {}
+    for category in taken:
+        per[category] = per.get(category, 0) + 1
+    while heap and len(chosen) < k:
+        score, position = heapq.heappop(heap)
+        if categories is not None and per_category:
+            category = categories[position]
+            if per.get(category, 0) >= per_category:
+                continue
+            per[category] = per.get(category, 0) + 1
+        chosen.append((position, -score))
+    return chosen
+
+def daily_weather(weather, city):
+    """
+    {date: chance of rain 0-1} from WEATHER_DATA rows for a city
+    """
+    if weather is None or weather.empty:
+        return {}
+    rows = weather[weather['CITY_NAME'] == city]
+    dates = pd.to_datetime(rows['TIMESTAMP']).dt.date
+    chance = pd.to_numeric(rows['PRECIPITATION_PROBABILITY'], errors='coerce').fillna(0)
+    return chance.groupby(dates).max().clip(0, 1).to_dict()
+
+class ItineraryPlanner:
+    """
+    Multi-day plans for a city from the attractions, restaurants and
+    weather tables. Each day's attractions are scored for every candidate
+    at once, picked from a heap (the day's first stop anchors the rest by
+    distance), and put in walking order by a shortest-path heuristic over a
+    haversine matrix, with lunch and dinner slotted in near the route
+    """
+    def __init__(self, attractions, restaurants, weather=None):
+        self.attractions = {city: PlaceSet(df, 'attraction_id', 'attractions') for city, df in attractions.groupby('city')}
+        self.restaurants = {city: PlaceSet(df, 'restaurant_id', 'restaurants') for city, df in restaurants.groupby('city')}
+        self.weather = weather
+
+    def plan(self, city, start_date, days=3, preferences=None, hotel=None):
+        """
+        [{'date', 'rain', 'stops': [...], 'distance_m'}] for `days` days from
+        start_date. hotel is a (lat, lng) where each day starts; the
+        attractions' centroid by default
+        """
+        preferences = {**DEFAULT_PREFERENCES, **(preferences or {})}
+        attractions = self.attractions[city]
+        restaurants = self.restaurants.get(city)
+        if hotel is None:
+            hotel = (float(attractions.lats.mean()), float(attractions.lngs.mean()))
+
+        attraction_scores = attractions.base_scores(preferences)
+        restaurant_scores = restaurants.base_scores(preferences) if restaurants is not None else None
+        rain = daily_weather(self.weather, city)
+        visited = np.zeros(len(attractions), dtype=bool)
+        eaten = np.zeros(len(restaurants), dtype=bool) if restaurants is not None else None
+
+        plan = []
+        for offset in range(days):
+            day = start_date + timedelta(days=offset)
+            chance = rain.get(day, 0.0)
+            allowed = ~visited & attractions.open_mask(day, VISIT_HOURS)
+            scores = attraction_scores - preferences['weather'] * chance * attractions.outdoor
+
+            # First stop: best place within reach of the hotel; the rest stay near it
+            first = pick(scores - distance_penalty(attractions, *hotel, preferences['distance']), allowed, 1)
+            if not first:
+                break
+            anchor = first[0][0]
+            allowed[anchor] = False
+            near = scores - distance_penalty(attractions, attractions.lats[anchor], attractions.lngs[anchor], preferences['distance'])
+            rest = pick(near, allowed, preferences['stops_per_day'] - 1, attractions.categories, preferences['per_category'], [attractions.categories[anchor]])
+            chosen = first + rest
+            visited[[position for position, _ in chosen]] = True
+
+            stops = [{'kind': 'attraction', 'position': position, 'score': score} for position, score in chosen]
+            lats = [hotel[0]] + [attractions.lats[position] for position, _ in chosen]
+            lngs = [hotel[1]] + [attractions.lngs[position] for position, _ in chosen]
+            matrix = distance_matrix(lats, lngs)
+            order = shortest_path(matrix)[1:] - 1
+            stops = [stops[i] for i in order]
+
+            if restaurants is not None and preferences['meals']:
+                stops = self.add_meals(stops, restaurants, restaurant_scores, eaten, day, preferences, attractions)
+
+            plan.append(self.describe(day, chance, stops, attractions, restaurants, hotel))
+        return plan
+
+    def add_meals(self, stops, restaurants, scores, eaten, day, preferences, attractions):
+        """
+        Lunch near the middle of the route and dinner near its end
+        """
+        middle = stops[(len(stops) - 1) // 2]['position']
+        last = stops[-1]['position']
+        meals = [(LUNCH_HOURS, middle, (len(stops) + 1) // 2), (DINNER_HOURS, last, None)]
+
+        for hours, near, slot in meals:
+            allowed = ~eaten & restaurants.open_mask(day, hours)
+            meal_scores = scores - distance_penalty(restaurants, attractions.lats[near], attractions.lngs[near], preferences['distance'] * 2)
+            chosen = pick(meal_scores, allowed, 1)
+            if not chosen:
+                continue
+            position, score = chosen[0]
+            eaten[position] = True
+            stop = {'kind': 'restaurant', 'position': position, 'score': score}
+            if slot is None:
+                stops.append(stop)
+            else:
+                stops.insert(slot, stop)
+        return stops
+
+    def describe(self, day, chance, stops, attractions, restaurants, hotel):
+        places = {'attraction': attractions, 'restaurant': restaurants}
+        described = []
+        for stop in stops:
+            places_of_kind, position = places[stop['kind']], stop['position']
+            described.append({
+                'kind': stop['kind'],
+                'id': places_of_kind.ids[position],
+                'name': places_of_kind.names[position],
+                'category': places_of_kind.categories[position],
+                'latitude': float(places_of_kind.lats[position]),
+                'longitude': float(places_of_kind.lngs[position]),
+                'score': round(float(stop['score']), 3)
+            })
+
+        lats = [hotel[0]] + [stop['latitude'] for stop in described]
+        lngs = [hotel[1]] + [stop['longitude'] for stop in described]
+        distance = float(haversine(np.array(lats[:-1]), np.array(lngs[:-1]), np.array(lats[1:]), np.array(lngs[1:])).sum())
+        return {'date': day, 'rain': chance, 'stops': described, 'distance_m': round(distance)}
+
+def synthetic_catalog(city, attractions=2000, restaurants=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    lat0, lng0 = 47.6062, -122.3321
+    categories = ["Museums", "Parks", "Tours", "Nightlife", "Shopping", "Sights & Landmarks", "Nature & Parks", "Food & Drink"]
+    cuisines = ["Italian", "Mexican", "Japanese", "Seafood", "Coffee & Tea", "Pizza", "Thai", "American"]
+
+    def coords(n):
+        return lat0 + rng.normal(0, 0.03, n), lng0 + rng.normal(0, 0.04, n)
+
+    lats, lngs = coords(attractions)
+    attraction_rows = pd.DataFrame({
+        'attraction_id': [f"a{i}" for i in range(attractions)],
+        'city': city,
+        'name': [f"Attraction {i}" for i in range(attractions)],
+        'latitude': lats, 'longitude': lngs,
+        'rating': rng.integers(30, 51, attractions) / 10,
+        'review_count': rng.integers(0, 20000, attractions),
+        'category': rng.choice(categories, attractions),
+        'subcategory': rng.choice(["Art Museums", "Gardens", "Walking Tours", "Bars & Clubs", "Observation Decks", ""], attractions),
+        'price_level': rng.choice(['$', '$$', '$$$', ''], attractions),
+        'opening_hours': rng.choice(["Mon - Fri 9:00 AM - 5:00 PM, Sat 10:00 AM - 4:00 PM, Sun Closed", "Open 24 hours", "Daily 10-18", ""], attractions)
+    })
+
+    lats, lngs = coords(restaurants)
+    restaurant_rows = pd.DataFrame({
+        'restaurant_id': [f"r{i}" for i in range(restaurants)],
+        'city': city,
+        'name': [f"Restaurant {i}" for i in range(restaurants)],
+        'latitude': lats, 'longitude': lngs,
+        'rating': rng.integers(20, 51, restaurants) / 10,
+        'review_count': rng.integers(0, 5000, restaurants),
+        'price_level': rng.choice(['$', '$$', '$$$', '$$$$'], restaurants),
+        'cuisine_types': rng.choice(cuisines, restaurants),
+        'operating_hours': rng.choice(["0:1100-2200;1:1100-2200;2:1100-2200;3:1100-2200;4:1100-2300;5:1000-2300;6:1000-2100",
+                                       "0:0700-1500;1:0700-1500;2:0700-1500;3:0700-1500;4:0700-1500",
+                                       "1:1700-2300;2:1700-2300;3:1700-2300;4:1700-0100;5:1700-0100"], restaurants)
+    })
+    return attraction_rows, restaurant_rows
+
+def main():
+    city = "Seattle"
+    attractions, restaurants = synthetic_catalog(city)
+    start_date = datetime(2026, 10, 16).date()
+    weather = pd.DataFrame({
+        'CITY_NAME': city,
+        'TIMESTAMP': [datetime(2026, 10, 16) + timedelta(hours=3 * i) for i in range(40)],
+        'PRECIPITATION_PROBABILITY': np.repeat([0.0, 0.9, 0.2, 0.0, 0.6], 8)
+    })
+
+    start = time.perf_counter()
+    planner = ItineraryPlanner(attractions, restaurants, weather)
+    print(f"Catalog of {len(attractions)} attractions and {len(restaurants)} restaurants prepared in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    preferences = {'interests': {'museum': 0.5, 'garden': 0.3}, 'budget': 2}
+    planner.plan(city, start_date, 5, preferences)
+    runs = 20
+    start = time.perf_counter()
+    for _ in range(runs):
+        plan = planner.plan(city, start_date, 5, preferences)
+    print(f"5-day plan: {(time.perf_counter() - start) / runs * 1000:.1f} ms")
+
+    for day in plan:
+        names = ', '.join(f"{stop['name']} ({stop['category']})" for stop in day['stops'])
+        print(f"  {day['date']} rain {day['rain']:.0%}, {day['distance_m'] / 1000:.1f} km: {names}")
+
+if __name__ == "__main__":
+    main()
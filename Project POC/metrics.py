@@ -0,0 +1,239 @@
+from contextlib import contextmanager
+import threading
+import bisect
+import atexit
+import json
+import time
+import os
+import re
+
+# 'prometheus:<path>' or 'jsonl:<path>' to write metrics when the process exits
+METRICS_EXPORT = os.getenv('METRICS_EXPORT', '')
+# 'cprofile' or 'tracemalloc' for a one-off deep dive around a script's main()
+METRICS_PROFILE = os.getenv('METRICS_PROFILE', '')
+METRICS_DIR = os.getenv('METRICS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'metrics'))
+
+# Upper bounds in seconds; the last bucket is +Inf
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+
+# URL pieces that carry ids, so per-endpoint series stay few
+ENDPOINT_PATTERNS = [
+    (re.compile(r"^https?://"), ''),
+    (re.compile(r"\?.*$"), ''),
+    (re.compile(r"(api\.yelp\.com/v3/businesses/)(?!search$)[^/]+$"), r"\1{id}")
+]
+
+def endpoint(url):
+    for pattern, replacement in ENDPOINT_PATTERNS:
+        url = pattern.sub(replacement, url)
+    return url
+
+def series_key(name, labels):
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+def label_text(labels):
+    if not labels:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.bounds = list(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        running, result = 0, []
+        for bound, count in zip(self.bounds + [float('inf')], self.counts):
+            running += count
+            result.append((bound, running))
+        return result
+
+    def quantile(self, q):
+        """
+        Upper bound of the bucket holding the q-th observation
+        """
+        target = q * self.count
+        for bound, running in self.cumulative():
+            if running >= target and running:
+                return bound
+        return None
+
+class Registry:
+    """
+    Counters and histograms keyed by (name, sorted labels). Updates take one
+    lock and touch a dict entry, cheap next to the HTTP calls and batch
+    loads they measure
+    """
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def increment(self, name, amount=1, **labels):
+        key = series_key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = series_key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def to_prometheus(self):
+        lines = []
+        with self.lock:
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE {name} counter")
+                for (series, labels), value in sorted(self.counters.items()):
+                    if series == name:
+                        lines.append(f"{name}{label_text(labels)} {value}")
+
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (series, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+                    if series != name:
+                        continue
+                    for bound, running in histogram.cumulative():
+                        le = '+Inf' if bound == float('inf') else repr(bound)
+                        lines.append(f"{name}_bucket{label_text(labels + (('le', le),))} {running}")
+                    lines.append(f"{name}_sum{label_text(labels)} {histogram.sum}")
+                    lines.append(f"{name}_count{label_text(labels)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def to_records(self):
+        """
+        One dict per series, with p50/p99 estimated from histogram buckets
+        """
+        now = time.time()
+        records = []
+        with self.lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                records.append({'time': now, 'name': name, 'type': 'counter', 'labels': dict(labels), 'value': value})
+            for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+                records.append({
+                    'time': now, 'name': name, 'type': 'histogram', 'labels': dict(labels),
+                    'count': histogram.count, 'sum': histogram.sum,
+                    'p50': histogram.quantile(0.5), 'p99': histogram.quantile(0.99),
+                    'buckets': {'+Inf' if bound == float('inf') else str(bound): count for bound, count in histogram.cumulative()}
+                })
+        return records
+
+    def export(self, target=METRICS_EXPORT):
+        """
+        Write every series to 'prometheus:<path>' (replaced) or
+        'jsonl:<path>' (appended, one line per series)
+        """
+        if not target:
+            return
+        kind, _, path = target.partition(':')
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        if kind == 'prometheus':
+            temp_path = f"{path}.tmp"
+            with open(temp_path, 'w') as f:
+                f.write(self.to_prometheus())
+            os.replace(temp_path, path)
+        elif kind == 'jsonl':
+            with open(path, 'a') as f:
+                for record in self.to_records():
+                    f.write(json.dumps(record, default=str) + '\n')
+        else:
+            raise ValueError(f"Unknown metrics export {target!r}")
+
+registry = Registry()
+
+increment = registry.increment
+observe = registry.observe
+timer = registry.timer
+
+def stage_timer(stage, **labels):
+    """
+    Wall time of one run of a pipeline stage, as stage_seconds{stage=...}
+    """
+    return registry.timer('stage_seconds', stage=stage, **labels)
+
+def count_rows(stage, rows, **labels):
+    registry.increment('rows_total', rows, stage=stage, **labels)
+
+@contextmanager
+def profiled(name, mode=METRICS_PROFILE, top=25):
+    """
+    Run the block under cProfile (stats saved to METRICS_DIR/<name>.prof) or
+    tracemalloc (peak and top allocation sites), and print a summary. Does
+    nothing unless a mode is set
+    """
+    if mode == 'cprofile':
+        import cProfile
+        import pstats
+
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            os.makedirs(METRICS_DIR, exist_ok=True)
+            path = os.path.join(METRICS_DIR, f"{name}.prof")
+            profile.dump_stats(path)
+            print(f"Profile saved to {path}")
+            pstats.Stats(profile).sort_stats('cumulative').print_stats(top)
+    elif mode == 'tracemalloc':
+        import tracemalloc
+
+        tracemalloc.start(10)
+        try:
+            yield
+        finally:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{name}: {current / 2 ** 20:.1f} MiB traced at exit, peak {peak / 2 ** 20:.1f} MiB")
+            for stat in snapshot.statistics('lineno')[:top]:
+                print(f"  {stat}")
+    else:
+        yield
+
+if METRICS_EXPORT:
+    atexit.register(registry.export)
+
+def main():
+    import random
+
+    for _ in range(1000):
+        observe('http_request_seconds', random.expovariate(10), provider='yelp', endpoint=endpoint('https://api.yelp.com/v3/businesses/abc-123'))
+        increment('http_responses_total', provider='yelp', status=random.choice([200, 200, 200, 429]))
+
+    start = time.perf_counter()
+    for _ in range(100000):
+        observe('bench_seconds', 0.01, stage='x')
+    print(f"observe(): {(time.perf_counter() - start) * 10:.2f} µs per call")
+
+    print(registry.to_prometheus()[:600])
+    print(json.dumps(registry.to_records()[0]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import threading
+import argparse
+import random
+import json
+import time
+import zlib
+import os
+
+MOCK_ITEMS_PER_CITY = int(os.getenv('MOCK_ITEMS_PER_CITY', '30'))
+MOCK_FIXTURE_DIR = os.getenv('MOCK_FIXTURE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures'))
+
+HOTELS_PAGE_SIZE = 20
+ATTRACTIONS_PAGE_SIZE = 30
+
+def stable_id(text, digits=9):
+    return str(zlib.crc32(str(text).encode()) % 10 ** digits)
+
+def city_coords(city):
+    """
+    Deterministic coordinates inside the continental US for any city name
+    """
+    h = zlib.crc32(city.encode())
+    return 30 + (h % 1500) / 100, -120 + (h // 1500 % 4000) / 100
+
+def scattered(rng, lat, lng):
+    return lat + rng.uniform(-0.05, 0.05), lng + rng.uniform(-0.05, 0.05)
+
+def booking_locations(params, rng):
+    city = params.get('name', '')
+    return [{'dest_type': 'city', 'dest_id': f"-{stable_id(city)}", 'name': city}]
+
+def booking_search(params, rng):
+    dest_id = params.get('dest_id', '')
+    page = int(params.get('page_number', 0))
+    lat, lng = float(params.get('latitude') or 40.7), float(params.get('longitude') or -74.0)
+    items = []
+    for i in range(page * HOTELS_PAGE_SIZE, min((page + 1) * HOTELS_PAGE_SIZE, MOCK_ITEMS_PER_CITY)):
+        hotel_lat, hotel_lng = scattered(rng, lat, lng)
+        items.append({
+            'hotel_id': int(stable_id(f"{dest_id}:{i}")),
+            'hotel_name': f"Hotel {i}",
+            'address': f"{i} Main Street",
+            'latitude': hotel_lat,
+            'longitude': hotel_lng,
+            'class': rng.randint(1, 5),
+            'review_score': rng.randint(50, 99) / 10,
+            'review_nr': rng.randint(0, 5000),
+            'min_total_price': round(rng.uniform(60, 600), 2),
+            'currency_code': 'USD',
+            'url': f"https://www.booking.com/hotel/us/hotel-{i}.html",
+            'main_photo_url': f"https://cf.bstatic.com/images/hotel/{i}.jpg",
+            'is_free_cancellable': rng.randint(0, 1)
+        })
+    return {'count': MOCK_ITEMS_PER_CITY, 'result': items}
+
+def booking_details(params, rng):
+    facilities = ["Free WiFi", "Parking", "Pool", "Fitness center", "Restaurant", "Bar", "Spa", "Airport shuttle"]
+    return {
+        'hotel_id': params.get('hotel_id'),
+        'checkin': {'from': rng.choice(['14:00', '15:00', '16:00'])},
+        'checkout': {'to': rng.choice(['10:00', '11:00', '12:00'])},
+        'facilities': rng.sample(facilities, rng.randint(0, len(facilities)))
+    }
+
+def tripadvisor_locations(params, rng):
+    return {'data': [{'locationId': stable_id(params.get('query', '')), 'title': params.get('query', '')}]}
+
+def tripadvisor_attractions(params, rng):
+    location_id = params.get('locationId', '')
+    offset = int(params.get('offset', 0))
+    lat, lng = city_coords(location_id)
+    categories = ["Museums", "Parks", "Tours", "Nightlife", "Shopping", "Sights & Landmarks"]
+    items = []
+    for i in range(offset, min(offset + ATTRACTIONS_PAGE_SIZE, MOCK_ITEMS_PER_CITY)):
+        place_lat, place_lng = scattered(rng, lat, lng)
+        items.append({
+            'locationId': stable_id(f"{location_id}:{i}"),
+            'title': f"Attraction {i}",
+            'description': "A popular place to visit",
+            'latitude': place_lat,
+            'longitude': place_lng,
+            'averageRating': rng.randint(6, 10) / 2,
+            'reviewCount': rng.randint(0, 20000),
+            'primaryCategory': {'name': rng.choice(categories)},
+            'secondaryCategories': [{'name': name} for name in rng.sample(categories, rng.randint(0, 2))],
+            'priceLevel': rng.choice(['$', '$$', '$$$', '']),
+            'priceRange': '$10 - $40',
+            'thumbnail': {'url': f"https://media-cdn.tripadvisor.com/{i}.jpg"}
+        })
+    return {'status': True, 'data': {'attractions': items, 'totalResults': MOCK_ITEMS_PER_CITY}}
+
+def tripadvisor_details(params, rng):
+    return {'data': {
+        'location': {'street1': f"{rng.randint(1, 999)} Park Avenue", 'street2': None, 'city': 'Springfield', 'state': 'NY', 'postalCode': '10001'},
+        'website': "https://example.com",
+        'suggestedDuration': rng.choice(['1-2 hours', '2-3 hours', 'More than 3 hours']),
+        'openingHours': rng.choice([["Mon - Fri 9:00 AM - 5:00 PM", "Sat 10:00 AM - 4:00 PM", "Sun Closed"], ["Open 24 hours"], []])
+    }}
+
+def yelp_search(params, rng):
+    city = params.get('location', '')
+    offset, limit = int(params.get('offset', 0)), int(params.get('limit', 50))
+    lat, lng = city_coords(city)
+    items = []
+    for i in range(offset, min(offset + limit, MOCK_ITEMS_PER_CITY)):
+        place_lat, place_lng = scattered(rng, lat, lng)
+        items.append({
+            'id': f"{stable_id(city)}-{i}",
+            'name': f"Restaurant {i}",
+            'location': {'display_address': [f"{i} Broadway", city]},
+            'coordinates': {'latitude': place_lat, 'longitude': place_lng},
+            'rating': rng.randint(2, 10) / 2,
+            'review_count': rng.randint(0, 5000),
+            'price': '$' * rng.randint(1, 4),
+            'display_phone': '(212) 555-0100',
+            'url': f"https://www.yelp.com/biz/{i}",
+            'image_url': f"https://s3-media.yelpcdn.com/{i}.jpg",
+            'categories': [{'alias': 'pizza', 'title': 'Pizza'}, {'alias': 'bars', 'title': 'Bars'}][:rng.randint(1, 2)],
+            'is_closed': False,
+            'transactions': ['pickup', 'delivery'][:rng.randint(0, 2)]
+        })
+    return {'businesses': items, 'total': MOCK_ITEMS_PER_CITY}
+
+def yelp_details(params, rng):
+    opens = rng.choice(['0700', '1100', '1700'])
+    return {'hours': [{'open': [{'day': day, 'start': opens, 'end': '2200', 'is_overnight': False} for day in range(rng.randint(5, 7))]}]}
+
+def google_textsearch(params, rng):
+    city = params.get('query', '').removesuffix(' city')
+    lat, lng = city_coords(city)
+    return {'results': [{'place_id': f"ChIJ{stable_id(city)}", 'name': city, 'geometry': {'location': {'lat': lat, 'lng': lng}},
+                         'photos': [{'photo_reference': f"photo-{stable_id(city)}"}]}]}
+
+def google_details(params, rng):
+    place_id = params.get('place_id', '')
+    lat, lng = city_coords(place_id)
+    return {'result': {
+        'place_id': place_id,
+        'formatted_address': "Springfield, USA",
+        'geometry': {'location': {'lat': lat, 'lng': lng}},
+        'url': f"https://maps.google.com/?cid={stable_id(place_id)}",
+        'website': "https://example.gov",
+        'rating': rng.randint(30, 50) / 10,
+        'user_ratings_total': rng.randint(0, 100000),
+        'types': ['locality', 'political'],
+        'vicinity': "Springfield"
+    }}
+
+def rome2rio_search(params, rng):
+    routes = []
+    for kind, speed, price in [('fly', 700, 150), ('bus', 80, 40), ('drive', 90, 60)][:rng.randint(1, 3)]:
+        distance = rng.uniform(50, 4000)
+        duration = distance / speed * 60
+        routes.append({
+            'name': f"{kind.title()} from {params.get('oName')} to {params.get('dName')}",
+            'kind': kind,
+            'distance': distance,
+            'duration': duration,
+            'indicativePrices': [{'priceLow': price, 'priceHigh': price * 3, 'currency': 'USD'}],
+            'segments': [{'kind': kind, 'distance': distance, 'duration': duration}]
+        })
+    return {'routes': routes}
+
+def openweathermap_onecall(params, rng):
+    now = int(time.time()) // 3600 * 3600
+
+    def conditions():
+        return {'temp': rng.uniform(40, 90), 'feels_like': rng.uniform(40, 90), 'humidity': rng.randint(20, 90),
+                'wind_speed': rng.uniform(0, 20), 'wind_deg': rng.randint(0, 359), 'pressure': rng.randint(990, 1030),
+                'clouds': rng.randint(0, 100), 'uvi': rng.uniform(0, 10),
+                'weather': [rng.choice([{'main': 'Clear', 'description': 'clear sky'}, {'main': 'Rain', 'description': 'light rain'}])]}
+
+    daily = []
+    for day in range(8):
+        entry = conditions()
+        entry.update({'dt': now + day * 86400, 'temp': {'day': entry['temp'], 'min': entry['temp'] - 8, 'max': entry['temp'] + 8},
+                      'feels_like': {'day': entry['feels_like']}, 'pop': round(rng.random(), 2)})
+        daily.append(entry)
+    return {'current': dict(conditions(), dt=now, visibility=10000), 'daily': daily}
+
+# (host, path prefix) -> fixture; the longest matching prefix wins
+ENDPOINTS = {
+    ('booking-com.p.rapidapi.com', '/v1/hotels/locations'): booking_locations,
+    ('booking-com.p.rapidapi.com', '/v1/hotels/search'): booking_search,
+    ('booking-com.p.rapidapi.com', '/v1/hotels/details'): booking_details,
+    ('tripadvisor16.p.rapidapi.com', '/api/v1/attractions/searchLocation'): tripadvisor_locations,
+    ('tripadvisor16.p.rapidapi.com', '/api/v1/attractions/searchAttractionsInLocation'): tripadvisor_attractions,
+    ('tripadvisor16.p.rapidapi.com', '/api/v1/attractions/getAttractionDetails'): tripadvisor_details,
+    ('api.yelp.com', '/v3/businesses/search'): yelp_search,
+    ('api.yelp.com', '/v3/businesses/'): yelp_details,
+    ('maps.googleapis.com', '/maps/api/place/textsearch/json'): google_textsearch,
+    ('maps.googleapis.com', '/maps/api/place/details/json'): google_details,
+    ('api.rome2rio.com', '/api/1.5/json/Search'): rome2rio_search,
+    ('api.openweathermap.org', '/data/2.5/onecall'): openweathermap_onecall
+}
+
+def find_endpoint(host, path):
+    matches = [(prefix, fixture) for (endpoint_host, prefix), fixture in ENDPOINTS.items() if endpoint_host == host and path.startswith(prefix)]
+    return max(matches, key=lambda match: len(match[0])) if matches else (None, None)
+
+def recorded_fixture(host, prefix, fixture_dir=MOCK_FIXTURE_DIR):
+    """
+    A recorded payload saved as fixture_dir/<host><prefix with / as _>.json,
+    served verbatim in place of the synthetic one
+    """
+    path = os.path.join(fixture_dir, f"{host}{prefix}".replace('/', '_').rstrip('_') + '.json')
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return None
+
+class MockApiServer(ThreadingHTTPServer):
+    """
+    Stands in for every provider the scripts call. httpClient sends requests
+    to /<host><path> when API_BASE_URL points here; each is answered from a
+    recorded fixture when one exists, otherwise from a synthetic payload that
+    is deterministic for the same request. Every response waits `latency`
+    seconds plus exponential `jitter`, and `error_rate` of them fail with a
+    503 (Retry-After: 0) or 429 so the client's retry path is exercised
+    """
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, address, latency=0.02, jitter=0.01, error_rate=0.0, seed=0, fixture_dir=MOCK_FIXTURE_DIR):
+        super().__init__(address, MockApiHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.fixture_dir = fixture_dir
+        self.random = random.Random(seed)
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def count(self, name):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+class MockApiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; with Nagle on, keep-alive
+    # clients wait on a delayed ACK for every response
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        parts = urlsplit(self.path)
+        host, _, path = parts.path.lstrip('/').partition('/')
+        path = '/' + path
+        params = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+
+        with server.lock:
+            delay = server.latency + (server.random.expovariate(1 / server.jitter) if server.jitter else 0)
+            failed = server.random.random() < server.error_rate
+        time.sleep(delay)
+
+        prefix, fixture = find_endpoint(host, path)
+        if fixture is None:
+            server.count('not_found')
+            return self.reply(404, {'error': f"no fixture for {host}{path}"})
+        if failed:
+            server.count('errors')
+            return self.reply(503 if zlib.crc32(self.path.encode()) % 2 else 429, {'error': 'injected'}, {'Retry-After': '0'})
+
+        server.count(f"{host}{prefix}")
+        payload = recorded_fixture(host, prefix, server.fixture_dir)
+        if payload is None:
+            payload = fixture(params, random.Random(zlib.crc32(self.path.encode())))
+        self.reply(200, payload)
+
+    def do_POST(self):
+        # Fixtures ignore the body, but it must be read off a keep-alive
+        # connection or it is parsed as the next request
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.do_GET()
+
+    def reply(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_mock_api(latency=0.02, jitter=0.01, error_rate=0.0, port=0, seed=0):
+    """
+    Serve the mock API on a background thread; call shutdown() when done
+    """
+    server = MockApiServer(('127.0.0.1', port), latency, jitter, error_rate, seed)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve synthetic provider responses for offline runs (set API_BASE_URL to its address)")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.01, help='mean of extra exponential delay in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 429/503')
+    args = parser.parse_args()
+
+    server = MockApiServer(('127.0.0.1', args.port), args.latency, args.jitter, args.error_rate)
+    print(f"Mock API on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(server.counts)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+from contextlib import redirect_stdout
+import subprocess
+import importlib
+import tempfile
+import argparse
+import resource
+import threading
+import json
+import time
+import sys
+import os
+import numpy as np
+
+# Script -> (module, attribute holding its city list, function run once per unit)
+SCRIPTS = {
+    'destinations': ('destinationTable', 'CITIES', 'fetch_city'),
+    'hotels': ('hotelsTable', 'CITIES', 'fetch_city'),
+    'attractions': ('attractionsTable', 'CITIES', 'fetch_city'),
+    'restaurants': ('restaurantsTable', 'CITIES', 'fetch_city'),
+    'transportation': ('transportationTable', 'cities', 'get_route_data'),
+    'weather': ('weatherTable', 'cities', 'get_city_weather')
+}
+
+PROVIDERS = ['booking', 'tripadvisor', 'yelp', 'google_places', 'rome2rio', 'openweathermap']
+
+SCALES = [6, 100, 1000]
+
+# Route pairs grow with the square of the city count; past this many cities
+# transportation is benchmarked on the first ones only
+TRANSPORT_MAX_CITIES = int(os.getenv('TRANSPORT_MAX_CITIES', '30'))
+
+STAGES = ['request', 'unit', 'transform', 'load']
+
+# cli.py modes in run order: transform replays what fetch journaled
+COLD_START_MODES = ['fetch', 'transform', 'dry-run', 'full']
+HEAVY_MODULES = ['numpy', 'pandas', 'snowflake.connector']
+CLI_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cli.py')
+
+def city_names(n):
+    from gazetteer import CITIES
+
+    return (CITIES + [f"Synthetic City {i}" for i in range(n)])[:n]
+
+def child_environment(mock_url, directory):
+    """
+    Environment for one benchmark run: providers redirected to the mock API,
+    the SQLite warehouse stand-in, fresh caches and no client-side rate limits
+    """
+    env = dict(os.environ)
+    env.update({
+        'API_BASE_URL': mock_url,
+        'WAREHOUSE_BACKEND': 'local',
+        'LOCAL_WAREHOUSE_PATH': os.path.join(directory, 'warehouse.sqlite'),
+        'CHANGE_STATE_PATH': os.path.join(directory, 'state.sqlite'),
+        'GAZETTEER_PATH': os.path.join(directory, 'gazetteer.json'),
+        'FACET_INDEX_DIR': os.path.join(directory, 'facets'),
+        'PARQUET_DIR': os.path.join(directory, 'output'),
+        'CRAWL_JOURNAL_PATH': os.path.join(directory, 'journal.sqlite'),
+        'RESPONSE_CACHE': '0'
+    })
+    for provider in PROVIDERS:
+        env[f"{provider.upper()}_RATE_LIMIT"] = '100000'
+        env[f"{provider.upper()}_BURST"] = '100000'
+    return env
+
+class StageTimer:
+    """
+    Latency samples per stage, from wrapping the functions that make up a stage
+    """
+    def __init__(self):
+        self.samples = {stage: [] for stage in STAGES}
+        self.lock = threading.Lock()
+
+    def wrap(self, stage, function):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self.lock:
+                    self.samples[stage].append(elapsed)
+        return timed
+
+    def summary(self):
+        return {
+            stage: {
+                'count': len(samples),
+                'p50_ms': float(np.percentile(samples, 50) * 1000) if samples else None,
+                'p99_ms': float(np.percentile(samples, 99) * 1000) if samples else None
+            }
+            for stage, samples in self.samples.items()
+        }
+
+def run_script(script, cities, workers):
+    """
+    Run one script's main() in this process against the configured mock API
+    and local warehouse. Called in a fresh child process per run, so peak
+    RSS and module state belong to this run alone
+    """
+    import httpClient
+    import recordStream
+
+    module_name, cities_attribute, unit_function = SCRIPTS[script]
+    module = importlib.import_module(module_name)
+    setattr(module, cities_attribute, city_names(cities))
+
+    timer = StageTimer()
+    rows = [0]
+    httpClient.send = timer.wrap('request', httpClient.send)
+    setattr(module, unit_function, timer.wrap('unit', getattr(module, unit_function)))
+
+    def stream_to_sink(stream, flush, batch_size=recordStream.BATCH_SIZE, flush_interval=recordStream.FLUSH_INTERVAL, build=recordStream.build_frame, table=''):
+        total = recordStream.stream_to_sink(stream, timer.wrap('load', flush), batch_size, flush_interval, timer.wrap('transform', build), table)
+        rows[0] += total
+        return total
+
+    module.stream_to_sink = stream_to_sink
+
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        module.main(workers=workers)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'script': script,
+        'cities': cities,
+        'rows': rows[0],
+        'seconds': elapsed,
+        'rows_per_second': rows[0] / elapsed if elapsed else None,
+        'peak_rss_mib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'stages': timer.summary()
+    }
+
+def run_child(script, cities, workers, mock_url):
+    with tempfile.TemporaryDirectory() as directory:
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', script, '--cities', str(cities), '--workers', str(workers)],
+            env=child_environment(mock_url, directory), capture_output=True, text=True
+        )
+    if completed.returncode != 0:
+        raise RuntimeError(f"{script} at {cities} cities failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def import_profile(stderr):
+    """
+    Total import time and the heavy modules loaded, from -X importtime output.
+    Imports racing in worker threads can show negative self times; they still
+    add up to the right total
+    """
+    seconds, modules = 0.0, set()
+    for line in stderr.splitlines():
+        if line.startswith('import time:'):
+            self_us, _, name = [part.strip() for part in line[len('import time:'):].split('|')]
+            if self_us.lstrip('-').isdigit():
+                seconds += int(self_us) / 1e6
+                modules.add(name)
+    return seconds, [module for module in HEAVY_MODULES if module in modules]
+
+def run_cold_starts(scripts, city, mock_url):
+    """
+    Time a fresh cli.py process per mode over one city, so the numbers are
+    dominated by interpreter start, imports and first requests
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        env = child_environment(mock_url, directory)
+        for mode in COLD_START_MODES:
+            start = time.perf_counter()
+            completed = subprocess.run(
+                [sys.executable, '-X', 'importtime', CLI_PATH, '--mode', mode, '--tables', ','.join(scripts), '--cities', city],
+                env=env, capture_output=True, text=True
+            )
+            elapsed = time.perf_counter() - start
+            if completed.returncode != 0:
+                raise RuntimeError(f"cli.py --mode {mode} failed:\n{completed.stdout[-2000:]}")
+            import_seconds, heavy = import_profile(completed.stderr)
+            results.append({'mode': mode, 'seconds': elapsed, 'import_seconds': import_seconds, 'heavy_modules': heavy})
+    return results
+
+def report_cold_starts(results):
+    print(f"{'mode':<12}{'secs':>8}{'imports':>9}  heavy modules")
+    for result in results:
+        print(f"{result['mode']:<12}{result['seconds']:>8.2f}{result['import_seconds']:>9.2f}  {', '.join(result['heavy_modules']) or '-'}")
+
+def cold_start_regressions(results, baseline, tolerance):
+    previous = {result['mode']: result for result in baseline}
+    found = []
+    for result in results:
+        before = previous.get(result['mode'])
+        if not before:
+            continue
+        for name in ['seconds', 'import_seconds']:
+            if result[name] > before[name] * (1 + tolerance):
+                found.append(f"cold start {result['mode']}: {name} {before[name]:.2f} -> {result[name]:.2f}")
+    return found
+
+def format_ms(value):
+    return '-' if value is None else f"{value:.1f}"
+
+def report_header():
+    print(f"{'script':<15}{'cities':>7}{'rows':>8}{'secs':>8}{'rows/s':>9}{'MiB':>7}  " + '  '.join(f"{stage + ' p50/p99 ms':>22}" for stage in STAGES))
+
+def report(result):
+    stages = '  '.join(
+        f"{format_ms(result['stages'][stage]['p50_ms']) + ' / ' + format_ms(result['stages'][stage]['p99_ms']):>22}" for stage in STAGES
+    )
+    print(f"{result['script']:<15}{result['cities']:>7}{result['rows']:>8}{result['seconds']:>8.1f}"
+          f"{result['rows_per_second'] or 0:>9.0f}{result['peak_rss_mib']:>7.0f}  {stages}", flush=True)
+
+def regressions(results, baseline, tolerance):
+    """
+    Runs that got slower (throughput or p99 request latency) or bigger (peak
+    RSS) than the baseline report by more than `tolerance`
+    """
+    previous = {(result['script'], result['cities']): result for result in baseline}
+    found = []
+    for result in results:
+        before = previous.get((result['script'], result['cities']))
+        if not before:
+            continue
+        checks = [
+            ('rows/s', before['rows_per_second'], result['rows_per_second'], False),
+            ('request p99', before['stages']['request']['p99_ms'], result['stages']['request']['p99_ms'], True),
+            ('peak RSS', before['peak_rss_mib'], result['peak_rss_mib'], True)
+        ]
+        for name, old, new, higher_is_worse in checks:
+            if old and new and (new > old * (1 + tolerance) if higher_is_worse else new < old * (1 - tolerance)):
+                found.append(f"{result['script']} at {result['cities']} cities: {name} {old:.1f} -> {new:.1f}")
+    return found
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the ingestion scripts offline against a mock API and the local warehouse")
+    parser.add_argument('--scripts', default=','.join(SCRIPTS), help='comma-separated scripts to run')
+    parser.add_argument('--scales', default=','.join(map(str, SCALES)), help='comma-separated city counts')
+    parser.add_argument('--workers', type=int, default=4, help='cities fetched in parallel')
+    parser.add_argument('--latency', type=float, default=0.02, help='mock API latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.01, help='mean extra exponential latency in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.01, help='fraction of mock responses that are 429/503')
+    parser.add_argument('--output', help='write results as JSON here')
+    parser.add_argument('--baseline', help='results JSON of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='relative change reported as a regression')
+    parser.add_argument('--cold-start', action='store_true', help='time a fresh cli.py process per mode instead')
+    parser.add_argument('--cold-start-city', default='New York', help='city each cold start fetches')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--cities', type=int, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.child:
+        result = run_script(args.child, args.cities, args.workers)
+        print(json.dumps(result))
+        return
+
+    from mockApi import start_mock_api
+
+    server = start_mock_api(args.latency, args.jitter, args.error_rate)
+    results = []
+    try:
+        if args.cold_start:
+            results = run_cold_starts(args.scripts.split(','), args.cold_start_city, server.url)
+            report_cold_starts(results)
+        else:
+            report_header()
+            for cities in [int(scale) for scale in args.scales.split(',')]:
+                for script in args.scripts.split(','):
+                    count = min(cities, TRANSPORT_MAX_CITIES) if script == 'transportation' else cities
+                    results.append(run_child(script, count, args.workers, server.url))
+                    report(results[-1])
+    finally:
+        server.shutdown()
+
+    print(f"Mock API: {sum(server.counts.values())} requests, {server.counts.get('errors', 0)} injected errors")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = (cold_start_regressions if args.cold_start else regressions)(results, json.load(f), args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
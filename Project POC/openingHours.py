@@ -0,0 +1,318 @@
+from datetime import datetime, timedelta
+import time
+import re
+
+MINUTES_PER_DAY = 1440
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+# Monday = 0, as in Yelp hours and datetime.weekday()
+DAY_NAMES = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+
+# Whole day names and their usual abbreviations only, so 'Sunset' or
+# 'Monument' don't read as days
+DAY = r"\b(?:mon(?:day)?|tue(?:s|sday)?|wed(?:nesday)?|thu(?:r|rs|rsday)?|fri(?:day)?|sat(?:urday)?|sun(?:day)?)s?\b\.?"
+CLOCK = r"\d{1,2}(?:[:.]\d{2})?\s*(?:[ap]\.?m\.?)?|noon|midnight"
+TOKENS = re.compile(
+    rf"(?P<times>(?P<open>{CLOCK})\s*(?:-|–|—|to)\s*(?P<close>{CLOCK}))"
+    rf"|(?P<days>(?P<first>{DAY})\s*(?:-|–|—|to)\s*(?P<last>{DAY}))"
+    rf"|(?P<day>{DAY})"
+    rf"|(?P<daily>daily|every day|everyday)"
+    rf"|(?P<allday>24\s*hours|24/7|open 24)"
+    rf"|(?P<closed>closed)",
+    re.IGNORECASE
+)
+
+def day_number(name):
+    return DAY_NAMES.index(name[:3].lower())
+
+def clock_minutes(text):
+    """
+    '9', '9:30 AM', '21.30', 'noon' -> minutes after midnight
+    """
+    text = text.strip().lower().replace('.', ':').rstrip(':')
+    if text == 'noon':
+        return 720
+    if text == 'midnight':
+        return 0
+
+    match = re.match(r"(\d{1,2})(?::(\d{2}))?\s*([ap])?", text)
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    if meridiem == 'p' and hour < 12:
+        hour += 12
+    elif meridiem == 'a' and hour == 12:
+        hour = 0
+    return min(hour, 24) * 60 + minute
+
+def daily_span(day, open_minute, close_minute):
+    """
+    Week-minute interval for one day's opening. A close at or before the
+    open runs past midnight into the next day
+    """
+    start = day * MINUTES_PER_DAY + open_minute
+    if close_minute <= open_minute:
+        close_minute += MINUTES_PER_DAY
+    return start, day * MINUTES_PER_DAY + close_minute
+
+def parse_yelp_hours(hours):
+    """
+    restaurants.operating_hours ('0:1100-2200;5:1800-0200;...') -> spans
+    """
+    spans = []
+    for entry in (hours or '').split(';'):
+        match = re.fullmatch(r"\s*(\d):(\d{4})-(\d{4})\s*", entry)
+        if match:
+            day, start, end = int(match.group(1)), match.group(2), match.group(3)
+            spans.append(daily_span(day, int(start[:2]) * 60 + int(start[2:]), int(end[:2]) * 60 + int(end[2:])))
+    return spans
+
+def parse_text_hours(hours):
+    """
+    Free-text hours as TripAdvisor gives them ('Mon - Fri 9:00 AM - 5:00 PM,
+    Sat 10:00 AM - 2:00 PM, Sun Closed', 'Open 24 hours', 'Daily 9-17') ->
+    spans. Times apply to the days named before them, or to every day when
+    none are named
+    """
+    spans = []
+    days, days_used = [], True
+
+    for token in TOKENS.finditer(hours or ''):
+        if token.group('days') or token.group('day') or token.group('daily'):
+            if days_used:
+                days, days_used = [], False
+            if token.group('days'):
+                first, last = day_number(token.group('first')), day_number(token.group('last'))
+                days.extend((first + offset) % 7 for offset in range((last - first) % 7 + 1))
+            elif token.group('day'):
+                days.append(day_number(token.group('day')))
+            else:
+                days.extend(range(7))
+            continue
+
+        applies_to = days or list(range(7))
+        days_used = True
+        if token.group('closed'):
+            continue
+        if token.group('allday'):
+            spans.extend((day * MINUTES_PER_DAY, (day + 1) * MINUTES_PER_DAY) for day in applies_to)
+        else:
+            open_minute, close_minute = clock_minutes(token.group('open')), clock_minutes(token.group('close'))
+            spans.extend(daily_span(day, open_minute, close_minute) for day in applies_to)
+
+    return spans
+
+def weekly_intervals(spans):
+    """
+    Fold spans onto the week (splitting those that run past Sunday midnight),
+    then sort and merge overlapping or touching ones
+    """
+    pieces = []
+    for start, end in spans:
+        length = end - start
+        if length >= MINUTES_PER_WEEK:
+            return [(0, MINUTES_PER_WEEK)]
+        if length <= 0:
+            continue
+
+        start %= MINUTES_PER_WEEK
+        end = start + length
+        if end > MINUTES_PER_WEEK:
+            pieces.extend([(start, MINUTES_PER_WEEK), (0, end - MINUTES_PER_WEEK)])
+        else:
+            pieces.append((start, end))
+
+    merged = []
+    for start, end in sorted(pieces):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def minute_of_week(moment):
+    return moment.weekday() * MINUTES_PER_DAY + moment.hour * 60 + moment.minute
+
+def window_pieces(start, end):
+    """
+    A window given as datetimes (or week minutes) -> non-wrapping
+    [start, end) week-minute pieces
+    """
+    if isinstance(start, datetime):
+        length = int((end - start).total_seconds() // 60) if end is not None else 1
+        start = minute_of_week(start)
+    else:
+        length = (end - start) if end is not None else 1
+
+    if length >= MINUTES_PER_WEEK:
+        return [(0, MINUTES_PER_WEEK)]
+
+    start %= MINUTES_PER_WEEK
+    end = start + max(length, 1)
+    if end <= MINUTES_PER_WEEK:
+        return [(start, end)]
+    return [(start, MINUTES_PER_WEEK), (0, end - MINUTES_PER_WEEK)]
+
+def encode_intervals(intervals):
+    """
+    [(540, 1020), (1980, 2460)] -> '540-1020,1980-2460'
+    """
+    return ','.join(f"{start}-{end}" for start, end in intervals)
+
+def decode_intervals(text):
+    return [tuple(int(minute) for minute in interval.split('-')) for interval in text.split(',') if interval]
+
+def yelp_intervals(hours):
+    """
+    operating_hours -> the encoded weekly intervals stored next to it
+    """
+    return encode_intervals(weekly_intervals(parse_yelp_hours(hours)))
+
+def text_intervals(hours):
+    """
+    opening_hours -> the encoded weekly intervals stored next to it
+    """
+    return encode_intervals(weekly_intervals(parse_text_hours(hours)))
+
+# Column the parsed intervals are loaded into, next to the raw hours
+INTERVALS_COLUMN = 'opening_intervals'
+
+# Table -> (key column, hours column, parser)
+TABLE_HOURS = {
+    'restaurants': ('restaurant_id', 'operating_hours', parse_yelp_hours),
+    'attractions': ('attraction_id', 'opening_hours', parse_text_hours)
+}
+
+class OpeningHoursIndex:
+    """
+    Every place's weekly opening hours as merged [start, end) intervals in
+    minutes from Monday 00:00, kept in flat arrays (CSR by place position).
+    A window query tests all intervals at once and scatters the hits back to
+    their places, so asking about N places is one vectorized pass
+    """
+    def __init__(self, ids, interval_lists):
+        import numpy as np
+
+        self.ids = [str(place_id) for place_id in ids]
+        self.positions = {place_id: position for position, place_id in enumerate(self.ids)}
+
+        lengths = np.fromiter((len(intervals) for intervals in interval_lists), dtype=np.int64, count=len(interval_lists))
+        self.offsets = np.concatenate([[0], np.cumsum(lengths)])
+        flat = np.array([interval for intervals in interval_lists for interval in intervals], dtype=np.int16).reshape(-1, 2)
+        self.starts = flat[:, 0]
+        self.ends = flat[:, 1]
+        self.owners = np.repeat(np.arange(len(self.ids), dtype=np.int32), lengths)
+        self.known = lengths > 0
+
+    @classmethod
+    def from_frame(cls, df, table):
+        """
+        Index a table's rows from their stored intervals; rows loaded without
+        them (or frames that never had the column) are parsed from the raw hours
+        """
+        key, column, parser = TABLE_HOURS[table.lower()]
+        stored = df[INTERVALS_COLUMN].tolist() if INTERVALS_COLUMN in df.columns else [None] * len(df)
+        return cls(df[key].tolist(), [
+            decode_intervals(intervals) if isinstance(intervals, str) else weekly_intervals(parser(hours))
+            for hours, intervals in zip(df[column].tolist(), stored)
+        ])
+
+    @classmethod
+    def from_warehouse(cls, conn, table):
+        import pandas as pd
+
+        key, column, _ = TABLE_HOURS[table.lower()]
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"SELECT {key}, {column}, {INTERVALS_COLUMN} FROM {table}")
+            df = pd.DataFrame(cursor.fetchall(), columns=[key, column, INTERVALS_COLUMN])
+        finally:
+            cursor.close()
+        return cls.from_frame(df, table)
+
+    def intervals(self, place_id):
+        position = self.positions[str(place_id)]
+        start, end = self.offsets[position], self.offsets[position + 1]
+        return list(zip(self.starts[start:end].tolist(), self.ends[start:end].tolist()))
+
+    def open_during(self, start, end=None, ids=None, mode='any'):
+        """
+        For each place (all of them, or `ids` in that order): is it open at
+        some point of the window ('any') or throughout it ('all')? start/end
+        are datetimes or week minutes; without end this is "open at start".
+        Places without parsed hours are reported closed
+        """
+        import numpy as np
+
+        results = []
+        for piece_start, piece_end in window_pieces(start, end):
+            if mode == 'all':
+                hits = (self.starts <= piece_start) & (self.ends >= piece_end)
+            else:
+                hits = (self.starts < piece_end) & (self.ends > piece_start)
+            opened = np.zeros(len(self.ids), dtype=bool)
+            opened[self.owners[hits]] = True
+            results.append(opened)
+
+        combined = np.logical_and.reduce(results) if mode == 'all' else np.logical_or.reduce(results)
+        if ids is None:
+            return combined
+
+        positions = np.array([self.positions.get(str(place_id), -1) for place_id in ids], dtype=np.int64)
+        return np.where(positions >= 0, combined[positions], False)
+
+    def open_ids(self, start, end=None, mode='any'):
+        import numpy as np
+
+        return [self.ids[position] for position in np.flatnonzero(self.open_during(start, end, mode=mode))]
+
+    def __len__(self):
+        return len(self.ids)
+
+def main():
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    n = 100000
+
+    hours = []
+    for _ in range(n):
+        opens = int(rng.choice([7, 9, 11, 17]))
+        closes = (opens + int(rng.integers(6, 12))) % 24
+        days = sorted(rng.choice(7, size=int(rng.integers(4, 8)), replace=False).tolist())
+        hours.append(';'.join(f"{day}:{opens:02d}00-{closes:02d}00" for day in days))
+
+    df = pd.DataFrame({'restaurant_id': [f"r{i}" for i in range(n)], 'operating_hours': hours})
+
+    start = time.perf_counter()
+    index = OpeningHoursIndex.from_frame(df, 'restaurants')
+    print(f"Indexed {n} restaurants ({len(index.starts)} intervals) in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    # Friday 22:30 - Saturday 01:00, across midnight
+    window_start = datetime(2026, 10, 16, 22, 30)
+    window_end = window_start + timedelta(hours=2, minutes=30)
+
+    start = time.perf_counter()
+    opened = index.open_during(window_start, window_end)
+    index_elapsed = time.perf_counter() - start
+
+    def reparse():
+        pieces = window_pieces(window_start, window_end)
+        return np.array([
+            any(s < piece_end and e > piece_start for s, e in weekly_intervals(parse_yelp_hours(value)) for piece_start, piece_end in pieces)
+            for value in hours
+        ])
+
+    start = time.perf_counter()
+    expected = reparse()
+    reparse_elapsed = time.perf_counter() - start
+
+    print(f"Open during Fri 22:30-Sat 01:00: {int(opened.sum())} places, index {index_elapsed * 1000:.1f} ms, "
+          f"re-parsing {reparse_elapsed * 1000:.0f} ms" + ("" if (opened == expected).all() else " (results differ)"))
+
+    subset = df['restaurant_id'].sample(1000, random_state=0).tolist()
+    start = time.perf_counter()
+    index.open_during(window_start, window_end, ids=subset, mode='all')
+    print(f"Open throughout the window, 1000 given places: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+from concurrent.futures import ThreadPoolExecutor
+import math
+import os
+import metrics
+
+PAGE_WORKERS = int(os.getenv('PAGE_WORKERS', '4'))
+MAX_PAGES = int(os.getenv('MAX_PAGES', '20'))
+
+def page_count(total, page_size):
+    if not total or not page_size:
+        return None
+    return math.ceil(total / page_size)
+
+def paginate(fetch_page, page_items, item_id, total_pages=None, max_pages=MAX_PAGES, workers=PAGE_WORKERS):
+    """
+    Collect every item of a paged search.
+
+    fetch_page(page) returns the payload for a zero-based page index,
+    page_items(payload) the items on it, item_id(item) an item's id and
+    total_pages(payload, page_size) the provider's page count if it reports
+    one. After the first page the rest are fetched `workers` at a time (the
+    provider's rate limiter still applies to each call). Paging stops at the
+    reported last page, at max_pages, or as soon as a page brings no new ids.
+    Wall time and item count are recorded as the 'search' stage
+    """
+    with metrics.stage_timer('search'):
+        items = collect_pages(fetch_page, page_items, item_id, total_pages, max_pages, workers)
+    metrics.count_rows('search', len(items))
+    return items
+
+def collect_pages(fetch_page, page_items, item_id, total_pages=None, max_pages=MAX_PAGES, workers=PAGE_WORKERS):
+    first = fetch_page(0)
+    if first is None:
+        return []
+
+    items = list(page_items(first))
+    seen = {item_id(item) for item in items}
+
+    pages = total_pages(first, len(items)) if total_pages else None
+    last_page = min(pages, max_pages) if pages else max_pages
+
+    next_page = 1
+    if not items:
+        next_page = last_page
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        while next_page < last_page:
+            wave = list(range(next_page, min(next_page + workers, last_page)))
+            payloads = list(executor.map(fetch_page, wave))
+            exhausted = False
+
+            for payload in payloads:
+                new_items = [item for item in page_items(payload or {}) if item_id(item) not in seen]
+
+                if not new_items:
+                    exhausted = True
+                    break
+
+                seen.update(item_id(item) for item in new_items)
+                items.extend(new_items)
+
+            if exhausted:
+                break
+
+            next_page += len(wave)
+
+    return items
@@ -0,0 +1,350 @@
+from itertools import accumulate, chain
+from string import Formatter
+from datetime import datetime
+import time
+
+# Column specs. Paths are dotted keys into a raw record (integers index lists);
+# a missing key, a None value or a type mismatch anywhere on the path gives
+# the column's default. 'str' columns come out as object arrays of str
+
+def field(path, default='', dtype='str'):
+    return {'kind': 'field', 'path': path, 'default': default, 'dtype': dtype}
+
+def flag(path, default=False):
+    """
+    1/0 by the truthiness of the value
+    """
+    return {'kind': 'flag', 'path': path, 'default': default, 'dtype': 'int8'}
+
+def joined(path, sep, key=None, template=None):
+    """
+    A list at `path` joined with sep. Items are used as-is, through their
+    `key`, or formatted with a '{name}...' template over their keys
+    """
+    return {'kind': 'joined', 'path': path, 'sep': sep, 'key': key, 'template': template, 'default': '', 'dtype': 'str'}
+
+def concat(paths, sep):
+    """
+    The non-empty values at several paths joined with sep
+    """
+    return {'kind': 'concat', 'paths': paths, 'sep': sep, 'default': '', 'dtype': 'str'}
+
+def parsed(column, parse):
+    """
+    parse(value) for each value of an earlier column of the same schema,
+    called once per distinct value in the batch
+    """
+    return {'kind': 'parsed', 'column': column, 'parse': parse, 'default': '', 'dtype': 'str'}
+
+def timestamp():
+    """
+    One load time for the whole batch
+    """
+    return {'kind': 'timestamp', 'dtype': 'datetime64[s]'}
+
+def split_path(path):
+    return tuple(int(key) if key.isdigit() else key for key in path.split('.'))
+
+class Extractor:
+    """
+    Column-wise access into a list of nested dicts: each path is resolved one
+    level at a time over the whole batch, and levels shared by several paths
+    (item.coordinates.* ...) are resolved once
+    """
+    def __init__(self, records):
+        self.levels = {(): records}
+
+    def get(self, path):
+        path = split_path(path) if isinstance(path, str) else path
+        if path in self.levels:
+            return self.levels[path]
+
+        parent = self.get(path[:-1])
+        key = path[-1]
+        if isinstance(key, int):
+            values = [value[key] if value.__class__ is list and len(value) > key else None for value in parent]
+        else:
+            try:
+                values = [value.get(key) for value in parent]
+            except AttributeError:
+                values = [value.get(key) if value.__class__ is dict else None for value in parent]
+
+        self.levels[path] = values
+        return values
+
+def as_strings(values, default=''):
+    return [value if value.__class__ is str else default if value is None else str(value) for value in values]
+
+def percent_template(template):
+    """
+    '{day}:{start}-{end}' -> ('%s:%s-%s', ['day', 'start', 'end']); %-formatting
+    a tuple is the cheapest per-item formatting call
+    """
+    parts, names = [], []
+    for literal, name, _, _ in Formatter().parse(template):
+        parts.append(literal.replace('%', '%%'))
+        if name is not None:
+            parts.append('%s')
+            names.append(name)
+    return ''.join(parts), names
+
+def join_lists(lists, sep, key=None, template=None):
+    """
+    Join a column of lists. Lists of strings are joined directly; otherwise
+    the lists are flattened into one item column with offsets, item strings
+    are built column-wise (one %-format per item for a template) and each
+    row is one str.join over its slice
+    """
+    if key is None and template is None:
+        try:
+            return [sep.join(value) if value.__class__ is list else '' for value in lists]
+        except TypeError:
+            return [sep.join(as_strings(value)) if value.__class__ is list else '' for value in lists]
+
+    lists = [value if value.__class__ is list else () for value in lists]
+    offsets = [0, *accumulate(map(len, lists))]
+    items = Extractor(list(chain.from_iterable(lists)))
+
+    if key is not None:
+        strings = as_strings(items.get((key,)))
+    else:
+        pattern, names = percent_template(template)
+        strings = list(map(pattern.__mod__, zip(*[items.get((name,)) for name in names])))
+
+    return [sep.join(strings[start:end]) for start, end in zip(offsets, offsets[1:])]
+
+def concat_columns(columns, sep):
+    columns = [as_strings(column) for column in columns]
+    return [sep.join(filter(None, parts)) for parts in zip(*columns)]
+
+def typed(values, spec):
+    """
+    One column as a NumPy array of the spec's dtype, with missing values
+    replaced by its default
+    """
+    import numpy as np
+    import pandas as pd
+
+    dtype, default = spec['dtype'], spec.get('default')
+
+    if dtype == 'int8':
+        return np.array([default if value is None else bool(value) for value in values], dtype=np.int8)
+
+    if dtype in ('float64', 'int64'):
+        filled = [default if value is None else value for value in values]
+        try:
+            return np.array(filled, dtype=dtype)
+        except (TypeError, ValueError):
+            numbers = pd.to_numeric(pd.Series(filled, dtype=object), errors='coerce').fillna(default)
+            return numbers.round().to_numpy(dtype) if dtype == 'int64' else numbers.to_numpy(dtype)
+
+    strings = np.empty(len(values), dtype=object)
+    strings[:] = as_strings(values, default)
+    return strings if dtype == 'str' else pd.Series(strings, dtype=dtype)
+
+def normalize(schema, records, loaded_at=None):
+    """
+    Turn a batch of raw provider records into a typed DataFrame with one
+    column per schema entry, in schema order.
+    NumPy and pandas load here, on the first batch, not at import
+    """
+    import numpy as np
+    import pandas as pd
+
+    extractor = Extractor(records)
+    loaded_at = np.datetime64((loaded_at or datetime.now()).replace(microsecond=0), 's')
+    columns = {}
+
+    for name, spec in schema.items():
+        kind = spec['kind']
+        if kind == 'timestamp':
+            columns[name] = np.full(len(records), loaded_at)
+        elif kind == 'joined':
+            columns[name] = typed(join_lists(extractor.get(spec['path']), spec['sep'], spec['key'], spec['template']), spec)
+        elif kind == 'concat':
+            columns[name] = typed(concat_columns([extractor.get(path) for path in spec['paths']], spec['sep']), spec)
+        elif kind == 'parsed':
+            source = columns[spec['column']]
+            results = {value: spec['parse'](value) for value in set(source)}
+            columns[name] = typed([results[value] for value in source], spec)
+        else:
+            columns[name] = typed(extractor.get(spec['path']), spec)
+
+    return pd.DataFrame(columns, copy=False)
+
+def frame_builder(schema):
+    """
+    A build function for recordStream.stream_to_sink
+    """
+    return lambda records: normalize(schema, records)
+
+def synthetic_records(n, seed=0):
+    """
+    Raw {'city', 'item', 'detail'} records shaped like the Yelp and
+    TripAdvisor payloads, for the benchmark
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    records = []
+
+    for i in range(n):
+        hours = [{'day': day, 'start': '1100', 'end': '2200'} for day in range(int(rng.integers(0, 8)))]
+        item = {
+            'id': f"r{i}",
+            'locationId': str(i),
+            'name': f"Place {i}",
+            'title': f"Place {i}",
+            'description': 'A place',
+            'rating': float(rng.integers(1, 11)) / 2,
+            'averageRating': float(rng.integers(1, 11)) / 2,
+            'review_count': int(rng.integers(0, 5000)),
+            'reviewCount': int(rng.integers(0, 5000)),
+            'price': '$' * int(rng.integers(1, 5)),
+            'priceLevel': '$$',
+            'priceRange': '$10 - $20',
+            'display_phone': '(212) 555-0100',
+            'url': f"https://example.com/{i}",
+            'image_url': f"https://example.com/{i}.jpg",
+            'coordinates': {'latitude': 40.7 + rng.random() / 10, 'longitude': -74.0 + rng.random() / 10},
+            'latitude': 40.7 + rng.random() / 10,
+            'longitude': -74.0 + rng.random() / 10,
+            'location': {'display_address': [f"{i} Broadway", "New York, NY 10001"]},
+            'categories': [{'alias': 'pizza', 'title': 'Pizza'}, {'alias': 'bars', 'title': 'Bars'}][:int(rng.integers(0, 3))],
+            'secondaryCategories': [{'name': 'Parks'}, {'name': 'Gardens'}][:int(rng.integers(0, 3))],
+            'primaryCategory': {'name': 'Outdoors'},
+            'transactions': ['pickup', 'delivery'][:int(rng.integers(0, 3))],
+            'is_closed': bool(rng.integers(0, 2)),
+            'thumbnail': {'url': f"https://example.com/{i}.jpg"}
+        }
+        detail = {
+            'data': {
+                'location': {'street1': f"{i} Broadway", 'street2': None, 'city': 'New York', 'state': 'NY', 'postalCode': '10001'},
+                'website': f"https://example.com/{i}",
+                'suggestedDuration': '1-2 hours',
+                'openingHours': ['Mon 9-5', 'Tue 9-5']
+            }
+        }
+        if hours:
+            detail['hours'] = [{'open': hours}]
+
+        records.append({'city': 'New York', 'item': item, 'detail': detail})
+
+    return records
+
+def per_row_restaurant(record):
+    """
+    How restaurantsTable built each row before normalize(), as the baseline
+    """
+    business, detail_data, city_name = record['item'], record['detail'], record['city']
+    categories = [category.get('title') for category in business.get('categories', [])]
+
+    hours = []
+    if 'hours' in detail_data:
+        for hour in detail_data['hours'][0].get('open', []):
+            day = hour.get('day')
+            start = hour.get('start')
+            end = hour.get('end')
+            hours.append(f"{day}:{start}-{end}")
+
+    return {
+        'restaurant_id': business.get('id'),
+        'city': city_name,
+        'name': business.get('name', ''),
+        'address': ', '.join(business.get('location', {}).get('display_address', [])),
+        'latitude': business.get('coordinates', {}).get('latitude', 0),
+        'longitude': business.get('coordinates', {}).get('longitude', 0),
+        'rating': business.get('rating', 0),
+        'review_count': business.get('review_count', 0),
+        'price_level': business.get('price', ''),
+        'phone': business.get('display_phone', ''),
+        'url': business.get('url', ''),
+        'image_url': business.get('image_url', ''),
+        'cuisine_types': ','.join(categories),
+        'is_closed': 1 if business.get('is_closed', True) else 0,
+        'transactions': ','.join(business.get('transactions', [])),
+        'operating_hours': ';'.join(hours),
+        'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+def per_row_attraction(record):
+    """
+    How attractionsTable built each row before normalize(), as the baseline
+    """
+    attraction, detail_data, city_name = record['item'], record['detail'], record['city']
+
+    address = ''
+    if 'data' in detail_data and 'location' in detail_data['data']:
+        address_obj = detail_data['data']['location']
+        address_parts = []
+
+        if 'street1' in address_obj and address_obj['street1']:
+            address_parts.append(address_obj['street1'])
+        if 'street2' in address_obj and address_obj['street2']:
+            address_parts.append(address_obj['street2'])
+        if 'city' in address_obj and address_obj['city']:
+            address_parts.append(address_obj['city'])
+        if 'state' in address_obj and address_obj['state']:
+            address_parts.append(address_obj['state'])
+        if 'postalCode' in address_obj and address_obj['postalCode']:
+            address_parts.append(address_obj['postalCode'])
+
+        address = ', '.join(address_parts)
+
+    return {
+        'attraction_id': attraction.get('locationId'),
+        'city': city_name,
+        'name': attraction.get('title', ''),
+        'description': attraction.get('description', ''),
+        'address': address,
+        'latitude': attraction.get('latitude', 0),
+        'longitude': attraction.get('longitude', 0),
+        'rating': attraction.get('averageRating', 0),
+        'review_count': attraction.get('reviewCount', 0),
+        'category': attraction.get('primaryCategory', {}).get('name', ''),
+        'subcategory': ','.join([subcat.get('name', '') for subcat in attraction.get('secondaryCategories', [])]),
+        'price_level': attraction.get('priceLevel', ''),
+        'price_range': attraction.get('priceRange', ''),
+        'website': detail_data.get('data', {}).get('website', ''),
+        'image_url': attraction.get('thumbnail', {}).get('url', ''),
+        'suggested_duration': detail_data.get('data', {}).get('suggestedDuration', ''),
+        'opening_hours': ', '.join(detail_data.get('data', {}).get('openingHours', [])),
+        'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+def main():
+    import pandas as pd
+    from restaurantsTable import RESTAURANTS_SCHEMA
+    from attractionsTable import ATTRACTIONS_SCHEMA
+    from recordStream import BATCH_SIZE
+
+    n = 100000
+    records = synthetic_records(n)
+    batches = [records[start:start + BATCH_SIZE] for start in range(0, n, BATCH_SIZE)]
+    print(f"{n} records in batches of {BATCH_SIZE}")
+
+    for entity, per_row, schema in [
+        ('restaurants', per_row_restaurant, RESTAURANTS_SCHEMA),
+        ('attractions', per_row_attraction, ATTRACTIONS_SCHEMA)
+    ]:
+        start = time.perf_counter()
+        expected = [pd.DataFrame([per_row(record) for record in batch]) for batch in batches]
+        per_row_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = [normalize(schema, batch) for batch in batches]
+        normalize_elapsed = time.perf_counter() - start
+
+        expected, actual = pd.concat(expected, ignore_index=True), pd.concat(actual, ignore_index=True)
+        mismatched = [
+            column for column in expected.columns
+            if column != 'updated_at' and not (expected[column].astype(str).to_numpy() == actual[column].astype(str).to_numpy()).all()
+        ]
+
+        print(f"{entity}: per-row {n / per_row_elapsed:,.0f} rows/s, normalize {n / normalize_elapsed:,.0f} rows/s "
+              f"({per_row_elapsed / normalize_elapsed:.1f}x)")
+        if mismatched:
+            print(f"  columns differing from the per-row output: {', '.join(mismatched)}")
+
+if __name__ == "__main__":
+    main()
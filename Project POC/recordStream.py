@@ -0,0 +1,79 @@
+from datetime import datetime
+import time
+import os
+import metrics
+
+BATCH_SIZE = int(os.getenv('BATCH_SIZE', '500'))
+FLUSH_INTERVAL = float(os.getenv('FLUSH_INTERVAL', '30'))
+STREAM_SINK = os.getenv('STREAM_SINK', 'warehouse')
+PARQUET_DIR = os.getenv('PARQUET_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output'))
+
+def batched(rows, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+    """
+    Group a row stream into lists of at most batch_size rows. A partial batch
+    is also released once flush_interval seconds have passed since its first
+    row (checked as rows arrive)
+    """
+    batch = []
+    started = time.monotonic()
+
+    for row in rows:
+        if not batch:
+            started = time.monotonic()
+
+        batch.append(row)
+
+        if len(batch) >= batch_size or time.monotonic() - started >= flush_interval:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+def build_frame(rows):
+    import pandas as pd
+
+    return pd.DataFrame(rows)
+
+def stream_to_sink(rows, flush, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, build=build_frame, table=''):
+    """
+    Build a DataFrame per batch with build(batch) and hand it to flush(df).
+    Returns the number of rows flushed. Time spent waiting on the row stream
+    (fetch), building (transform) and flushing (load) is recorded per batch
+    in metrics, labelled with `table`
+    """
+    total = 0
+    waiting = time.perf_counter()
+
+    for batch in batched(rows, batch_size, flush_interval):
+        metrics.observe('stage_seconds', time.perf_counter() - waiting, stage='fetch', table=table)
+        metrics.count_rows('fetch', len(batch), table=table)
+
+        with metrics.stage_timer('transform', table=table):
+            df = build(batch)
+        with metrics.stage_timer('load', table=table):
+            flush(df)
+        metrics.count_rows('load', len(df), table=table)
+
+        total += len(df)
+        print(f"Flushed {len(df)} rows ({total} so far)")
+        waiting = time.perf_counter()
+
+    return total
+
+def parquet_sink(table, directory=PARQUET_DIR):
+    """
+    Flush function writing each batch to its own Parquet part file under
+    directory/table, named by run start time and batch number
+    """
+    table_dir = os.path.join(directory, table.lower())
+    os.makedirs(table_dir, exist_ok=True)
+    run_id = datetime.now().strftime('%Y%m%d%H%M%S')
+    part = [0]
+
+    def flush(df):
+        path = os.path.join(table_dir, f"part-{run_id}-{part[0]:05d}.parquet")
+        df.to_parquet(path, index=False)
+        part[0] += 1
+
+    return flush
@@ -0,0 +1,172 @@
+import requests
+import sqlite3
+import threading
+import hashlib
+import json
+import time
+import os
+from urllib.parse import urlparse, parse_qsl
+
+CACHE_ENABLED = os.getenv('RESPONSE_CACHE', '1') != '0'
+CACHE_PATH = os.getenv('RESPONSE_CACHE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'responses.sqlite'))
+CACHE_MAX_BYTES = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+
+DAY = 24 * 60 * 60
+
+# TTL in seconds by URL prefix; the longest matching prefix wins and endpoints
+# without an entry (or with a TTL of 0) are never cached.
+CACHE_TTLS = {
+    "https://booking-com.p.rapidapi.com/v1/hotels/details": 7 * DAY,
+    "https://tripadvisor16.p.rapidapi.com/api/v1/attractions/getAttractionDetails": 7 * DAY,
+    "https://api.yelp.com/v3/businesses/": 7 * DAY,
+    "https://api.yelp.com/v3/businesses/search": 0,
+    "https://maps.googleapis.com/maps/api/place/details/json": 30 * DAY
+}
+
+# Credentials are left out of the cache key so rotating a key keeps the cache warm
+SECRET_PARAMS = {'key', 'appid'}
+
+def get_ttl(url):
+    matches = [prefix for prefix in CACHE_TTLS if url.startswith(prefix)]
+    if not matches:
+        return 0
+    return CACHE_TTLS[max(matches, key=len)]
+
+def cache_key(provider, url, params=None):
+    """
+    Content address for a request: hash of provider, URL and sorted params
+    """
+    prepared = requests.Request('GET', url, params=params).prepare()
+    parsed = urlparse(prepared.url)
+    query = sorted(
+        pair for pair in parse_qsl(parsed.query, keep_blank_values=True)
+        if pair[0] not in SECRET_PARAMS
+    )
+    raw = json.dumps([provider, parsed.scheme, parsed.netloc, parsed.path, query])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+class ResponseCache:
+    """
+    SQLite-backed response store with per-entry expiry, validators for
+    conditional requests and LRU eviction once the total size passes max_bytes
+    """
+    def __init__(self, path=CACHE_PATH, max_bytes=CACHE_MAX_BYTES):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            url TEXT,
+            status INTEGER,
+            headers TEXT,
+            body BLOB,
+            size INTEGER,
+            etag TEXT,
+            last_modified TEXT,
+            stored_at REAL,
+            expires_at REAL,
+            accessed_at REAL
+        )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self.conn.commit()
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT status, headers, body, etag, last_modified, expires_at FROM responses WHERE key = ?",
+                (key,)
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            self.conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+
+        status, headers, body, etag, last_modified, expires_at = row
+        return {
+            'status': status,
+            'headers': json.loads(headers),
+            'body': body,
+            'etag': etag,
+            'last_modified': last_modified,
+            'fresh': expires_at > time.time()
+        }
+
+    def put(self, key, url, response, ttl):
+        now = time.time()
+        body = response.content
+
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key, url, response.status_code,
+                    json.dumps({'Content-Type': response.headers.get('Content-Type', 'application/json')}),
+                    body, len(body),
+                    response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                    now, now + ttl, now
+                )
+            )
+            self.evict()
+            self.conn.commit()
+
+    def touch(self, key, ttl):
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "UPDATE responses SET stored_at = ?, expires_at = ?, accessed_at = ? WHERE key = ?",
+                (now, now + ttl, now, key)
+            )
+            self.conn.commit()
+
+    def evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = self.conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+        expired = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            expired.append((key,))
+            total -= size
+
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", expired)
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
+
+def to_response(entry, url):
+    response = requests.Response()
+    response.status_code = entry['status']
+    response._content = entry['body']
+    response.headers.update(entry['headers'])
+    response.url = url
+    response.from_cache = True
+    return response
+
+def conditional_headers(entry):
+    headers = {}
+    if entry['etag']:
+        headers['If-None-Match'] = entry['etag']
+    if entry['last_modified']:
+        headers['If-Modified-Since'] = entry['last_modified']
+    return headers
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
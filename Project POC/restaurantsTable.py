@@ -1,11 +1,19 @@
-import requests
 import json
-import pandas as pd
-import snowflake.connector
-from snowflake.connector.pandas_tools import write_pandas
-from datetime import datetime
 import os
 from dotenv import load_dotenv
+from warehouseLoader import load_dataframe
+from warehouse import get_pool, ensure_table
+from changeTracker import ChangeTracker
+from detailFetcher import fetch_details
+from httpClient import http_get
+import metrics
+import gazetteer
+import crawlJournal
+from pagination import paginate, page_count
+from cityScheduler import CITY_WORKERS, stream_units, parse_args
+from recordStream import BATCH_SIZE, FLUSH_INTERVAL, STREAM_SINK, stream_to_sink, parquet_sink
+from recordSchema import field, flag, joined, parsed, timestamp, frame_builder
+from openingHours import INTERVALS_COLUMN, yelp_intervals
 
 load_dotenv()
 
@@ -13,16 +21,60 @@ YELP_API_KEY = os.getenv('YELP_API_KEY')
 BASE_URL = "https://api.yelp.com/v3/businesses/search"
 DETAILS_URL = "https://api.yelp.com/v3/businesses/"
 
-SNOWFLAKE_USER = os.getenv('SNOWFLAKE_USER')
-SNOWFLAKE_PASSWORD = os.getenv('SNOWFLAKE_PASSWORD')
-SNOWFLAKE_ACCOUNT = os.getenv('SNOWFLAKE_ACCOUNT')
-SNOWFLAKE_WAREHOUSE = os.getenv('SNOWFLAKE_WAREHOUSE')
-SNOWFLAKE_DATABASE = os.getenv('SNOWFLAKE_DATABASE')
-SNOWFLAKE_SCHEMA = os.getenv('SNOWFLAKE_SCHEMA')
+tracker = ChangeTracker()
 
-CITIES = ["New York", "San Francisco", "Chicago", "Seattle", "Las Vegas", "Los Angeles"]
+# Yelp rejects searches where offset + limit exceeds this
+YELP_MAX_RESULTS = 240
 
-def get_restaurants(city_name, limit=50, offset=0):
+RESTAURANTS_DDL = """
+CREATE TABLE IF NOT EXISTS restaurants (
+    restaurant_id VARCHAR PRIMARY KEY,
+    city VARCHAR,
+    name VARCHAR,
+    address VARCHAR,
+    latitude FLOAT,
+    longitude FLOAT,
+    rating FLOAT,
+    review_count INTEGER,
+    price_level VARCHAR,
+    phone VARCHAR,
+    url VARCHAR,
+    image_url VARCHAR,
+    cuisine_types VARCHAR,
+    is_closed BOOLEAN,
+    transactions VARCHAR,
+    operating_hours VARCHAR,
+    opening_intervals VARCHAR,
+    updated_at TIMESTAMP_NTZ,
+    row_hash VARCHAR
+)
+"""
+
+# Raw {'city', 'item': search result, 'detail': business details} record -> row
+RESTAURANTS_SCHEMA = {
+    'restaurant_id': field('item.id', None),
+    'city': field('city'),
+    'name': field('item.name'),
+    'address': joined('item.location.display_address', ', '),
+    'latitude': field('item.coordinates.latitude', 0, 'float64'),
+    'longitude': field('item.coordinates.longitude', 0, 'float64'),
+    'rating': field('item.rating', 0, 'float64'),
+    'review_count': field('item.review_count', 0, 'int64'),
+    'price_level': field('item.price'),
+    'phone': field('item.display_phone'),
+    'url': field('item.url'),
+    'image_url': field('item.image_url'),
+    'cuisine_types': joined('item.categories', ',', key='title'),
+    'is_closed': flag('item.is_closed', True),
+    'transactions': joined('item.transactions', ','),
+    'operating_hours': joined('detail.hours.0.open', ';', template='{day}:{start}-{end}'),
+    INTERVALS_COLUMN: parsed('operating_hours', yelp_intervals),
+    'updated_at': timestamp()
+}
+
+CITIES = gazetteer.CITIES
+
+def get_restaurants(city_name, limit=50):
     headers = {
         "Authorization": f"Bearer {YELP_API_KEY}",
         "accept": "application/json"
@@ -32,121 +84,111 @@ def get_restaurants(city_name, limit=50, offset=0):
         "location": city_name,
         "term": "restaurants",
         "limit": limit,
-        "offset": offset,
         "sort_by": "best_match"
     }
     
+    crawl = crawlJournal.run('restaurants')
+    
+    def fetch_page(page):
+        offset = page * limit
+        page_params = dict(params, offset=offset, limit=min(limit, YELP_MAX_RESULTS - offset))
+        return http_get('yelp', BASE_URL, headers=headers, params=page_params).json()
+    
     try:
-        response = requests.get(BASE_URL, headers=headers, params=params)
-        data = response.json()
+        results = paginate(
+            crawl.pages('yelp', city_name, fetch_page),
+            lambda payload: payload.get('businesses', []),
+            lambda business: business.get('id'),
+            lambda payload, page_size: page_count(min(payload.get('total', 0), YELP_MAX_RESULTS), limit)
+        )
         
-        if 'businesses' in data:
-            restaurants = []
+        if results:
+            changed = tracker.changed('restaurants', results, 'id')
             
-            for business in data['businesses']:
-                business_id = business.get('id')
-                detail_response = requests.get(f"{DETAILS_URL}{business_id}", headers=headers)
-                detail_data = detail_response.json()
-                
-                categories = [category.get('title') for category in business.get('categories', [])]
-                
-                hours = []
-                if 'hours' in detail_data:
-                    for hour in detail_data['hours'][0].get('open', []):
-                        day = hour.get('day')
-                        start = hour.get('start')
-                        end = hour.get('end')
-                        hours.append(f"{day}:{start}-{end}")
-                
-                restaurant_info = {
-                    'restaurant_id': business_id,
-                    'city': city_name,
-                    'name': business.get('name', ''),
-                    'address': ', '.join(business.get('location', {}).get('display_address', [])),
-                    'latitude': business.get('coordinates', {}).get('latitude', 0),
-                    'longitude': business.get('coordinates', {}).get('longitude', 0),
-                    'rating': business.get('rating', 0),
-                    'review_count': business.get('review_count', 0),
-                    'price_level': business.get('price', ''),
-                    'phone': business.get('display_phone', ''),
-                    'url': business.get('url', ''),
-                    'image_url': business.get('image_url', ''),
-                    'cuisine_types': ','.join(categories),
-                    'is_closed': 1 if business.get('is_closed', True) else 0,
-                    'transactions': ','.join(business.get('transactions', [])),
-                    'operating_hours': ';'.join(hours),
-                    'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                }
-                
-                restaurants.append(restaurant_info)
+            detail_requests = [
+                {'url': f"{DETAILS_URL}{business.get('id')}", 'headers': headers}
+                for business in changed
+            ]
+            details = fetch_details(detail_requests, 'yelp', crawl=crawl, city=city_name)
+            failed = [business.get('id') for business, detail_data in zip(changed, details) if not detail_data]
+            tracker.discard('restaurants', failed)
+            if failed:
+                crawl.incomplete()
             
-            return restaurants
+            return [
+                {'city': city_name, 'item': business, 'detail': detail_data}
+                for business, detail_data in zip(changed, details)
+            ]
     
     except Exception as e:
         print(f"Error fetching restaurant data for {city_name}: {e}")
     
     return []
 
-def main():
-    all_restaurants = []
+def fetch_city(city):
+    print(f"Processing restaurants in {city}...")
+    restaurants = get_restaurants(city, limit=50)
     
-    for city in CITIES:
-        print(f"Processing restaurants in {city}...")
-        
-        for offset in [0, 50]:
-            restaurants = get_restaurants(city, limit=50, offset=offset)
-            
-            if restaurants:
-                all_restaurants.extend(restaurants)
-                print(f"Found {len(restaurants)} restaurants in {city} (offset: {offset})")
-            else:
-                print(f"Could not retrieve restaurant data for {city} (offset: {offset})")
-    
-    df = pd.DataFrame(all_restaurants)
+    if restaurants:
+        print(f"Found {len(restaurants)} new or changed restaurants in {city}")
+    else:
+        print(f"Could not retrieve restaurant data for {city}")
     
-    try:
-        conn = snowflake.connector.connect(
-            user=SNOWFLAKE_USER,
-            password=SNOWFLAKE_PASSWORD,
-            account=SNOWFLAKE_ACCOUNT,
-            warehouse=SNOWFLAKE_WAREHOUSE,
-            database=SNOWFLAKE_DATABASE,
-            schema=SNOWFLAKE_SCHEMA
-        )
+    return restaurants
 
-        cursor = conn.cursor()
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS restaurants (
-            restaurant_id VARCHAR PRIMARY KEY,
-            city VARCHAR,
-            name VARCHAR,
-            address VARCHAR,
-            latitude FLOAT,
-            longitude FLOAT,
-            rating FLOAT,
-            review_count INTEGER,
-            price_level VARCHAR,
-            phone VARCHAR,
-            url VARCHAR,
-            image_url VARCHAR,
-            cuisine_types VARCHAR,
-            is_closed BOOLEAN,
-            transactions VARCHAR,
-            operating_hours VARCHAR,
-            updated_at TIMESTAMP_NTZ
-        )
-        """)
-        
-        success, num_chunks, num_rows, output = write_pandas(conn, df, 'RESTAURANTS')
+def replayed(rows):
+    """
+    Restore the fingerprints of journaled rows, leaving out failed detail fetches
+    """
+    tracker.remember('restaurants', [row['item'] for row in rows if row['detail']], 'id')
+
+def get_restaurant_data(workers=CITY_WORKERS):
+    """
+    Stream restaurant records for every city
+    """
+    return stream_units(crawlJournal.run('restaurants').units(fetch_city, replayed), CITIES, workers)
+
+def main(workers=CITY_WORKERS, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, sink=STREAM_SINK):
+    from facetIndex import FacetIndex, indexed
+    
+    crawl = crawlJournal.run('restaurants')
+    rows = get_restaurant_data(workers)
+    build = frame_builder(RESTAURANTS_SCHEMA)
+    facets = FacetIndex.open('restaurants')
+    
+    if sink == 'parquet':
+        write = parquet_sink('RESTAURANTS')
         
-        print(f"Data loaded successfully: {success}")
-        print(f"Number of chunks: {num_chunks}")
-        print(f"Number of rows: {num_rows}")
+        def flush(df):
+            write(df)
+            tracker.commit('restaurants', df['restaurant_id'])
         
-        conn.close()
+        total = stream_to_sink(rows, indexed(flush, facets), batch_size, flush_interval, build, table='RESTAURANTS')
+        facets.save()
+        crawl.finish()
+        print(f"Wrote {total} restaurants to Parquet")
+        return
+    
+    try:
+        with get_pool().connection() as conn:
+            ensure_table(conn, 'RESTAURANTS', RESTAURANTS_DDL, {INTERVALS_COLUMN: 'VARCHAR'})
+            
+            def flush(df):
+                load_dataframe(conn, df, 'RESTAURANTS', ['restaurant_id'])
+                tracker.commit('restaurants', df['restaurant_id'])
+            
+            total = stream_to_sink(rows, indexed(flush, facets), batch_size, flush_interval, build, table='RESTAURANTS')
+            facets.save()
+            crawl.finish()
+            
+            if not total:
+                print("No new or changed restaurants to load")
         
     except Exception as e:
         print(f"Error connecting to Snowflake: {e}")
+        raise
 
 if __name__ == "__main__":
-    main()
+    args = parse_args("Load Yelp restaurants into Snowflake")
+    with metrics.profiled('restaurants'):
+        main(workers=args.workers, batch_size=args.batch_size, flush_interval=args.flush_interval, sink=args.sink)
@@ -0,0 +1,192 @@
+import json
+import math
+import ast
+import re
+
+METRICS = ['cost', 'duration', 'transfers']
+
+ROUTE_COLUMNS = [
+    "ORIGIN_CITY", "DESTINATION_CITY", "ROUTE_NAME", "ROUTE_TYPE",
+    "TOTAL_DISTANCE", "TOTAL_DURATION", "PRICE_LOW", "PRICE_HIGH", "SEGMENTS"
+]
+
+def parse_segments(segments):
+    """
+    SEGMENTS is JSON; rows loaded before it was are Python reprs
+    """
+    if not segments:
+        return []
+    if isinstance(segments, list):
+        return segments
+    try:
+        return json.loads(segments)
+    except ValueError:
+        return ast.literal_eval(segments)
+
+def leg_value(route, metric):
+    if metric == 'cost':
+        price = route.get("PRICE_LOW")
+        if price is None or price != price:
+            price = route.get("PRICE_HIGH")
+        return math.inf if price is None or price != price else float(price)
+    if metric == 'duration':
+        duration = route.get("TOTAL_DURATION")
+        return math.inf if duration is None or duration != duration else float(duration)
+    return float(max(1, len(parse_segments(route.get("SEGMENTS")))))
+
+def all_pairs(weights):
+    """
+    Floyd-Warshall over a dense weight matrix, one vectorized relaxation per
+    intermediate city. Returns (distances, next hop) with -1 where unreachable
+    """
+    import numpy as np
+
+    n = len(weights)
+    dist = weights.copy()
+    np.fill_diagonal(dist, 0)
+    nxt = np.where(np.isfinite(dist), np.arange(n)[None, :], -1)
+    np.fill_diagonal(nxt, np.arange(n))
+
+    for k in range(n):
+        through = dist[:, k, None] + dist[None, k, :]
+        better = through < dist
+        dist = np.where(better, through, dist)
+        nxt = np.where(better, nxt[:, k, None], nxt)
+
+    return dist, nxt
+
+class RouteGraph:
+    """
+    Precomputed city-to-city routing over TRANSPORTATION_DATA rows.
+
+    For each metric ('cost' in USD, 'duration' in minutes, 'transfers' as
+    vehicles used) it keeps the best direct route per ordered pair and the
+    all-pairs shortest paths through intermediate cities, so itinerary
+    queries are answered from arrays without provider calls. NumPy loads on
+    first use, so mirror_route() stays cheap for the fetch path
+    """
+    def __init__(self, routes):
+        import numpy as np
+
+        self.cities = sorted({route["ORIGIN_CITY"] for route in routes} | {route["DESTINATION_CITY"] for route in routes})
+        self.city_index = {city: i for i, city in enumerate(self.cities)}
+        n = len(self.cities)
+
+        self.direct = {metric: np.full((n, n), np.inf) for metric in METRICS}
+        self.direct_route = {metric: np.full((n, n), -1, dtype=np.int64) for metric in METRICS}
+        self.routes = routes
+
+        for position, route in enumerate(routes):
+            i = self.city_index[route["ORIGIN_CITY"]]
+            j = self.city_index[route["DESTINATION_CITY"]]
+            for metric in METRICS:
+                value = leg_value(route, metric)
+                if value < self.direct[metric][i, j]:
+                    self.direct[metric][i, j] = value
+                    self.direct_route[metric][i, j] = position
+
+        self.shortest = {}
+        self.next_hop = {}
+        for metric in METRICS:
+            self.shortest[metric], self.next_hop[metric] = all_pairs(self.direct[metric])
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls(df[[column for column in ROUTE_COLUMNS if column in df.columns]].to_dict('records'))
+
+    @classmethod
+    def from_warehouse(cls, conn, table='TRANSPORTATION_DATA'):
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"SELECT {', '.join(ROUTE_COLUMNS)} FROM {table}")
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+        return cls([dict(zip(ROUTE_COLUMNS, row)) for row in rows])
+
+    def matrix(self, metric, direct=False):
+        """
+        City-by-city matrix (rows/columns in self.cities order); inf where no
+        route exists
+        """
+        return self.direct[metric] if direct else self.shortest[metric]
+
+    def path(self, origin, destination, metric='duration'):
+        """
+        Cities visited on the best path, origin and destination included;
+        empty when unreachable
+        """
+        i, j = self.city_index[origin], self.city_index[destination]
+        nxt = self.next_hop[metric]
+        if nxt[i, j] < 0:
+            return []
+
+        path = [i]
+        while i != j:
+            i = nxt[i, j]
+            path.append(i)
+        return [self.cities[i] for i in path]
+
+    def route(self, origin, destination, metric='duration'):
+        """
+        The legs of the best path as TRANSPORTATION_DATA rows, plus its total
+        """
+        cities = self.path(origin, destination, metric)
+        legs = [
+            self.routes[self.direct_route[metric][self.city_index[a], self.city_index[b]]]
+            for a, b in zip(cities, cities[1:])
+        ]
+        total = self.shortest[metric][self.city_index[origin], self.city_index[destination]]
+        return {'legs': legs, 'total': float(total)}
+
+    def itinerary(self, stops, metric='duration'):
+        """
+        Route through several cities in the given order
+        """
+        legs, total = [], 0.0
+        for origin, destination in zip(stops, stops[1:]):
+            best = self.route(origin, destination, metric)
+            legs.extend(best['legs'])
+            total += best['total']
+        return {'legs': legs, 'total': total}
+
+    def save(self, path):
+        import numpy as np
+
+        arrays = {f"{kind}_{metric}": getattr(self, kind)[metric] for kind in ['direct', 'direct_route', 'shortest', 'next_hop'] for metric in METRICS}
+        np.savez_compressed(path, cities=np.asarray(self.cities), routes=np.asarray(json.dumps(self.routes, default=str)), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        import numpy as np
+
+        data = np.load(path, allow_pickle=False)
+        graph = cls.__new__(cls)
+        graph.cities = [str(city) for city in data['cities']]
+        graph.city_index = {city: i for i, city in enumerate(graph.cities)}
+        graph.routes = json.loads(str(data['routes']))
+        for kind in ['direct', 'direct_route', 'shortest', 'next_hop']:
+            setattr(graph, kind, {metric: data[f"{kind}_{metric}"] for metric in METRICS})
+        return graph
+
+def swap_cities(name, origin, destination):
+    """
+    'Fly from A to B' -> 'Fly from B to A'; names without the cities are kept
+    """
+    if not name or origin == destination:
+        return name
+    swap = {origin: destination, destination: origin}
+    pattern = '|'.join(re.escape(city) for city in sorted(swap, key=len, reverse=True))
+    return re.sub(pattern, lambda match: swap[match.group(0)], name)
+
+def mirror_route(route_entry):
+    """
+    The reverse-direction copy of a route row, for providers whose routes are
+    symmetric
+    """
+    mirrored = dict(route_entry)
+    mirrored["ORIGIN_CITY"] = route_entry["DESTINATION_CITY"]
+    mirrored["DESTINATION_CITY"] = route_entry["ORIGIN_CITY"]
+    mirrored["ROUTE_NAME"] = swap_cities(route_entry.get("ROUTE_NAME"), route_entry["ORIGIN_CITY"], route_entry["DESTINATION_CITY"])
+    mirrored["SEGMENTS"] = json.dumps(list(reversed(parse_segments(route_entry["SEGMENTS"]))))
+    return mirrored
@@ -0,0 +1,190 @@
+import numpy as np
+import time
+
+EARTH_RADIUS_M = 6371008.8
+CELL_SIZE_M = 250
+
+# Entity type -> id column of its table
+ENTITY_ID_COLUMNS = {
+    'hotel': 'hotel_id',
+    'restaurant': 'restaurant_id',
+    'attraction': 'attraction_id'
+}
+
+def haversine(lat1, lng1, lat2, lng2):
+    """
+    Great-circle distance in meters; any argument may be a NumPy array
+    """
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+class SpatialIndex:
+    """
+    Grid index over one city's points. Coordinates are projected to meters
+    around the city centroid and bucketed into square cells; cells are laid
+    out row by row so each row of a query window is one contiguous slice.
+    Candidates from the window are filtered with exact haversine distances
+    """
+    def __init__(self, lats, lngs, ids, kinds, cell_size=CELL_SIZE_M):
+        lats = np.asarray(lats, dtype=np.float64)
+        lngs = np.asarray(lngs, dtype=np.float64)
+
+        self.cell_size = cell_size
+        self.kind_names = sorted(set(kinds))
+        kind_codes = np.searchsorted(self.kind_names, np.asarray(kinds))
+
+        self.lat0 = float(lats.mean()) if len(lats) else 0.0
+        self.lng0 = float(lngs.mean()) if len(lngs) else 0.0
+        x, y = self.project(lats, lngs)
+
+        self.x_min = float(x.min()) if len(x) else 0.0
+        self.y_min = float(y.min()) if len(y) else 0.0
+        cx = ((x - self.x_min) // cell_size).astype(np.int64)
+        cy = ((y - self.y_min) // cell_size).astype(np.int64)
+        self.nx = int(cx.max()) + 1 if len(cx) else 1
+        self.ny = int(cy.max()) + 1 if len(cy) else 1
+
+        cells = cy * self.nx + cx
+        order = np.argsort(cells, kind='stable')
+
+        self.cells = cells[order]
+        self.lats = lats[order]
+        self.lngs = lngs[order]
+        self.ids = np.asarray(ids, dtype=object)[order]
+        self.kinds = kind_codes[order]
+
+    @classmethod
+    def from_frames(cls, frames, cell_size=CELL_SIZE_M):
+        """
+        Build from {'hotel': hotels_df, 'restaurant': ..., 'attraction': ...},
+        each with latitude/longitude and the id column in ENTITY_ID_COLUMNS.
+        Rows without coordinates are skipped
+        """
+        lats, lngs, ids, kinds = [], [], [], []
+
+        for kind, df in frames.items():
+            df = df[(df['latitude'].fillna(0) != 0) | (df['longitude'].fillna(0) != 0)]
+            lats.append(df['latitude'].to_numpy(dtype=np.float64))
+            lngs.append(df['longitude'].to_numpy(dtype=np.float64))
+            ids.append(df[ENTITY_ID_COLUMNS.get(kind, 'id')].to_numpy(dtype=object))
+            kinds.extend([kind] * len(df))
+
+        return cls(np.concatenate(lats), np.concatenate(lngs), np.concatenate(ids), kinds, cell_size)
+
+    def project(self, lats, lngs):
+        x = EARTH_RADIUS_M * np.radians(np.asarray(lngs) - self.lng0) * np.cos(np.radians(self.lat0))
+        y = EARTH_RADIUS_M * np.radians(np.asarray(lats) - self.lat0)
+        return x, y
+
+    def candidates(self, lat, lng, radius_m):
+        # Widen the window slightly: the projection is exact only at the centroid
+        reach = radius_m * 1.02 + 1
+        x, y = self.project(lat, lng)
+        x0 = max(0, int((x - reach - self.x_min) // self.cell_size))
+        x1 = min(self.nx - 1, int((x + reach - self.x_min) // self.cell_size))
+        y0 = max(0, int((y - reach - self.y_min) // self.cell_size))
+        y1 = min(self.ny - 1, int((y + reach - self.y_min) // self.cell_size))
+
+        if x0 > x1 or y0 > y1:
+            return np.empty(0, dtype=np.int64)
+
+        rows = np.arange(y0, y1 + 1) * self.nx
+        starts = np.searchsorted(self.cells, rows + x0, side='left')
+        ends = np.searchsorted(self.cells, rows + x1, side='right')
+
+        return np.concatenate([np.arange(start, end) for start, end in zip(starts, ends)])
+
+    def kind_mask(self, positions, kinds):
+        codes = [self.kind_names.index(kind) for kind in kinds if kind in self.kind_names]
+        return np.isin(self.kinds[positions], codes)
+
+    def result(self, positions, distances):
+        order = np.argsort(distances, kind='stable')
+        positions = positions[order]
+        return {
+            'kind': np.asarray(self.kind_names, dtype=object)[self.kinds[positions]] if len(positions) else np.empty(0, dtype=object),
+            'id': self.ids[positions],
+            'latitude': self.lats[positions],
+            'longitude': self.lngs[positions],
+            'distance': distances[order]
+        }
+
+    def radius(self, lat, lng, radius_m, kinds=None):
+        """
+        Every point within radius_m meters, nearest first, optionally limited
+        to some entity kinds
+        """
+        positions = self.candidates(lat, lng, radius_m)
+        if kinds is not None:
+            positions = positions[self.kind_mask(positions, kinds)]
+
+        distances = haversine(lat, lng, self.lats[positions], self.lngs[positions])
+        inside = distances <= radius_m
+        return self.result(positions[inside], distances[inside])
+
+    def nearest(self, lat, lng, k=10, kinds=None):
+        """
+        The k nearest points. Searches a growing radius until it holds k
+        points, which makes the answer exact
+        """
+        reach = self.cell_size
+        limit = self.cell_size * (self.nx + self.ny) * 2 + haversine(lat, lng, self.lat0, self.lng0)
+
+        while True:
+            found = self.radius(lat, lng, reach, kinds)
+            if len(found['id']) >= k or reach > limit:
+                return {name: values[:k] for name, values in found.items()}
+            reach *= 2
+
+    def radius_batch(self, lats, lngs, radius_m, kinds=None):
+        return [self.radius(lat, lng, radius_m, kinds) for lat, lng in zip(lats, lngs)]
+
+    def nearest_batch(self, lats, lngs, k=10, kinds=None):
+        return [self.nearest(lat, lng, k, kinds) for lat, lng in zip(lats, lngs)]
+
+    def __len__(self):
+        return len(self.ids)
+
+def build_city_indexes(frames, cell_size=CELL_SIZE_M):
+    """
+    One SpatialIndex per city from the HOTELS / RESTAURANTS / ATTRACTIONS
+    frames, keyed by their `city` column
+    """
+    cities = set()
+    for df in frames.values():
+        cities.update(df['city'].dropna().unique())
+
+    return {
+        city: SpatialIndex.from_frames({kind: df[df['city'] == city] for kind, df in frames.items()}, cell_size)
+        for city in sorted(cities)
+    }
+
+def main():
+    rng = np.random.default_rng(0)
+    n = 100000
+    lats = 40.7128 + rng.normal(0, 0.05, n)
+    lngs = -74.0060 + rng.normal(0, 0.06, n)
+    kinds = rng.choice(['hotel', 'restaurant', 'attraction'], n)
+
+    start = time.perf_counter()
+    index = SpatialIndex(lats, lngs, np.arange(n), kinds)
+    print(f"Built index over {n} points in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    query_lats = 40.7128 + rng.normal(0, 0.05, 1000)
+    query_lngs = -74.0060 + rng.normal(0, 0.06, 1000)
+
+    for label, run in [
+        ("radius 1 km", lambda lat, lng: index.radius(lat, lng, 1000)),
+        ("radius 1 km restaurants", lambda lat, lng: index.radius(lat, lng, 1000, kinds=['restaurant'])),
+        ("10 nearest", lambda lat, lng: index.nearest(lat, lng, 10)),
+        ("brute-force radius 1 km", lambda lat, lng: np.nonzero(haversine(lat, lng, lats, lngs) <= 1000)[0])
+    ]:
+        start = time.perf_counter()
+        for lat, lng in zip(query_lats, query_lngs):
+            run(lat, lng)
+        elapsed = (time.perf_counter() - start) / len(query_lats)
+        print(f"{label}: {elapsed * 1000:.3f} ms per query")
+
+if __name__ == "__main__":
+    main()
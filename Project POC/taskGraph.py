@@ -0,0 +1,163 @@
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import importlib
+import argparse
+import time
+import os
+import metrics
+import gazetteer
+from cityScheduler import CITY_WORKERS
+from recordStream import BATCH_SIZE, FLUSH_INTERVAL, STREAM_SINK
+
+# Tables built at the same time; each still fetches its cities with its own workers
+TASK_CONCURRENCY = int(os.getenv('TASK_CONCURRENCY', '3'))
+
+class Task:
+    """
+    One table build: run(options, upstream) gets the loader options and the
+    outputs of its upstream tasks by name, and returns its own output. Outputs
+    stay small and JSON-friendly so they can travel through Airflow XComs
+    """
+    def __init__(self, name, run, upstream=()):
+        self.name = name
+        self.run = run
+        self.upstream = tuple(upstream)
+
+def build_destinations(options, upstream):
+    import destinationTable
+
+    return destinationTable.main(**options)
+
+def located_table(module_name, cities_attribute):
+    """
+    A table built over the cities destinations resolved, with their place ids
+    and coordinates seeded into the gazetteer instead of looked up again
+    """
+    def run(options, upstream):
+        module = importlib.import_module(module_name)
+        locations = upstream.get('destinations')
+        if locations:
+            gazetteer.seed(locations)
+            setattr(module, cities_attribute, [city for city in getattr(module, cities_attribute) if city in locations])
+        module.main(**options)
+    return run
+
+def table(module_name):
+    def run(options, upstream):
+        importlib.import_module(module_name).main(**options)
+    return run
+
+TASKS = {
+    task.name: task for task in [
+        Task('destinations', build_destinations),
+        Task('hotels', located_table('hotelsTable', 'CITIES'), ['destinations']),
+        Task('attractions', located_table('attractionsTable', 'CITIES'), ['destinations']),
+        Task('weather', located_table('weatherTable', 'cities'), ['destinations']),
+        Task('restaurants', table('restaurantsTable')),
+        Task('transportation', table('transportationTable'))
+    ]
+}
+
+def with_upstream(names, tasks=TASKS):
+    """
+    The named tasks plus everything they depend on, in declaration order
+    """
+    selected, stack = set(), list(names)
+    while stack:
+        name = stack.pop()
+        if name not in selected:
+            selected.add(name)
+            stack.extend(tasks[name].upstream)
+    return [name for name in tasks if name in selected]
+
+def run_graph(names=None, options=None, concurrency=TASK_CONCURRENCY, tasks=TASKS):
+    """
+    Run tasks in one process, each as soon as its upstream tasks have finished,
+    up to `concurrency` at a time. A failed task skips everything downstream
+    of it. Returns {task: 'ok' | 'failed' | 'skipped'}
+    """
+    pending = {name: tasks[name] for name in with_upstream(names or list(tasks), tasks)}
+    options = options or {}
+    outputs, status, running = {}, {}, {}
+
+    def execute(task, upstream):
+        with metrics.timer('task_seconds', task=task.name):
+            return task.run(options, upstream)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while pending or running:
+            for name, task in list(pending.items()):
+                if any(status.get(upstream) in ('failed', 'skipped') for upstream in task.upstream):
+                    status[name] = 'skipped'
+                    del pending[name]
+                elif all(upstream in outputs for upstream in task.upstream):
+                    print(f"Starting {name}")
+                    running[pool.submit(execute, task, {upstream: outputs.get(upstream) for upstream in task.upstream})] = name
+                    del pending[name]
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    outputs[name] = future.result()
+                    status[name] = 'ok'
+                except Exception as e:
+                    print(f"Task {name} failed: {e}")
+                    status[name] = 'failed'
+                metrics.increment('tasks_total', task=name, status=status[name])
+                print(f"Finished {name}: {status[name]}")
+
+    return status
+
+def airflow_callable(task, options):
+    def run(ti, **context):
+        upstream = {name: ti.xcom_pull(task_ids=name) for name in task.upstream}
+        return task.run(options, upstream)
+    return run
+
+def airflow_dag(dag_id='travel_tables', schedule=None, options=None, tasks=TASKS, **dag_args):
+    """
+    The same graph as an Airflow DAG, one PythonOperator per task with outputs
+    passed through XComs. For the dags folder:
+
+        from taskGraph import airflow_dag
+        dag = airflow_dag(schedule='@daily', start_date=datetime(2025, 1, 1))
+    """
+    from airflow import DAG
+    from airflow.operators.python import PythonOperator
+
+    with DAG(dag_id, schedule=schedule, catchup=False, **dag_args) as dag:
+        operators = {
+            name: PythonOperator(task_id=name, python_callable=airflow_callable(task, options or {}))
+            for name, task in tasks.items()
+        }
+        for name, task in tasks.items():
+            for upstream in task.upstream:
+                operators[upstream] >> operators[name]
+    return dag
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build the tables in dependency order, independent ones concurrently")
+    parser.add_argument('--tasks', default=','.join(TASKS), help='comma-separated tasks to run (their upstream tasks run too)')
+    parser.add_argument('--concurrency', type=int, default=TASK_CONCURRENCY, help='tasks run at the same time')
+    parser.add_argument('--workers', type=int, default=CITY_WORKERS, help='number of cities each task fetches in parallel')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='rows per flush')
+    parser.add_argument('--flush-interval', type=float, default=FLUSH_INTERVAL, help='seconds before a partial batch is flushed')
+    parser.add_argument('--sink', choices=['warehouse', 'parquet'], default=STREAM_SINK, help='where batches are written')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    options = {'workers': args.workers, 'batch_size': args.batch_size, 'flush_interval': args.flush_interval, 'sink': args.sink}
+
+    start = time.perf_counter()
+    with metrics.profiled('taskGraph'):
+        status = run_graph(args.tasks.split(','), options, args.concurrency)
+    print(f"Finished in {time.perf_counter() - start:.1f}s: " + ', '.join(f"{name} {state}" for name, state in status.items()))
+
+    if any(state != 'ok' for state in status.values()):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
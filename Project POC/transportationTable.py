@@ -1,130 +1,155 @@
-import requests
-import pandas as pd
-import snowflake.connector
 from datetime import datetime
-import time
 import itertools
+import json
 import os
 from dotenv import load_dotenv
+from warehouseLoader import load_dataframe
+from warehouse import get_pool, ensure_table
+from httpClient import http_get
+import metrics
+import gazetteer
+import crawlJournal
+from routeGraph import mirror_route
+from cityScheduler import CITY_WORKERS, stream_units, parse_args
+from recordStream import BATCH_SIZE, FLUSH_INTERVAL, STREAM_SINK, stream_to_sink, parquet_sink
 
 load_dotenv()
 
-cities = ["New York", "San Francisco", "Chicago", "Seattle", "Las Vegas", "Los Angeles"]
+cities = gazetteer.CITIES
 
-def get_transportation_data():
+# Rome2Rio prices and schedules can differ by direction, so both directions
+# are queried by default. SYMMETRIC_ROUTES=1 queries each unordered pair once
+# and mirrors it, halving calls where the routes are known to be symmetric
+SYMMETRIC_ROUTES = os.getenv('SYMMETRIC_ROUTES', '0') == '1'
+
+TRANSPORTATION_DATA_DDL = """
+CREATE TABLE IF NOT EXISTS TRANSPORTATION_DATA (
+    ORIGIN_CITY VARCHAR(50),
+    DESTINATION_CITY VARCHAR(50),
+    ROUTE_NAME VARCHAR(100),
+    ROUTE_TYPE VARCHAR(50),
+    TOTAL_DISTANCE FLOAT,
+    TOTAL_DURATION FLOAT,
+    PRICE_LOW FLOAT,
+    PRICE_HIGH FLOAT,
+    CURRENCY VARCHAR(10),
+    SEGMENTS VARCHAR(10000),
+    DATA_TIMESTAMP TIMESTAMP_NTZ,
+    ROW_HASH VARCHAR
+)
+"""
+
+TRANSPORTATION_KEY = ["ORIGIN_CITY", "DESTINATION_CITY", "ROUTE_NAME"]
+
+TRANSPORTATION_TYPES = {
+    "TOTAL_DISTANCE": "float64",
+    "TOTAL_DURATION": "float64",
+    "PRICE_LOW": "float64",
+    "PRICE_HIGH": "float64",
+    "DATA_TIMESTAMP": "datetime64[ns]"
+}
+
+def get_route_data(city_pair):
+    origin, destination = city_pair
     api_key = os.getenv('ROME2RIO_API_KEY')
     base_url = "https://api.rome2rio.com/api/1.5/json/Search"
     
-    transportation_data = []
+    route_data = []
     
-    city_pairs = list(itertools.permutations(cities, 2))
+    params = {
+        "key": api_key,
+        "oName": origin,
+        "dName": destination,
+        "currencyCode": "USD"
+    }
     
-    for origin, destination in city_pairs:
-        params = {
-            "key": api_key,
-            "oName": origin,
-            "dName": destination,
-            "currencyCode": "USD"
-        }
+    try:
+        response = http_get('rome2rio', base_url, params=params)
+        response.raise_for_status()
+        data = response.json()
         
-        try:
-            response = requests.get(base_url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            routes = data.get("routes", [])
+        routes = data.get("routes", [])
+        
+        for route in routes:
+            segments = []
             
-            for route in routes:
-                segments = []
-                
-                for segment in route.get("segments", []):
-                    segment_data = {
-                        "SEGMENT_TYPE": segment.get("kind"),
-                        "SEGMENT_DISTANCE": segment.get("distance"),
-                        "SEGMENT_DURATION": segment.get("duration")
-                    }
-                    segments.append(segment_data)
-                
-                route_entry = {
-                    "ORIGIN_CITY": origin,
-                    "DESTINATION_CITY": destination,
-                    "ROUTE_NAME": route.get("name"),
-                    "ROUTE_TYPE": route.get("kind"),
-                    "TOTAL_DISTANCE": route.get("distance"),
-                    "TOTAL_DURATION": route.get("duration"),
-                    "PRICE_LOW": route.get("indicativePrices", [{}])[0].get("priceLow"),
-                    "PRICE_HIGH": route.get("indicativePrices", [{}])[0].get("priceHigh"),
-                    "CURRENCY": route.get("indicativePrices", [{}])[0].get("currency"),
-                    "SEGMENTS": str(segments),
-                    "DATA_TIMESTAMP": datetime.now()
+            for segment in route.get("segments", []):
+                segment_data = {
+                    "SEGMENT_TYPE": segment.get("kind"),
+                    "SEGMENT_DISTANCE": segment.get("distance"),
+                    "SEGMENT_DURATION": segment.get("duration")
                 }
-                
-                transportation_data.append(route_entry)
+                segments.append(segment_data)
+            
+            route_entry = {
+                "ORIGIN_CITY": origin,
+                "DESTINATION_CITY": destination,
+                "ROUTE_NAME": route.get("name"),
+                "ROUTE_TYPE": route.get("kind"),
+                "TOTAL_DISTANCE": route.get("distance"),
+                "TOTAL_DURATION": route.get("duration"),
+                "PRICE_LOW": route.get("indicativePrices", [{}])[0].get("priceLow"),
+                "PRICE_HIGH": route.get("indicativePrices", [{}])[0].get("priceHigh"),
+                "CURRENCY": route.get("indicativePrices", [{}])[0].get("currency"),
+                "SEGMENTS": json.dumps(segments),
+                "DATA_TIMESTAMP": datetime.now()
+            }
             
-            time.sleep(1)
+            route_data.append(route_entry)
             
-        except Exception as e:
-            print(f"Error fetching transportation data for {origin} to {destination}: {e}")
+            if SYMMETRIC_ROUTES:
+                route_data.append(mirror_route(route_entry))
+        
+    except Exception as e:
+        print(f"Error fetching transportation data for {origin} to {destination}: {e}")
+        crawlJournal.run('transportation').incomplete()
     
-    return pd.DataFrame(transportation_data)
+    return route_data
 
-def load_to_snowflake(df):
-    conn = snowflake.connector.connect(
-        user=os.getenv('SNOWFLAKE_USER'),
-        password=os.getenv('SNOWFLAKE_PASSWORD'),
-        account=os.getenv('SNOWFLAKE_ACCOUNT'),
-        warehouse=os.getenv('SNOWFLAKE_WAREHOUSE'),
-        database=os.getenv('SNOWFLAKE_DATABASE'),
-        schema=os.getenv('SNOWFLAKE_SCHEMA')
-    )
-    
-    cursor = conn.cursor()
-    
+def get_transportation_data(workers=CITY_WORKERS):
+    """
+    Stream route rows for every ordered city pair
+    """
+    if SYMMETRIC_ROUTES:
+        city_pairs = list(itertools.combinations(cities, 2))
+    else:
+        city_pairs = list(itertools.permutations(cities, 2))
+    return stream_units(crawlJournal.run('transportation').units(get_route_data), city_pairs, workers)
+
+def load_to_snowflake(rows, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
     try:
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS TRANSPORTATION_DATA (
-            ORIGIN_CITY VARCHAR(50),
-            DESTINATION_CITY VARCHAR(50),
-            ROUTE_NAME VARCHAR(100),
-            ROUTE_TYPE VARCHAR(50),
-            TOTAL_DISTANCE FLOAT,
-            TOTAL_DURATION FLOAT,
-            PRICE_LOW FLOAT,
-            PRICE_HIGH FLOAT,
-            CURRENCY VARCHAR(10),
-            SEGMENTS VARCHAR(10000),
-            DATA_TIMESTAMP TIMESTAMP_NTZ
-        )
-        """)
-        
-        temp_file = '/tmp/transportation_data.csv'
-        df.to_csv(temp_file, index=False, header=False)
-        
-        cursor.execute("CREATE OR REPLACE STAGE temp_stage")
-        cursor.execute(f"PUT file://{temp_file} @temp_stage")
-        
-        cursor.execute("""
-        COPY INTO TRANSPORTATION_DATA
-        FROM @temp_stage/transportation_data.csv.gz
-        FILE_FORMAT = (TYPE = 'CSV' FIELD_OPTIONALLY_ENCLOSED_BY = '"' SKIP_HEADER = 0)
-        """)
-        
-        print("Transportation data loaded to Snowflake successfully")
+        with get_pool().connection() as conn:
+            ensure_table(conn, 'TRANSPORTATION_DATA', TRANSPORTATION_DATA_DDL)
+            
+            total = stream_to_sink(
+                rows,
+                lambda df: load_dataframe(conn, df, 'TRANSPORTATION_DATA', TRANSPORTATION_KEY, TRANSPORTATION_TYPES),
+                batch_size,
+                flush_interval,
+                table='TRANSPORTATION_DATA'
+            )
+            crawlJournal.finish('transportation')
+            
+            if total:
+                print("Transportation data loaded to Snowflake successfully")
+            else:
+                print("No transportation data to load")
         
     except Exception as e:
         print(f"Error loading data to Snowflake: {e}")
-        
-    finally:
-        cursor.close()
-        conn.close()
+        raise
 
-def main():
-    transportation_df = get_transportation_data()
+def main(workers=CITY_WORKERS, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, sink=STREAM_SINK):
+    rows = get_transportation_data(workers)
     
-    if not transportation_df.empty:
-        load_to_snowflake(transportation_df)
+    if sink == 'parquet':
+        total = stream_to_sink(rows, parquet_sink('TRANSPORTATION_DATA'), batch_size, flush_interval, table='TRANSPORTATION_DATA')
+        crawlJournal.finish('transportation')
+        print(f"Wrote {total} transportation rows to Parquet")
     else:
-        print("No transportation data to load")
+        load_to_snowflake(rows, batch_size, flush_interval)
 
 if __name__ == "__main__":
-    main()
+    args = parse_args("Load Rome2Rio routes between cities into Snowflake")
+    with metrics.profiled('transportation'):
+        main(workers=args.workers, batch_size=args.batch_size, flush_interval=args.flush_interval, sink=args.sink)
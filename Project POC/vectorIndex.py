@@ -0,0 +1,359 @@
+import threading
+import tempfile
+import numpy as np
+import pandas as pd
+import json
+import time
+import os
+from entityStore import vocabulary
+
+VECTOR_INDEX_DIR = os.getenv('VECTOR_INDEX_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'vectors'))
+VECTOR_NPROBE = int(os.getenv('VECTOR_NPROBE', '8'))
+
+# Metadata kept per vector for pre-filtering, as codes into entityStore vocabularies
+FILTER_COLUMNS = ['city', 'category', 'price_level']
+
+def normalized(vectors):
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+def top_k(scores, k):
+    """
+    Positions of the k largest scores, best first, without a full sort
+    """
+    if len(scores) <= k:
+        return np.argsort(-scores)
+    best = np.argpartition(-scores, k)[:k]
+    return best[np.argsort(-scores[best])]
+
+def nearest_centroids(vectors, centroids, chunk=65536):
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), chunk):
+        assignments[start:start + chunk] = np.argmax(vectors[start:start + chunk] @ centroids.T, axis=1)
+    return assignments
+
+def spherical_kmeans(vectors, clusters, iterations=10, seed=0):
+    """
+    Centroids (unit length) for cosine-similarity clustering of `vectors`.
+    Empty clusters are re-seeded from random vectors
+    """
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=clusters, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = nearest_centroids(vectors, centroids)
+        order = np.argsort(assignments, kind='stable')
+        counts = np.bincount(assignments, minlength=clusters)
+        filled = np.flatnonzero(counts)
+        starts = np.concatenate([[0], np.cumsum(counts)])[filled]
+
+        centroids[filled] = np.add.reduceat(vectors[order], starts, axis=0)
+        empty = np.flatnonzero(counts == 0)
+        centroids[empty] = vectors[rng.choice(len(vectors), size=len(empty))]
+        centroids = normalized(centroids)
+
+    return centroids
+
+class VectorIndex:
+    """
+    IVF (inverted file) index for cosine similarity over unit vectors.
+
+    Vectors are clustered by spherical k-means; each vector lives in the list
+    of its nearest centroid, and a search scores only the lists of the
+    `nprobe` centroids closest to the query. Filters on FILTER_COLUMNS are
+    applied before scoring, and fall back to an exact scan when they leave
+    fewer candidates than the probed lists would hold. Until train() is
+    called every search is exact.
+
+    Arrays grow by doubling as vectors arrive, and are saved as .npy files
+    that load memory-mapped, so opening a large index reads almost nothing
+    """
+    def __init__(self, dimensions, path=None):
+        self.dimensions = dimensions
+        self.path = path
+        self.ids = []
+        self.positions = {}
+        self.vectors = np.zeros((0, dimensions), dtype=np.float32)
+        self.alive = np.zeros(0, dtype=bool)
+        self.codes = {column: np.zeros(0, dtype=np.int32) for column in FILTER_COLUMNS}
+        self.centroids = None
+        self.assignments = np.zeros(0, dtype=np.int32)
+        self.lists = None
+        self.lock = threading.RLock()
+
+    @classmethod
+    def open(cls, table, dimensions, path=None):
+        """
+        The saved index for a table, or an empty one
+        """
+        path = path or os.path.join(VECTOR_INDEX_DIR, table.lower())
+        if os.path.exists(os.path.join(path, 'meta.json')):
+            return cls.load(path)
+        return cls(dimensions, path)
+
+    @classmethod
+    def from_frame(cls, df, table, embedder=None, path=None):
+        """
+        Embed a hotels / restaurants / attractions frame (through the
+        embedding cache) and index it with its filter columns
+        """
+        from embeddings import embed_frame, get_embedder
+
+        embedder = embedder if embedder is not None else get_embedder()
+        ids, vectors = embed_frame(df, table, embedder)
+        index = cls(vectors.shape[1], path)
+        index.add(ids, vectors, {column: df[column].tolist() for column in FILTER_COLUMNS if column in df.columns})
+        index.train()
+        return index
+
+    @classmethod
+    def from_warehouse(cls, conn, table, embedder=None):
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"SELECT * FROM {table}")
+            names = [column[0].lower() for column in cursor.description]
+            df = pd.DataFrame(cursor.fetchall(), columns=names)
+        finally:
+            cursor.close()
+        return cls.from_frame(df, table, embedder)
+
+    def __len__(self):
+        return int(self.alive[:len(self.ids)].sum())
+
+    def reserve(self, size):
+        if size <= len(self.alive):
+            return
+        capacity = max(size, len(self.alive) * 2, 1024)
+
+        def grown(array, fill=0):
+            result = np.full((capacity,) + array.shape[1:], fill, dtype=array.dtype)
+            result[:len(array)] = array
+            return result
+
+        self.vectors = grown(self.vectors)
+        self.alive = grown(self.alive, False)
+        self.assignments = grown(self.assignments, -1)
+        self.codes = {column: grown(codes, -1) for column, codes in self.codes.items()}
+
+    def add(self, ids, vectors, metadata=None):
+        """
+        Insert or replace vectors by id. metadata maps FILTER_COLUMNS to one
+        value per id. New vectors join their nearest list right away, so
+        inserts need no retraining
+        """
+        ids = [str(entity_id) for entity_id in ids]
+        vectors = normalized(vectors)
+        metadata = metadata or {}
+
+        with self.lock:
+            positions = np.empty(len(ids), dtype=np.int64)
+            for i, entity_id in enumerate(ids):
+                position = self.positions.get(entity_id)
+                if position is None:
+                    position = self.positions[entity_id] = len(self.ids)
+                    self.ids.append(entity_id)
+                positions[i] = position
+
+            self.reserve(len(self.ids))
+            if not self.vectors.flags.writeable:
+                self.vectors = np.array(self.vectors)
+            self.vectors[positions] = vectors
+            self.alive[positions] = True
+            for column in FILTER_COLUMNS:
+                values = metadata.get(column)
+                self.codes[column][positions] = -1 if values is None else vocabulary(column).encode(values)
+
+            if self.centroids is not None:
+                self.assignments[positions] = nearest_centroids(vectors, self.centroids)
+                self.lists = None
+
+    def remove(self, ids):
+        with self.lock:
+            positions = [self.positions[str(entity_id)] for entity_id in ids if str(entity_id) in self.positions]
+            self.alive[positions] = False
+
+    def train(self, clusters=None, sample=100000, iterations=10):
+        """
+        Cluster the indexed vectors (or a sample of them) into about
+        4 * sqrt(n) lists and assign every vector to one
+        """
+        with self.lock:
+            count = len(self.ids)
+            clusters = clusters or max(1, int(4 * np.sqrt(count)))
+            if count < clusters:
+                return
+
+            vectors = self.vectors[:count]
+            rng = np.random.default_rng(0)
+            training = vectors if count <= sample else vectors[np.sort(rng.choice(count, size=sample, replace=False))]
+            self.centroids = spherical_kmeans(training, clusters, iterations)
+            self.assignments[:count] = nearest_centroids(vectors, self.centroids)
+            self.lists = None
+
+    def inverted_lists(self):
+        """
+        (order, offsets): positions sorted by list, list c holding
+        order[offsets[c]:offsets[c + 1]]. Rebuilt after inserts
+        """
+        if self.lists is None:
+            assignments = self.assignments[:len(self.ids)]
+            order = np.argsort(assignments, kind='stable').astype(np.int64)
+            counts = np.bincount(assignments[assignments >= 0], minlength=len(self.centroids))
+            skipped = int((assignments < 0).sum())
+            self.lists = (order[skipped:], np.concatenate([[0], np.cumsum(counts)]))
+        return self.lists
+
+    def filter_mask(self, where):
+        """
+        Live positions matching {column: value or list of values}
+        """
+        count = len(self.ids)
+        mask = self.alive[:count].copy()
+        for column, values in (where or {}).items():
+            values = values if isinstance(values, (list, tuple, set)) else [values]
+            # Lookup table over codes; missing (-1) lands on the last slot
+            wanted = np.zeros(len(vocabulary(column)) + 1, dtype=bool)
+            wanted[[vocabulary(column).id(str(value)) for value in values]] = True
+            wanted[-1] = False
+            mask &= wanted[self.codes[column][:count]]
+        return mask
+
+    def brute_force(self, query, k=10, where=None, mask=None):
+        """
+        Exact top-k (ids, scores) by scanning every (filtered) vector
+        """
+        query = normalized(query)[0]
+        mask = self.filter_mask(where) if mask is None else mask
+        candidates = np.flatnonzero(mask)
+        return self.ranked(candidates, self.vectors[candidates] @ query, k)
+
+    def ranked(self, candidates, scores, k):
+        best = top_k(scores, k)
+        return [self.ids[position] for position in candidates[best]], scores[best]
+
+    def search(self, query, k=10, where=None, nprobe=VECTOR_NPROBE):
+        """
+        Approximate top-k (ids, scores) by cosine similarity, restricted to
+        vectors whose metadata matches `where`
+        """
+        with self.lock:
+            mask = self.filter_mask(where)
+            if self.centroids is None:
+                return self.brute_force(query, k, mask=mask)
+
+            query = normalized(query)[0]
+            order, offsets = self.inverted_lists()
+            probed = top_k(self.centroids @ query, nprobe)
+            sizes = offsets[probed + 1] - offsets[probed]
+
+            matching = int(mask.sum())
+            if matching <= sizes.sum():
+                candidates = np.flatnonzero(mask)
+            else:
+                candidates = np.concatenate([order[offsets[c]:offsets[c + 1]] for c in probed])
+                candidates = candidates[mask[candidates]]
+            return self.ranked(candidates, self.vectors[candidates] @ query, k)
+
+    def save(self, path=None):
+        path = path or self.path
+        os.makedirs(path, exist_ok=True)
+        with self.lock:
+            count = len(self.ids)
+            arrays = {'vectors': self.vectors[:count], 'alive': self.alive[:count], 'assignments': self.assignments[:count]}
+            arrays.update({f"codes.{column}": codes[:count] for column, codes in self.codes.items()})
+            if self.centroids is not None:
+                arrays['centroids'] = self.centroids
+
+            for name, array in arrays.items():
+                np.save(os.path.join(path, f"{name}.tmp.npy"), array)
+                os.replace(os.path.join(path, f"{name}.tmp.npy"), os.path.join(path, f"{name}.npy"))
+
+            meta = {'dimensions': self.dimensions, 'ids': self.ids, 'trained': self.centroids is not None,
+                    'vocabularies': {column: vocabulary(column).terms for column in FILTER_COLUMNS}}
+            with open(os.path.join(path, 'meta.tmp.json'), 'w') as f:
+                json.dump(meta, f)
+            os.replace(os.path.join(path, 'meta.tmp.json'), os.path.join(path, 'meta.json'))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Open a saved index with its vectors memory-mapped read-only; the
+        first insert copies them into memory
+        """
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+
+        index = cls(meta['dimensions'], path)
+        index.ids = meta['ids']
+        index.positions = {entity_id: position for position, entity_id in enumerate(index.ids)}
+        index.vectors = np.load(os.path.join(path, 'vectors.npy'), mmap_mode='r')
+        index.alive = np.load(os.path.join(path, 'alive.npy'))
+        index.assignments = np.load(os.path.join(path, 'assignments.npy'))
+        if meta['trained']:
+            index.centroids = np.load(os.path.join(path, 'centroids.npy'))
+
+        # Saved codes index the saved vocabularies; map them onto this process's
+        for column in FILTER_COLUMNS:
+            terms = meta['vocabularies'][column]
+            mapping = np.append(vocabulary(column).encode(terms), -1).astype(np.int32)
+            index.codes[column] = mapping[np.load(os.path.join(path, f"codes.{column}.npy"))]
+        return index
+
+def synthetic_vectors(n, dimensions, topics=200, seed=0):
+    """
+    Unit vectors scattered around `topics` directions, like embeddings of
+    places that fall into themes
+    """
+    rng = np.random.default_rng(seed)
+    centers = normalized(rng.standard_normal((topics, dimensions)))
+    return normalized(centers[rng.integers(0, topics, n)] + rng.standard_normal((n, dimensions)).astype(np.float32) * 0.08)
+
+def main():
+    n, dimensions, k = 100000, 128, 10
+    rng = np.random.default_rng(1)
+    vectors = synthetic_vectors(n, dimensions)
+    metadata = {
+        'city': rng.choice(["New York", "San Francisco", "Chicago", "Seattle", "Las Vegas", "Los Angeles"], n).tolist(),
+        'category': rng.choice(["Museums", "Parks", "Tours", "Nightlife", "Shopping"], n).tolist(),
+        'price_level': rng.choice(['$', '$$', '$$$', '$$$$'], n).tolist()
+    }
+    queries = synthetic_vectors(200, dimensions, seed=0)[rng.permutation(200)] + rng.standard_normal((200, dimensions)).astype(np.float32) * 0.05
+
+    index = VectorIndex(dimensions)
+    index.add([f"p{i}" for i in range(n)], vectors, metadata)
+    start = time.perf_counter()
+    index.train()
+    print(f"Trained {len(index.centroids)} lists over {n} vectors in {time.perf_counter() - start:.1f} s")
+
+    def measure(search):
+        start = time.perf_counter()
+        results = [set(search(query)[0]) for query in queries]
+        return results, (time.perf_counter() - start) / len(queries) * 1000
+
+    for label, where in [("no filter", None), ("city = Seattle, price_level in ($, $$)", {'city': 'Seattle', 'price_level': ['$', '$$']})]:
+        exact, exact_ms = measure(lambda query: index.brute_force(query, k, where))
+        print(f"{label}: brute force {exact_ms:.2f} ms/query")
+        for nprobe in [1, 4, 16]:
+            found, ms = measure(lambda query: index.search(query, k, where, nprobe))
+            recall = np.mean([len(a & b) / max(len(b), 1) for a, b in zip(found, exact)])
+            print(f"  nprobe={nprobe}: recall@{k} {recall:.3f}, {ms:.2f} ms/query")
+
+    start = time.perf_counter()
+    fresh = synthetic_vectors(1000, dimensions, seed=2)
+    index.add([f"new{i}" for i in range(1000)], fresh, {'city': ['Seattle'] * 1000})
+    index.search(fresh[0], k)
+    print(f"Inserted 1000 vectors and searched in {(time.perf_counter() - start) * 1000:.0f} ms; "
+          f"own nearest neighbour: {index.search(fresh[0], 1, {'city': 'Seattle'})[0] == ['new0']}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        index.save(directory)
+        start = time.perf_counter()
+        loaded = VectorIndex.load(directory)
+        loaded.search(queries[0], k)
+        print(f"Memory-mapped load and first search: {(time.perf_counter() - start) * 1000:.0f} ms, "
+              f"same results: {loaded.search(queries[0], k)[0] == index.search(queries[0], k)[0]}")
+        del loaded
+
+if __name__ == "__main__":
+    main()
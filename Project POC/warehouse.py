@@ -0,0 +1,159 @@
+from contextlib import contextmanager
+from queue import Queue, Empty
+import threading
+import hashlib
+import atexit
+import os
+from dotenv import load_dotenv
+from warehouseLoader import connect_local, is_local, load_dataframe, ensure_column
+
+load_dotenv()
+
+# 'snowflake' or 'local' (SQLite at LOCAL_WAREHOUSE_PATH)
+WAREHOUSE_BACKEND = os.getenv('WAREHOUSE_BACKEND', 'snowflake')
+WAREHOUSE_POOL_SIZE = int(os.getenv('WAREHOUSE_POOL_SIZE', '4'))
+
+def connect_snowflake():
+    import snowflake.connector
+
+    return snowflake.connector.connect(
+        user=os.getenv('SNOWFLAKE_USER'),
+        password=os.getenv('SNOWFLAKE_PASSWORD'),
+        account=os.getenv('SNOWFLAKE_ACCOUNT'),
+        warehouse=os.getenv('SNOWFLAKE_WAREHOUSE'),
+        database=os.getenv('SNOWFLAKE_DATABASE'),
+        schema=os.getenv('SNOWFLAKE_SCHEMA'),
+        client_session_keep_alive=True
+    )
+
+class ConnectionPool:
+    """
+    Hands out at most `size` connections made by `factory`, reusing them
+    across loaders so a full refresh logs in (and resumes the warehouse) once
+    """
+    def __init__(self, factory, size=WAREHOUSE_POOL_SIZE):
+        self.factory = factory
+        self.size = size
+        self.idle = Queue()
+        self.created = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except Empty:
+            pass
+
+        with self.lock:
+            if self.created < self.size:
+                self.created += 1
+                try:
+                    return self.factory()
+                except Exception:
+                    self.created -= 1
+                    raise
+
+        return self.idle.get()
+
+    def release(self, conn):
+        if is_closed(conn):
+            with self.lock:
+                self.created -= 1
+            return
+        self.idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        while True:
+            try:
+                conn = self.idle.get_nowait()
+            except Empty:
+                break
+            conn.close()
+            with self.lock:
+                self.created -= 1
+
+def is_closed(conn):
+    if is_local(conn):
+        return False
+    return conn.is_closed()
+
+_pool = None
+_pool_lock = threading.Lock()
+_applied_ddl = set()
+_ddl_lock = threading.Lock()
+
+def get_pool():
+    """
+    Process-wide pool for the configured backend. The local backend shares a
+    single SQLite connection so an in-memory database is seen by every loader
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            if WAREHOUSE_BACKEND == 'local':
+                _pool = ConnectionPool(connect_local, size=1)
+            else:
+                _pool = ConnectionPool(connect_snowflake)
+        return _pool
+
+def set_pool(pool):
+    """
+    Swap in another pool, e.g. ConnectionPool(connect_local, 1) in a benchmark
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool is not pool:
+            _pool.close()
+        _pool = pool
+    with _ddl_lock:
+        _applied_ddl.clear()
+
+def ensure_table(conn, table, ddl, added_columns=None):
+    """
+    Run a table's CREATE TABLE IF NOT EXISTS once per process and backend,
+    then add any of `added_columns` ({column: type}) that a table created
+    before them lacks
+    """
+    key = (WAREHOUSE_BACKEND, table.upper(), hashlib.sha256(ddl.encode()).hexdigest())
+
+    with _ddl_lock:
+        if key in _applied_ddl:
+            return
+
+        cursor = conn.cursor()
+        try:
+            cursor.execute(ddl)
+            for column, column_type in (added_columns or {}).items():
+                ensure_column(cursor, conn, table, column, column_type)
+            if is_local(conn):
+                conn.commit()
+        finally:
+            cursor.close()
+
+        _applied_ddl.add(key)
+
+def load_tables(loads):
+    """
+    Load several tables over one pooled session. `loads` is a list of
+    (table, ddl, df, key_columns, column_types). Each table's merge is a single
+    MERGE statement; Snowflake commits implicitly around the staging DDL, so
+    atomicity is per table rather than across the whole list
+    """
+    with get_pool().connection() as conn:
+        for table, ddl, df, key_columns, column_types in loads:
+            ensure_table(conn, table, ddl)
+            load_dataframe(conn, df, table, key_columns, column_types)
+
+@atexit.register
+def close_pool():
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
@@ -0,0 +1,196 @@
+from datetime import datetime
+import sqlite3
+import tempfile
+import shutil
+import uuid
+import os
+
+LOAD_MODE = os.getenv('LOAD_MODE', 'merge')
+LOCAL_WAREHOUSE_PATH = os.getenv('LOCAL_WAREHOUSE_PATH', ':memory:')
+BULK_FILE_ROWS = int(os.getenv('BULK_FILE_ROWS', '100000'))
+BULK_PUT_PARALLEL = int(os.getenv('BULK_PUT_PARALLEL', '8'))
+
+HASH_COLUMN = 'row_hash'
+
+# Columns that change on every run without the record itself changing
+VOLATILE_COLUMNS = {'updated_at', 'data_timestamp'}
+
+def connect_local(path=LOCAL_WAREHOUSE_PATH):
+    """
+    SQLite stand-in for Snowflake so the merge logic can run offline.
+    The scripts' CREATE TABLE statements work unchanged against it
+    """
+    return sqlite3.connect(path, check_same_thread=False)
+
+def is_local(conn):
+    return isinstance(conn, sqlite3.Connection)
+
+def add_row_hash(df):
+    """
+    Return a copy of df with a content hash over every non-volatile column.
+    Each row's values are joined as text, NULLs marked apart from empty
+    strings, and the joined column is hashed in one pass
+    """
+    import pandas as pd
+
+    columns = [column for column in df.columns if column.lower() not in VOLATILE_COLUMNS and column.lower() != HASH_COLUMN]
+    frame = df[columns]
+    values = frame.astype(str).where(frame.notna(), '\x00')
+    joined = values[columns[0]].str.cat([values[column] for column in columns[1:]], sep='\x1f')
+
+    df = df.copy()
+    df[HASH_COLUMN] = pd.util.hash_pandas_object(joined, index=False).map('{:016x}'.format)
+    return df
+
+def ensure_column(cursor, conn, table, column, column_type='VARCHAR'):
+    """
+    Add a column to a table created before the column existed
+    """
+    if is_local(conn):
+        columns = [row[1].lower() for row in cursor.execute(f"PRAGMA table_info({table})").fetchall()]
+        if column.lower() not in columns:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+    else:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {column_type}")
+
+def stage_dataframe(cursor, conn, df, table, stage_table):
+    if is_local(conn):
+        cursor.execute(f"DROP TABLE IF EXISTS {stage_table}")
+        df.to_sql(stage_table, conn, index=False)
+    else:
+        cursor.execute(f"CREATE OR REPLACE TEMPORARY TABLE {stage_table} LIKE {table}")
+        bulk_copy(conn, df, stage_table)
+
+def bulk_copy(conn, df, table, column_types=None):
+    """
+    Append df to `table` through compressed Parquet files: the frame is cast
+    to column_types, split into BULK_FILE_ROWS-row files, PUT in parallel to a
+    stage unique to this call and copied in by column name. Returns the
+    number of rows loaded
+    """
+    if column_types:
+        df = df.astype(column_types)
+
+    if is_local(conn):
+        df.to_sql(table, conn, if_exists='append', index=False)
+        conn.commit()
+        return len(df)
+
+    run_id = f"{table}_{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}".upper()
+    stage = f"STAGE_{run_id}"
+    local_dir = tempfile.mkdtemp(prefix=f"{run_id.lower()}_")
+    cursor = conn.cursor()
+
+    try:
+        for part, start in enumerate(range(0, len(df), BULK_FILE_ROWS)):
+            path = os.path.join(local_dir, f"{run_id.lower()}_{part:05d}.parquet")
+            df.iloc[start:start + BULK_FILE_ROWS].to_parquet(
+                path, index=False, compression='snappy', coerce_timestamps='us', allow_truncated_timestamps=True
+            )
+
+        cursor.execute(f"CREATE TEMPORARY STAGE {stage}")
+        cursor.execute(f"PUT file://{local_dir}/*.parquet @{stage} PARALLEL = {BULK_PUT_PARALLEL} AUTO_COMPRESS = FALSE")
+        cursor.execute(f"""
+        COPY INTO {table}
+        FROM @{stage}
+        FILE_FORMAT = (TYPE = 'PARQUET')
+        MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE
+        PURGE = TRUE
+        """)
+        cursor.execute(f"DROP STAGE IF EXISTS {stage}")
+
+    finally:
+        cursor.close()
+        shutil.rmtree(local_dir, ignore_errors=True)
+
+    return len(df)
+
+def key_equals(conn, column):
+    """
+    NULL-safe key comparison, so a NULL key part (e.g. a route without a name)
+    matches the stored row instead of being inserted again on every run
+    """
+    if is_local(conn):
+        return f"t.{column} IS s.{column}"
+    return f"EQUAL_NULL(t.{column}, s.{column})"
+
+def merge_dataframe(conn, df, table, key_columns, column_types=None):
+    """
+    Stage df next to `table` and merge it in on `key_columns`: new keys are
+    inserted, existing keys are updated only when their row hash changed.
+    Returns (inserted, updated, unchanged)
+    """
+    if df.empty:
+        return 0, 0, 0
+
+    df = df.drop_duplicates(subset=key_columns, keep='last')
+    if column_types:
+        df = df.astype(column_types)
+    df = add_row_hash(df)
+    stage_table = f"{table}_STAGE"
+    columns = list(df.columns)
+    value_columns = [column for column in columns if column not in key_columns]
+
+    join = ' AND '.join(key_equals(conn, column) for column in key_columns)
+    changed = f"(t.{HASH_COLUMN} IS NULL OR t.{HASH_COLUMN} <> s.{HASH_COLUMN})"
+    column_list = ', '.join(columns)
+
+    cursor = conn.cursor()
+
+    try:
+        ensure_column(cursor, conn, table, HASH_COLUMN)
+        stage_dataframe(cursor, conn, df, table, stage_table)
+
+        inserted = cursor.execute(
+            f"SELECT COUNT(*) FROM {stage_table} s WHERE NOT EXISTS (SELECT 1 FROM {table} t WHERE {join})"
+        ).fetchone()[0]
+        updated = cursor.execute(
+            f"SELECT COUNT(*) FROM {stage_table} s JOIN {table} t ON {join} WHERE {changed}"
+        ).fetchone()[0]
+
+        if is_local(conn):
+            assignments = ', '.join(f"{column} = s.{column}" for column in value_columns)
+            cursor.execute(f"""
+            UPDATE {table} AS t SET {assignments}
+            FROM {stage_table} AS s
+            WHERE {join} AND {changed}
+            """)
+            cursor.execute(f"""
+            INSERT INTO {table} ({column_list})
+            SELECT {column_list} FROM {stage_table} s
+            WHERE NOT EXISTS (SELECT 1 FROM {table} t WHERE {join})
+            """)
+            cursor.execute(f"DROP TABLE {stage_table}")
+            conn.commit()
+        else:
+            assignments = ', '.join(f"t.{column} = s.{column}" for column in value_columns)
+            source_columns = ', '.join(f"s.{column}" for column in columns)
+            cursor.execute(f"""
+            MERGE INTO {table} t
+            USING {stage_table} s
+            ON {join}
+            WHEN MATCHED AND {changed} THEN UPDATE SET {assignments}
+            WHEN NOT MATCHED THEN INSERT ({column_list}) VALUES ({source_columns})
+            """)
+            cursor.execute(f"DROP TABLE IF EXISTS {stage_table}")
+
+    finally:
+        cursor.close()
+
+    return inserted, updated, len(df) - inserted - updated
+
+def load_dataframe(conn, df, table, key_columns, column_types=None):
+    """
+    Load df into `table` according to LOAD_MODE: 'merge' upserts on
+    key_columns, 'append' bulk-copies every row
+    """
+    if LOAD_MODE == 'merge':
+        inserted, updated, unchanged = merge_dataframe(conn, df, table, key_columns, column_types)
+
+        print(f"Rows inserted: {inserted}")
+        print(f"Rows updated: {updated}")
+        print(f"Rows unchanged: {unchanged}")
+    else:
+        num_rows = bulk_copy(conn, df, table, column_types)
+
+        print(f"Number of rows: {num_rows}")
@@ -1,156 +1,174 @@
-import requests
-import pandas as pd
-import snowflake.connector
 from datetime import datetime
-import time
 import os
 from dotenv import load_dotenv
+from warehouseLoader import load_dataframe
+from warehouse import get_pool, ensure_table
+from httpClient import http_get
+import metrics
+import gazetteer
+import crawlJournal
+from cityScheduler import CITY_WORKERS, stream_units, parse_args
+from recordStream import BATCH_SIZE, FLUSH_INTERVAL, STREAM_SINK, stream_to_sink, parquet_sink
 
 load_dotenv()
 
-cities = [
-    {"name": "New York", "lat": 40.7128, "lon": 74.0060},
-    {"name": "San Francisco", "lat": 37.7749, "lon": 122.4194},
-    {"name": "Chicago", "lat": 41.8781, "lon": 87.6298},
-    {"name": "Seattle", "lat": 47.6062, "lon": 122.3321},
-    {"name": "Las Vegas", "lat": 36.1699, "lon": 115.1398},
-    {"name": "Los Angeles", "lat": 34.0522, "lon": 118.2437}
-]
+cities = gazetteer.CITIES
 
-def get_weather_data():
+WEATHER_DATA_DDL = """
+CREATE TABLE IF NOT EXISTS WEATHER_DATA (
+    CITY_NAME VARCHAR(50),
+    LATITUDE FLOAT,
+    LONGITUDE FLOAT,
+    TIMESTAMP TIMESTAMP_NTZ,
+    TEMPERATURE FLOAT,
+    MIN_TEMPERATURE FLOAT,
+    MAX_TEMPERATURE FLOAT,
+    FEELS_LIKE FLOAT,
+    HUMIDITY FLOAT,
+    WIND_SPEED FLOAT,
+    WIND_DIRECTION FLOAT,
+    WEATHER_CONDITION VARCHAR(50),
+    WEATHER_DESCRIPTION VARCHAR(100),
+    PRESSURE FLOAT,
+    VISIBILITY FLOAT,
+    CLOUD_COVER FLOAT,
+    UV_INDEX FLOAT,
+    PRECIPITATION_PROBABILITY FLOAT,
+    FORECAST_DAY INT,
+    FORECAST_DATE DATE,
+    ROW_HASH VARCHAR
+)
+"""
+
+WEATHER_KEY = ["CITY_NAME", "TIMESTAMP"]
+
+WEATHER_TYPES = {
+    "LATITUDE": "float64",
+    "LONGITUDE": "float64",
+    "TIMESTAMP": "datetime64[ns]",
+    "TEMPERATURE": "float64",
+    "MIN_TEMPERATURE": "float64",
+    "MAX_TEMPERATURE": "float64",
+    "FEELS_LIKE": "float64",
+    "HUMIDITY": "float64",
+    "WIND_SPEED": "float64",
+    "WIND_DIRECTION": "float64",
+    "PRESSURE": "float64",
+    "VISIBILITY": "float64",
+    "CLOUD_COVER": "float64",
+    "UV_INDEX": "float64",
+    "PRECIPITATION_PROBABILITY": "float64",
+    "FORECAST_DAY": "Int64"
+}
+
+def get_city_weather(city_name):
+    lat, lng = gazetteer.get_coords(city_name)
+    city = {"name": city_name, "lat": lat, "lon": lng}
     api_key = os.getenv('OPENWEATHERMAP_API_KEY')
     base_url = "https://api.openweathermap.org/data/2.5/onecall"
     
     weather_data = []
     
-    for city in cities:
-        params = {
-            "lat": city["lat"],
-            "lon": city["lon"],
-            "units": "imperial",
-            "exclude": "minutely,alerts",
-            "appid": api_key
-        }
-        
-        try:
-            response = requests.get(base_url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            current = data.get("current", {})
-            
-            weather_entry = {
-                "CITY_NAME": city["name"],
-                "LATITUDE": city["lat"],
-                "LONGITUDE": city["lon"],
-                "TIMESTAMP": datetime.fromtimestamp(current.get("dt", 0)),
-                "TEMPERATURE": current.get("temp"),
-                "FEELS_LIKE": current.get("feels_like"),
-                "HUMIDITY": current.get("humidity"),
-                "WIND_SPEED": current.get("wind_speed"),
-                "WIND_DIRECTION": current.get("wind_deg"),
-                "WEATHER_CONDITION": current.get("weather", [{}])[0].get("main"),
-                "WEATHER_DESCRIPTION": current.get("weather", [{}])[0].get("description"),
-                "PRESSURE": current.get("pressure"),
-                "VISIBILITY": current.get("visibility"),
-                "CLOUD_COVER": current.get("clouds"),
-                "UV_INDEX": current.get("uvi"),
-                "FORECAST_DATE": datetime.now().date()
-            }
-            
-            for idx, daily_data in enumerate(data.get("daily", [])):
-                forecast_entry = weather_entry.copy()
-                forecast_entry["TIMESTAMP"] = datetime.fromtimestamp(daily_data.get("dt", 0))
-                forecast_entry["TEMPERATURE"] = daily_data.get("temp", {}).get("day")
-                forecast_entry["MIN_TEMPERATURE"] = daily_data.get("temp", {}).get("min")
-                forecast_entry["MAX_TEMPERATURE"] = daily_data.get("temp", {}).get("max")
-                forecast_entry["FEELS_LIKE"] = daily_data.get("feels_like", {}).get("day")
-                forecast_entry["HUMIDITY"] = daily_data.get("humidity")
-                forecast_entry["WIND_SPEED"] = daily_data.get("wind_speed")
-                forecast_entry["WIND_DIRECTION"] = daily_data.get("wind_deg")
-                forecast_entry["WEATHER_CONDITION"] = daily_data.get("weather", [{}])[0].get("main")
-                forecast_entry["WEATHER_DESCRIPTION"] = daily_data.get("weather", [{}])[0].get("description")
-                forecast_entry["PRESSURE"] = daily_data.get("pressure")
-                forecast_entry["CLOUD_COVER"] = daily_data.get("clouds")
-                forecast_entry["UV_INDEX"] = daily_data.get("uvi")
-                forecast_entry["PRECIPITATION_PROBABILITY"] = daily_data.get("pop")
-                forecast_entry["FORECAST_DAY"] = idx
-                
-                weather_data.append(forecast_entry)
-            
-            time.sleep(1)
-            
-        except Exception as e:
-            print(f"Error fetching weather data for {city['name']}: {e}")
-    
-    return pd.DataFrame(weather_data)
-
-def load_to_snowflake(df):
-    conn = snowflake.connector.connect(
-        user=os.getenv('SNOWFLAKE_USER'),
-        password=os.getenv('SNOWFLAKE_PASSWORD'),
-        account=os.getenv('SNOWFLAKE_ACCOUNT'),
-        warehouse=os.getenv('SNOWFLAKE_WAREHOUSE'),
-        database=os.getenv('SNOWFLAKE_DATABASE'),
-        schema=os.getenv('SNOWFLAKE_SCHEMA')
-    )
-    
-    cursor = conn.cursor()
+    params = {
+        "lat": city["lat"],
+        "lon": city["lon"],
+        "units": "imperial",
+        "exclude": "minutely,alerts",
+        "appid": api_key
+    }
     
     try:
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS WEATHER_DATA (
-            CITY_NAME VARCHAR(50),
-            LATITUDE FLOAT,
-            LONGITUDE FLOAT,
-            TIMESTAMP TIMESTAMP_NTZ,
-            TEMPERATURE FLOAT,
-            MIN_TEMPERATURE FLOAT,
-            MAX_TEMPERATURE FLOAT,
-            FEELS_LIKE FLOAT,
-            HUMIDITY FLOAT,
-            WIND_SPEED FLOAT,
-            WIND_DIRECTION FLOAT,
-            WEATHER_CONDITION VARCHAR(50),
-            WEATHER_DESCRIPTION VARCHAR(100),
-            PRESSURE FLOAT,
-            VISIBILITY FLOAT,
-            CLOUD_COVER FLOAT,
-            UV_INDEX FLOAT,
-            PRECIPITATION_PROBABILITY FLOAT,
-            FORECAST_DAY INT,
-            FORECAST_DATE DATE
-        )
-        """)
+        response = http_get('openweathermap', base_url, params=params)
+        response.raise_for_status()
+        data = response.json()
         
-        temp_file = '/tmp/weather_data.csv'
-        df.to_csv(temp_file, index=False, header=False)
+        current = data.get("current", {})
         
-        cursor.execute("CREATE OR REPLACE STAGE temp_stage")
-        cursor.execute(f"PUT file://{temp_file} @temp_stage")
+        weather_entry = {
+            "CITY_NAME": city["name"],
+            "LATITUDE": city["lat"],
+            "LONGITUDE": city["lon"],
+            "TIMESTAMP": datetime.fromtimestamp(current.get("dt", 0)),
+            "TEMPERATURE": current.get("temp"),
+            "FEELS_LIKE": current.get("feels_like"),
+            "HUMIDITY": current.get("humidity"),
+            "WIND_SPEED": current.get("wind_speed"),
+            "WIND_DIRECTION": current.get("wind_deg"),
+            "WEATHER_CONDITION": current.get("weather", [{}])[0].get("main"),
+            "WEATHER_DESCRIPTION": current.get("weather", [{}])[0].get("description"),
+            "PRESSURE": current.get("pressure"),
+            "VISIBILITY": current.get("visibility"),
+            "CLOUD_COVER": current.get("clouds"),
+            "UV_INDEX": current.get("uvi"),
+            "FORECAST_DATE": datetime.now().date()
+        }
         
-        cursor.execute("""
-        COPY INTO WEATHER_DATA
-        FROM @temp_stage/weather_data.csv.gz
-        FILE_FORMAT = (TYPE = 'CSV' FIELD_OPTIONALLY_ENCLOSED_BY = '"' SKIP_HEADER = 0)
-        """)
+        for idx, daily_data in enumerate(data.get("daily", [])):
+            forecast_entry = weather_entry.copy()
+            forecast_entry["TIMESTAMP"] = datetime.fromtimestamp(daily_data.get("dt", 0))
+            forecast_entry["TEMPERATURE"] = daily_data.get("temp", {}).get("day")
+            forecast_entry["MIN_TEMPERATURE"] = daily_data.get("temp", {}).get("min")
+            forecast_entry["MAX_TEMPERATURE"] = daily_data.get("temp", {}).get("max")
+            forecast_entry["FEELS_LIKE"] = daily_data.get("feels_like", {}).get("day")
+            forecast_entry["HUMIDITY"] = daily_data.get("humidity")
+            forecast_entry["WIND_SPEED"] = daily_data.get("wind_speed")
+            forecast_entry["WIND_DIRECTION"] = daily_data.get("wind_deg")
+            forecast_entry["WEATHER_CONDITION"] = daily_data.get("weather", [{}])[0].get("main")
+            forecast_entry["WEATHER_DESCRIPTION"] = daily_data.get("weather", [{}])[0].get("description")
+            forecast_entry["PRESSURE"] = daily_data.get("pressure")
+            forecast_entry["CLOUD_COVER"] = daily_data.get("clouds")
+            forecast_entry["UV_INDEX"] = daily_data.get("uvi")
+            forecast_entry["PRECIPITATION_PROBABILITY"] = daily_data.get("pop")
+            forecast_entry["FORECAST_DAY"] = idx
+            
+            weather_data.append(forecast_entry)
         
-        print("Weather data loaded to Snowflake successfully")
+    except Exception as e:
+        print(f"Error fetching weather data for {city['name']}: {e}")
+        crawlJournal.run('weather').incomplete()
+    
+    return weather_data
+
+def get_weather_data(workers=CITY_WORKERS):
+    """
+    Stream current conditions and daily forecast rows for every city
+    """
+    return stream_units(crawlJournal.run('weather').units(get_city_weather), cities, workers)
+
+def load_to_snowflake(rows, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+    try:
+        with get_pool().connection() as conn:
+            ensure_table(conn, 'WEATHER_DATA', WEATHER_DATA_DDL)
+            
+            total = stream_to_sink(
+                rows,
+                lambda df: load_dataframe(conn, df, 'WEATHER_DATA', WEATHER_KEY, WEATHER_TYPES),
+                batch_size,
+                flush_interval,
+                table='WEATHER_DATA'
+            )
+            crawlJournal.finish('weather')
+            
+            if total:
+                print("Weather data loaded to Snowflake successfully")
+            else:
+                print("No weather data to load")
         
     except Exception as e:
         print(f"Error loading data to Snowflake: {e}")
-        
-    finally:
-        cursor.close()
-        conn.close()
+        raise
 
-def main():
-    weather_df = get_weather_data()
+def main(workers=CITY_WORKERS, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, sink=STREAM_SINK):
+    rows = get_weather_data(workers)
     
-    if not weather_df.empty:
-        load_to_snowflake(weather_df)
+    if sink == 'parquet':
+        total = stream_to_sink(rows, parquet_sink('WEATHER_DATA'), batch_size, flush_interval, table='WEATHER_DATA')
+        crawlJournal.finish('weather')
+        print(f"Wrote {total} weather rows to Parquet")
     else:
-        print("No weather data to load")
+        load_to_snowflake(rows, batch_size, flush_interval)
 
 if __name__ == "__main__":
-    main()
+    args = parse_args("Load OpenWeatherMap forecasts into Snowflake")
+    with metrics.profiled('weather'):
+        main(workers=args.workers, batch_size=args.batch_size, flush_interval=args.flush_interval, sink=args.sink)